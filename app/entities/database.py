@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Enum
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Enum
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 import enum
@@ -11,9 +12,86 @@ load_dotenv()
 
 Base = declarative_base()
 
-# Get database URL from environment variable or use default
+# Get database URL and engine profile from environment variables or use defaults
 DB_CONNECTION = os.getenv("DATABASE_URL", "sqlite:///airline.db")
-engine = create_engine(DB_CONNECTION, connect_args={"check_same_thread": False})
+DB_PROFILE = os.getenv("DATABASE_PROFILE", "dev")
+
+# Named engine profiles: per-connection SQLite PRAGMAs plus pool sizing.
+# cache_size is negative so SQLite reads it as KiB rather than pages.
+ENGINE_PROFILES = {
+    "dev": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            "mmap_size": 0,
+            "cache_size": -16000,
+            "temp_store": "MEMORY",
+        },
+        "pool_size": 5,
+        "max_overflow": 10,
+    },
+    "prod-read-heavy": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 15000,
+            "mmap_size": 268435456,
+            "cache_size": -64000,
+            "temp_store": "MEMORY",
+        },
+        "pool_size": 20,
+        "max_overflow": 20,
+    },
+    "bulk-load": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "OFF",
+            "busy_timeout": 60000,
+            "mmap_size": 268435456,
+            "cache_size": -262144,
+            "temp_store": "MEMORY",
+        },
+        "pool_size": 1,
+        "max_overflow": 0,
+    },
+}
+
+def _apply_pragmas(engine: Engine, pragmas: dict) -> None:
+    """Run the given PRAGMAs on every new DBAPI connection of the engine."""
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+def create_db_engine(url: str = DB_CONNECTION, profile: str = DB_PROFILE) -> Engine:
+    """Create an engine configured with the given named profile."""
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown database profile: {profile}")
+    settings = ENGINE_PROFILES[profile]
+
+    if not url.startswith("sqlite"):
+        return create_engine(
+            url,
+            pool_size=settings["pool_size"],
+            max_overflow=settings["max_overflow"]
+        )
+
+    # In-memory databases use a per-thread pool that takes no size limits
+    is_memory = url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+    pool_args = {} if is_memory else {
+        "pool_size": settings["pool_size"],
+        "max_overflow": settings["max_overflow"],
+    }
+    engine = create_engine(url, connect_args={"check_same_thread": False}, **pool_args)
+    _apply_pragmas(engine, settings["pragmas"])
+    return engine
+
+engine = create_db_engine()
 DatabaseSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 class JourneyState(enum.Enum):
@@ -1,13 +1,16 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session, sessionmaker
-from .models.database import User, engine
+from .models.database import AsyncSessionLocal
 from .schemas import TokenData
-from .dal.user_dal import UserDAL
+from .dal.async_user_dal import AsyncUserDAL
+from .password_hashing import password_hasher
+from .principal_cache import (
+    AuthenticatedUser, token_cache, user_cache, token_key, USER_CACHE_TTL_SECONDS
+)
+import time
 import os
 from dotenv import load_dotenv
 
@@ -19,18 +22,15 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")  # Fallback for dev
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-SessionLocal = sessionmaker(bind=engine)
-
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.verify_and_update_sync(plain_password, hashed_password)[0]
 
 def get_password_hash(password: str) -> str:
     """Generate password hash."""
-    return pwd_context.hash(password)
+    return password_hasher.hash_sync(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token."""
@@ -43,43 +43,57 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    session: Session = Depends(SessionLocal)
-) -> User:
-    """Get current user from JWT token."""
+async def _load_user(username: str) -> Optional[AuthenticatedUser]:
+    """Get a user snapshot from the cache, reading the database only on a miss."""
+    user = user_cache.get(username)
+    if user is not None:
+        return user
+
+    generation = user_cache.generation
+    async with AsyncSessionLocal() as session:
+        record = await AsyncUserDAL(session).get_by_username(username)
+        if record is None:
+            return None
+        user = AuthenticatedUser.from_user(record)
+    user_cache.put(username, user, time.time() + USER_CACHE_TTL_SECONDS, generation)
+    return user
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> AuthenticatedUser:
+    """Get current user from JWT token.
+
+    Verified tokens are cached by hash until their exp claim, and user
+    records until they change, so steady-state requests do not touch the
+    database.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    key = token_key(token)
+    username = token_cache.get(key)
+    if username is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            username: str = payload.get("sub")
+            if username is None:
+                raise credentials_exception
+            token_data = TokenData(username=username)
+        except JWTError:
             raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
-        raise credentials_exception
-    
-    user_dal = UserDAL(session)
-    user = user_dal.get_by_username(token_data.username)
+        username = token_data.username
+        if payload.get("exp") is not None:
+            token_cache.put(key, username, float(payload["exp"]))
+
+    user = await _load_user(username)
     if user is None:
         raise credentials_exception
     return user
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: AuthenticatedUser = Depends(get_current_user)
+) -> AuthenticatedUser:
     """Get current active user."""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
-
-def get_db():
-    """Dependency for getting database session."""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close() 
\ No newline at end of file
+    return current_user
\ No newline at end of file
@@ -0,0 +1,209 @@
+"""
+Request latency at high concurrency with the sync services called from async
+handlers (as the routes did before the async DAL) versus the async services.
+
+Each simulated client runs a fixed mix of the API's service calls (flight
+page, seat availability, own bookings page, and a share of bookings) one
+after another; all clients run at once on one event loop, as they would in a
+single uvicorn worker. Reports latency percentiles, throughput and the worst
+event loop stall.
+
+A local SQLite file answers in microseconds, so there is little waiting for
+the async path to overlap; --db-latency-ms adds a simulated round trip to
+every query, as with a database server on the network.
+
+Usage:
+    python -m src.benchmarks.async_concurrency --clients 200 --requests 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.util import await_only
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import (
+    Base, create_db_engine, create_async_db_engine, Airport, Flight, FlightStatus, User, UserRole
+)
+from src.dal.base_dal import BaseDAL
+from src.dal.unit_of_work import UnitOfWork, AsyncUnitOfWork
+from src.bll.flight_service import FlightService
+from src.bll.booking_service import BookingService
+from src.bll.async_flight_service import AsyncFlightService
+from src.bll.async_booking_service import AsyncBookingService
+from src.utils.seat_map import SEAT_POSITIONS, seat_number
+
+# Share of requests per call, in the order they are drawn
+REQUEST_MIX = (
+    ("flights_page", 0.4),
+    ("seat_availability", 0.3),
+    ("bookings_page", 0.2),
+    ("create_booking", 0.1),
+)
+
+def _seed(session, clients: int, flights: int) -> None:
+    BaseDAL(session, Airport).bulk_create([
+        {"code": "LHR", "name": "London Heathrow", "city": "London", "country": "UK"},
+        {"code": "JFK", "name": "John F. Kennedy", "city": "New York", "country": "USA"},
+    ])
+    BaseDAL(session, User).bulk_create([{
+        "username": f"client{i}", "email": f"client{i}@example.com",
+        "password_hash": "x", "role": UserRole.CUSTOMER
+    } for i in range(clients)])
+    departure = datetime.now() + timedelta(days=10)
+    BaseDAL(session, Flight).bulk_create([{
+        "flight_number": f"CC{i}",
+        "departure_airport_id": 1,
+        "arrival_airport_id": 2,
+        "departure_time": departure + timedelta(hours=i),
+        "arrival_time": departure + timedelta(hours=i + 8),
+        "aircraft_type": "Boeing 777",
+        "total_seats": SEAT_POSITIONS,
+        "available_seats": SEAT_POSITIONS,
+        "status": FlightStatus.SCHEDULED,
+        "base_price": 500.0,
+    } for i in range(flights)])
+    session.commit()
+
+def _add_query_latency(engine, seconds: float, blocking: bool) -> None:
+    """Delay every query on the engine by a simulated network round trip."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _delay(conn, cursor, statement, parameters, context, executemany):
+        if blocking:
+            time.sleep(seconds)
+        else:
+            # Async engines run events inside the greenlet of an awaited call
+            await_only(asyncio.sleep(seconds))
+
+def _pick(rng: random.Random) -> str:
+    roll = rng.random()
+    for kind, share in REQUEST_MIX:
+        if roll < share:
+            return kind
+        roll -= share
+    return REQUEST_MIX[-1][0]
+
+def _sync_call(Session, kind: str, user_id: int, flight_id: int, seat: str) -> None:
+    """One request the way the routes used to run it: sync services on the event loop."""
+    with Session() as session:
+        with UnitOfWork(session):
+            if kind == "flights_page":
+                FlightService(session).get_all_flights(limit=20)
+            elif kind == "seat_availability":
+                FlightService(session).get_seat_availability(flight_id)
+            elif kind == "bookings_page":
+                BookingService(session).get_user_bookings_page(user_id, limit=20)
+            else:
+                BookingService(session).create_booking(user_id, flight_id, seat)
+
+async def _async_call(AsyncSession, kind: str, user_id: int, flight_id: int, seat: str) -> None:
+    """One request on the async services, as the routes now run it."""
+    async with AsyncSession() as session:
+        async with AsyncUnitOfWork(session):
+            if kind == "flights_page":
+                await AsyncFlightService(session).get_all_flights(limit=20)
+            elif kind == "seat_availability":
+                await AsyncFlightService(session).get_seat_availability(flight_id)
+            elif kind == "bookings_page":
+                await AsyncBookingService(session).get_user_bookings_page(user_id, limit=20)
+            else:
+                await AsyncBookingService(session).create_booking(user_id, flight_id, seat)
+
+async def _loop_lag_monitor(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Largest delay beyond interval seen between event loop ticks."""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+async def _run(call, factory, clients: int, requests: int, flights: int, seed: int) -> tuple:
+    latencies = []
+
+    async def client(user_id: int):
+        rng = random.Random(seed + user_id)
+        # A request counts from when the client sends it, which is right after
+        # the previous response; waiting for the event loop is part of it
+        issued = time.perf_counter()
+        for _ in range(requests):
+            kind = _pick(rng)
+            flight_id = rng.randint(1, flights)
+            seat = seat_number(rng.randrange(SEAT_POSITIONS))
+            await asyncio.sleep(0)
+            result = call(factory, kind, user_id, flight_id, seat)
+            if asyncio.iscoroutine(result):
+                await result
+            finished = time.perf_counter()
+            latencies.append((finished - issued) * 1000)
+            issued = finished
+
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_loop_lag_monitor(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(client(user_id) for user_id in range(1, clients + 1)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return latencies, elapsed, await monitor
+
+def _percentile(ordered: list, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--flights", type=int, default=50)
+    parser.add_argument("--profile", default="prod-read-heavy")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="simulated round trip per query")
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients x {args.requests} requests, profile {args.profile}, "
+          f"{args.db_latency_ms:g} ms simulated query latency\n")
+    print(f"{'services':<10}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max loop stall ms':>20}")
+    for name in ("sync", "async"):
+        # Fresh database per run so both see the same bookings
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{os.path.join(tmp, 'concurrency.db')}"
+            engine = create_db_engine(url, args.profile)
+            Base.metadata.create_all(engine)
+            Session = sessionmaker(bind=engine)
+            with Session() as session:
+                _seed(session, args.clients, args.flights)
+
+            if name == "sync":
+                if args.db_latency_ms:
+                    _add_query_latency(engine, args.db_latency_ms / 1000, blocking=True)
+                call, factory = _sync_call, Session
+                latencies, elapsed, stall = asyncio.run(
+                    _run(call, factory, args.clients, args.requests, args.flights, args.seed)
+                )
+            else:
+                async_engine = create_async_db_engine(url, args.profile)
+                if args.db_latency_ms:
+                    _add_query_latency(async_engine.sync_engine, args.db_latency_ms / 1000, blocking=False)
+                factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+                async def run_async():
+                    try:
+                        return await _run(_async_call, factory, args.clients, args.requests,
+                                          args.flights, args.seed)
+                    finally:
+                        await async_engine.dispose()
+                latencies, elapsed, stall = asyncio.run(run_async())
+            engine.dispose()
+
+        latencies.sort()
+        print(f"{name:<10}{len(latencies) / elapsed:>8.0f}{statistics.median(latencies):>9.1f}"
+              f"{_percentile(latencies, 0.95):>9.1f}{_percentile(latencies, 0.99):>9.1f}{stall * 1000:>20.1f}")
+
+if __name__ == "__main__":
+    main()
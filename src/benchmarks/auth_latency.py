@@ -0,0 +1,73 @@
+"""
+Latency of the get_current_user -> get_current_active_user dependency chain
+with cold caches (JWT decode plus a user query on every request, as before
+the principal cache) and with warm caches.
+
+Usage:
+    python -m src.benchmarks.auth_latency --requests 5000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.models.database import Base, create_db_engine, create_async_db_engine, UserRole
+from src import auth
+from src.auth import create_access_token, get_current_active_user, get_current_user
+from src.dal.user_dal import UserDAL
+from src.principal_cache import token_cache, user_cache
+
+_loop = asyncio.new_event_loop()
+
+async def _authenticate(token: str):
+    return await get_current_active_user(await get_current_user(token))
+
+def _run(token: str, requests: int, cold: bool) -> list:
+    latencies = []
+    for _ in range(requests):
+        if cold:
+            token_cache.clear()
+            user_cache.clear()
+        started = time.perf_counter()
+        _loop.run_until_complete(_authenticate(token))
+        latencies.append((time.perf_counter() - started) * 1e6)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'auth.db')}"
+        engine = create_db_engine(url)
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            UserDAL(session).create_user("bench", "bench@example.com", "benchpassword", UserRole.CUSTOMER)
+        token = create_access_token({"sub": "bench"})
+
+        # Cache misses read the user through the async session factory
+        async_engine = create_async_db_engine(url)
+        auth.AsyncSessionLocal.configure(bind=async_engine)
+
+        queries = {"count": 0}
+        event.listen(async_engine.sync_engine, "before_cursor_execute",
+                     lambda *args: queries.__setitem__("count", queries["count"] + 1))
+
+        print(f"{'caches':<8}{'requests':>10}{'p50 us':>10}{'p99 us':>10}{'queries/req':>13}")
+        for name, cold in (("cold", True), ("warm", False)):
+            queries["count"] = 0
+            latencies = sorted(_run(token, args.requests, cold))
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print(f"{name:<8}{args.requests:>10}{statistics.median(latencies):>10.1f}{p99:>10.1f}"
+                  f"{queries['count'] / args.requests:>13.2f}")
+        _loop.run_until_complete(async_engine.dispose())
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
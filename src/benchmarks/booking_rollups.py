@@ -0,0 +1,225 @@
+"""
+Check the booking rollups through incremental refreshes, then time building
+them, refreshing them and reporting from them against grouping the bookings
+in SQL for every report.
+
+Bookings are bulk loaded, rolled up, then booked, cancelled and rescheduled
+through the services and the ORM between incremental refreshes. The refreshed
+rollup must match one rebuilt from scratch cell for cell, and its route and
+day totals must match the route inventory aggregation. Exits non-zero on
+any difference.
+
+Usage:
+    python -m src.benchmarks.booking_rollups --flights 50000 --bookings 10000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select, func, case
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Base, create_db_engine, Airport, Booking, Flight, FlightStatus, User, UserRole
+from src.dal.analytics_dal import AnalyticsDAL
+from src.dal.base_dal import BaseDAL
+from src.dal.flight_events import on_flights_committed
+from src.dal.inventory_dal import InventoryDAL, REVENUE_TOLERANCE
+from src.dal.unit_of_work import UnitOfWork
+from src.bll.booking_service import BookingService
+from src.bll.booking_analytics import BookingRollup, report_rows, ROUTE, DAY, HOUR, LEAD_TIME
+from src.utils.seat_map import SEAT_POSITIONS, seat_number
+
+_LOAD_CHUNK_SIZE = 100000
+
+def _seed(session, rng: random.Random, flights: int, airports: int, bookings: int, start: datetime) -> None:
+    """Flights over two months and bookings spread evenly over them, one seat each."""
+    BaseDAL(session, Airport).bulk_create([
+        {"code": f"{i:03d}", "name": f"Airport {i}", "city": f"City {i}", "country": "XX"}
+        for i in range(airports)
+    ])
+    BaseDAL(session, User).bulk_create([{
+        "username": "load", "email": "load@example.com", "password_hash": "x", "role": UserRole.CUSTOMER
+    }])
+    departures = []
+    rows = []
+    for i in range(flights):
+        origin = rng.randrange(airports)
+        departure = start + timedelta(minutes=rng.randrange(60 * 24 * 60))
+        departures.append(departure)
+        rows.append({
+            "flight_number": f"RU{i}",
+            "departure_airport_id": origin + 1,
+            "arrival_airport_id": (origin + rng.randrange(1, airports)) % airports + 1,
+            "departure_time": departure,
+            "arrival_time": departure + timedelta(hours=3),
+            "aircraft_type": "Boeing 777",
+            "total_seats": SEAT_POSITIONS,
+            "available_seats": SEAT_POSITIONS,
+            "status": FlightStatus.SCHEDULED,
+            "base_price": rng.randint(50, 900),
+        })
+    BaseDAL(session, Flight).bulk_create(rows)
+
+    if bookings > flights * SEAT_POSITIONS:
+        raise SystemExit(f"at most {flights * SEAT_POSITIONS} bookings fit on {flights} flights")
+    dal = BaseDAL(session, Booking)
+    for first in range(0, bookings, _LOAD_CHUNK_SIZE):
+        rows = []
+        for i in range(first, min(first + _LOAD_CHUNK_SIZE, bookings)):
+            flight = i % flights
+            rows.append({
+                "user_id": 1, "flight_id": flight + 1,
+                "seat_number": seat_number(i // flights),
+                "booking_status": "cancelled" if rng.random() < 0.1 else "confirmed",
+                "total_price": rng.randint(50, 900),
+                "booking_date": departures[flight] - timedelta(minutes=rng.randrange(120 * 24 * 60)),
+            })
+        dal.bulk_create(rows, chunk_size=_LOAD_CHUNK_SIZE)
+    session.commit()
+
+def _exercise(Session, rng: random.Random, flights: int, operations: int) -> None:
+    """Bookings, cancellations (of new and bulk loaded bookings) and rescheduled flights."""
+    booked = []
+    for _ in range(operations):
+        with Session() as session:
+            with UnitOfWork(session):
+                roll = rng.random()
+                service = BookingService(session)
+                if roll < 0.6:
+                    result = service.create_booking(1, rng.randint(1, flights),
+                                                    seat_number(rng.randrange(SEAT_POSITIONS)))
+                    if result:
+                        booked.append(result['booking_id'])
+                elif roll < 0.9:
+                    booking_id = booked.pop() if booked and rng.random() < 0.5 else rng.randint(1, 1000)
+                    service.cancel_booking(booking_id, 1)
+                else:
+                    flight = session.get(Flight, rng.randint(1, flights))
+                    flight.departure_time += timedelta(days=rng.randint(-20, 20), minutes=rng.randint(0, 600))
+                    flight.arrival_time = flight.departure_time + timedelta(hours=3)
+
+def _check(session, rollup: BookingRollup) -> list:
+    """Differences from a rollup rebuilt from scratch and from the inventory aggregation."""
+    problems = []
+    fresh = BookingRollup()
+    fresh.rebuild(session)
+    for group_by in ((ROUTE, DAY, HOUR, LEAD_TIME), (ROUTE, DAY), (LEAD_TIME,)):
+        have, want = rollup.report(group_by), fresh.report(group_by)
+        for name in want:
+            if len(have[name]) != len(want[name]):
+                problems.append(f"{'/'.join(group_by)}: {len(have[name])} rows, expected {len(want[name])}")
+                break
+            if name == 'revenue' or name == 'load_factor':
+                same = np.allclose(have[name], want[name], atol=REVENUE_TOLERANCE)
+            else:
+                same = (have[name] == want[name]).all()
+            if not same:
+                problems.append(f"{'/'.join(group_by)}: {name} differs from a rebuild")
+
+    codes = AnalyticsDAL(session).get_airport_codes()
+    inventory = {
+        (codes[row[0]], codes[row[1]], row[2]): row for row in session.execute(InventoryDAL._aggregate())
+    }
+    for row in report_rows(rollup.report((ROUTE, DAY))):
+        key = (row['departure_airport'], row['arrival_airport'], row['departure_date'])
+        if key not in inventory:
+            problems.append(f"{row['departure_airport']}-{row['arrival_airport']} {row['departure_date']}: "
+                            f"not in the inventory aggregation")
+            continue
+        expected = inventory.pop(key)
+        got = (row['flights'], row['seats'], row['bookings'], row['revenue'], row['cancellations'])
+        want = (expected[3], expected[4], expected[6], expected[7], expected[8])
+        if any(abs(a - b) > REVENUE_TOLERANCE for a, b in zip(got, want)):
+            problems.append(f"{row['departure_airport']}-{row['arrival_airport']} {row['departure_date']}: "
+                            f"{got}, expected {want}")
+    for key in inventory:
+        problems.append(f"{key}: missing from the rollup")
+    return problems
+
+def _sql_report(session, group_by_hour_and_lead: bool):
+    """The route/day (or hour/lead time) report grouped in SQL over every booking."""
+    bookings = AnalyticsDAL._with_lead_days(session.connection().dialect.name, ())
+    confirmed = bookings.c.booking_status == "confirmed"
+    if group_by_hour_and_lead:
+        dimensions = [func.strftime('%H', Flight.departure_time), AnalyticsDAL._lead_time_bucket(bookings.c.lead_days)]
+    else:
+        dimensions = [Flight.departure_airport_id, Flight.arrival_airport_id, func.date(Flight.departure_time)]
+    stmt = select(
+        *dimensions,
+        func.sum(case((confirmed, 1), else_=0)),
+        func.sum(case((confirmed, bookings.c.total_price), else_=0.0)),
+        func.sum(case((confirmed, 0), else_=1))
+    ).join(Flight, bookings.c.flight_id == Flight.id).group_by(*dimensions)
+    return session.execute(stmt).all()
+
+def _seconds(action) -> tuple:
+    began = time.perf_counter()
+    result = action()
+    return result, time.perf_counter() - began
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--flights", type=int, default=20000)
+    parser.add_argument("--airports", type=int, default=50)
+    parser.add_argument("--bookings", type=int, default=1000000, help="bulk loaded bookings")
+    parser.add_argument("--operations", type=int, default=500, help="service calls between refreshes")
+    parser.add_argument("--rounds", type=int, default=3, help="incremental refreshes checked")
+    parser.add_argument("--seed", type=int, default=19)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    start = (datetime.now() + timedelta(days=2)).replace(hour=0, minute=0, second=0, microsecond=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'rollups.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as session:
+            _, load_seconds = _seconds(lambda: _seed(session, rng, args.flights, args.airports,
+                                                     args.bookings, start))
+        print(f"loaded {args.bookings} bookings on {args.flights} flights in {load_seconds:.1f} s")
+
+        rollup = BookingRollup()
+        # Rescheduled flights reach the refresh through the commit listener, as for the shared rollup
+        on_flights_committed(lambda bind, flight_ids: rollup.mark_flights_changed(flight_ids))
+        with Session() as session:
+            stats, build_seconds = _seconds(lambda: rollup.rebuild(session))
+        print(f"full build: {stats['cells']} cells in {build_seconds:.2f} s\n")
+
+        refresh_seconds = []
+        for round_number in range(args.rounds):
+            _exercise(Session, rng, args.flights, args.operations)
+            with Session() as session:
+                stats, seconds = _seconds(lambda: rollup.refresh(session))
+                refresh_seconds.append(seconds)
+                problems = _check(session, rollup)
+            if problems:
+                print(f"{len(problems)} differences after refresh {round_number + 1}:")
+                for problem in problems[:20]:
+                    print(f"  {problem}")
+                sys.exit(1)
+            print(f"refresh {round_number + 1}: {stats['bookings']} bookings, {stats['cancellations']} "
+                  f"cancellations, {stats['rescheduled_flights']} rescheduled flights "
+                  f"in {seconds * 1000:.0f} ms; matches a rebuild and the inventory")
+
+        print(f"\n{'report':<28}{'rows':>8}{'rollup ms':>11}{'SQL ms':>10}")
+        with Session() as session:
+            for name, group_by, hour_and_lead in (
+                ("route x day", (ROUTE, DAY), False),
+                ("hour x lead time", (HOUR, LEAD_TIME), True),
+            ):
+                columns, rollup_seconds = _seconds(lambda: rollup.report(group_by))
+                _, sql_seconds = _seconds(lambda: _sql_report(session, hour_and_lead))
+                print(f"{name:<28}{len(columns['bookings']):>8}{rollup_seconds * 1000:>11.1f}"
+                      f"{sql_seconds * 1000:>10.0f}")
+            columns, seconds = _seconds(lambda: rollup.report((ROUTE, DAY, HOUR, LEAD_TIME)))
+            print(f"{'route x day x hour x lead':<28}{len(columns['bookings']):>8}{seconds * 1000:>11.1f}"
+                  f"{'':>10}")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
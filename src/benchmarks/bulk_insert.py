@@ -0,0 +1,90 @@
+"""
+Per-row ORM inserts versus the BaseDAL bulk paths.
+
+Usage:
+    python -m src.benchmarks.bulk_insert --rows 50000 --chunk-size 1000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Base, create_db_engine, Airport, FlightStatus
+from src.dal.base_dal import BaseDAL
+from src.dal.flight_dal import FlightDAL
+from src.dal.unit_of_work import UnitOfWork
+
+def _flight_rows(count: int, prefix: str) -> list:
+    now = datetime.now()
+    return [{
+        "flight_number": f"{prefix}{i}",
+        "departure_airport_id": 1,
+        "arrival_airport_id": 2,
+        "departure_time": now + timedelta(minutes=i),
+        "arrival_time": now + timedelta(minutes=i, hours=2),
+        "aircraft_type": "Airbus A320",
+        "total_seats": 180,
+        "available_seats": 180,
+        "status": FlightStatus.SCHEDULED,
+        "base_price": 120.0,
+    } for i in range(count)]
+
+def _per_row_commit(session, rows):
+    dal = FlightDAL(session)
+    for row in rows:
+        dal.create(**row)
+
+def _per_row_unit_of_work(session, rows):
+    dal = FlightDAL(session)
+    with UnitOfWork(session):
+        for row in rows:
+            dal.create(**row)
+
+def _bulk_create(session, rows, chunk_size):
+    FlightDAL(session).bulk_create(rows, chunk_size=chunk_size)
+
+def _bulk_create_ids(session, rows, chunk_size):
+    FlightDAL(session).bulk_create(rows, chunk_size=chunk_size, return_ids=True)
+
+def _upsert(session, rows, chunk_size):
+    FlightDAL(session).upsert_flights(rows, chunk_size=chunk_size)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--per-row-rows", type=int, default=2000,
+                        help="rows for the per-row commit path, which is far slower")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    cases = [
+        ("create() per row, commit each", lambda s, r: _per_row_commit(s, r), args.per_row_rows),
+        ("create() per row, one unit of work", lambda s, r: _per_row_unit_of_work(s, r), args.rows),
+        ("bulk_create", lambda s, r: _bulk_create(s, r, args.chunk_size), args.rows),
+        ("bulk_create(return_ids=True)", lambda s, r: _bulk_create_ids(s, r, args.chunk_size), args.rows),
+        ("upsert (insert path)", lambda s, r: _upsert(s, r, args.chunk_size), args.rows),
+    ]
+
+    print(f"{'path':<38}{'rows':>10}{'seconds':>10}{'rows/s':>12}")
+    for name, run, count in cases:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bulk.db')}")
+            Base.metadata.create_all(engine)
+            Session = sessionmaker(bind=engine)
+            with Session() as session:
+                BaseDAL(session, Airport).bulk_create([
+                    {"code": "AAA", "name": "A", "city": "A", "country": "X"},
+                    {"code": "BBB", "name": "B", "city": "B", "country": "X"},
+                ])
+                rows = _flight_rows(count, "BK")
+                started = time.perf_counter()
+                run(session, rows)
+                elapsed = time.perf_counter() - started
+            engine.dispose()
+        print(f"{name:<38}{count:>10}{elapsed:>10.2f}{count / elapsed:>12.0f}")
+
+if __name__ == "__main__":
+    main()
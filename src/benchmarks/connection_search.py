@@ -0,0 +1,176 @@
+"""
+Multi-leg connection search: check the pruned graph search against brute
+force, then time two-stop queries on a full day's schedule.
+
+The check enumerates every itinerary allowed by the connection rules on a
+small random network and compares the ranking keys of the best ones with
+the graph search's, for both objectives; exits non-zero on a mismatch.
+
+Usage:
+    python -m src.benchmarks.connection_search --flights 50000 --airports 200 --searches 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Base, create_db_engine, Airport, Flight, FlightStatus
+from src.dal.base_dal import BaseDAL
+from src.bll.pricing import quote_fare
+from src.bll.connection_search import (
+    ConnectionGraph, CHEAPEST, EARLIEST_ARRIVAL, MIN_CONNECTION_MINUTES, MAX_CONNECTION_MINUTES
+)
+
+def _seed(session, flights_per_day: int, airport_count: int, days: int, seed: int) -> tuple:
+    BaseDAL(session, Airport).bulk_create([
+        {"code": f"{i:03d}", "name": f"Airport {i}", "city": f"City {i}", "country": "XX"}
+        for i in range(airport_count)
+    ])
+    start = (datetime.now() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    rng = random.Random(seed)
+    rows = []
+    for i in range(flights_per_day * days):
+        origin = rng.randrange(airport_count)
+        destination = (origin + rng.randrange(1, airport_count)) % airport_count
+        departure = start + timedelta(minutes=rng.randrange(days * 24 * 60))
+        total_seats = rng.choice([50, 180, 300])
+        rows.append({
+            "flight_number": f"CX{i}",
+            "departure_airport_id": origin + 1,
+            "arrival_airport_id": destination + 1,
+            "departure_time": departure,
+            "arrival_time": departure + timedelta(minutes=rng.randrange(45, 12 * 60)),
+            "aircraft_type": "Airbus A320",
+            "total_seats": total_seats,
+            "available_seats": rng.randint(0, total_seats),
+            "status": FlightStatus.SCHEDULED if rng.random() < 0.95 else FlightStatus.CANCELLED,
+            "base_price": rng.randint(40, 900) + rng.choice([0.0, 0.5, 0.99]),
+        })
+    BaseDAL(session, Flight).bulk_create(rows)
+    session.commit()
+    return start, rows
+
+def _brute_force(rows: list, origin: str, destination: str, day: datetime, max_stops: int,
+                 objective: str, limit: int, now: datetime) -> list:
+    """Ranking keys of the best itineraries, from every itinerary the rules allow."""
+    min_gap = timedelta(minutes=MIN_CONNECTION_MINUTES)
+    max_gap = timedelta(minutes=MAX_CONNECTION_MINUTES)
+    bookable = [
+        (f"{row['departure_airport_id'] - 1:03d}", f"{row['arrival_airport_id'] - 1:03d}", row,
+         quote_fare(row["base_price"], row["departure_time"], row["available_seats"],
+                    row["total_seats"], now=now))
+        for row in rows
+        if row["status"] == FlightStatus.SCHEDULED and row["available_seats"] > 0
+    ]
+    keys = []
+
+    def extend(legs: list, visited: set):
+        last = legs[-1]
+        if last[1] == destination:
+            total = round(sum(leg[3] for leg in legs), 2)
+            arrival = last[2]["arrival_time"]
+            keys.append((total, arrival, len(legs)) if objective == CHEAPEST else (arrival, len(legs), total))
+            return
+        if len(legs) > max_stops:
+            return
+        for leg in bookable:
+            if (leg[0] == last[1] and leg[1] not in visited
+                    and last[2]["arrival_time"] + min_gap <= leg[2]["departure_time"]
+                    <= last[2]["arrival_time"] + max_gap):
+                extend(legs + [leg], visited | {leg[1]})
+
+    for leg in bookable:
+        if leg[0] == origin and leg[2]["departure_time"].date() == day.date() and leg[1] != origin:
+            extend([leg], {origin, leg[1]})
+    return sorted(keys)[:limit]
+
+def _graph_keys(itineraries: list, objective: str) -> list:
+    keys = []
+    for itinerary in itineraries:
+        legs = len(itinerary["legs"])
+        if objective == CHEAPEST:
+            keys.append((itinerary["price"], itinerary["arrival_time"], legs))
+        else:
+            keys.append((itinerary["arrival_time"], legs, itinerary["price"]))
+    return keys
+
+def _open(tmp: str, name: str):
+    engine = create_db_engine(f"sqlite:///{os.path.join(tmp, name)}")
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(bind=engine)
+
+def _check(tmp: str, seed: int, queries: int) -> int:
+    engine, Session = _open(tmp, "check.db")
+    with Session() as session:
+        start, rows = _seed(session, flights_per_day=250, airport_count=12, days=2, seed=seed)
+        graph = ConnectionGraph()
+        graph.load(session.connection())
+    engine.dispose()
+
+    rng = random.Random(seed)
+    now = datetime.now()
+    for _ in range(queries):
+        origin, destination = (f"{code:03d}" for code in rng.sample(range(12), 2))
+        max_stops = rng.randint(0, 2)
+        limit = rng.choice([1, 3, 10])
+        for objective in (CHEAPEST, EARLIEST_ARRIVAL):
+            expected = _brute_force(rows, origin, destination, start, max_stops, objective, limit, now)
+            got = _graph_keys(graph.search(origin, destination, start, max_stops=max_stops,
+                                           objective=objective, limit=limit, now=now), objective)
+            if got != expected:
+                print(f"MISMATCH {origin}->{destination} stops<={max_stops} {objective} limit {limit}:")
+                print(f"  brute force: {expected}")
+                print(f"  graph:       {got}")
+                sys.exit(1)
+    return queries * 2
+
+def _percentile(ordered: list, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--flights", type=int, default=50000, help="flights per day")
+    parser.add_argument("--airports", type=int, default=200)
+    parser.add_argument("--days", type=int, default=2)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--checks", type=int, default=100, help="brute force comparisons per objective")
+    parser.add_argument("--seed", type=int, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        checked = _check(tmp, args.seed, args.checks)
+        print(f"{checked} searches match brute force\n")
+
+        engine, Session = _open(tmp, "connections.db")
+        with Session() as session:
+            start, _ = _seed(session, args.flights, args.airports, args.days, args.seed)
+            graph = ConnectionGraph()
+            started = time.perf_counter()
+            loaded = graph.load(session.connection())
+            print(f"loaded {loaded} bookable flights in {time.perf_counter() - started:.2f} s")
+        engine.dispose()
+
+    rng = random.Random(args.seed)
+    queries = [tuple(f"{code:03d}" for code in rng.sample(range(args.airports), 2))
+               for _ in range(args.searches)]
+    print(f"{args.searches} two-stop searches, {args.flights} flights per day, {args.airports} airports\n")
+    print(f"{'objective':<18}{'p50 ms':>9}{'p99 ms':>9}{'results':>9}")
+    for objective in (EARLIEST_ARRIVAL, CHEAPEST):
+        latencies = []
+        found = 0
+        for origin, destination in queries:
+            began = time.perf_counter()
+            found += len(graph.search(origin, destination, start, max_stops=2, objective=objective))
+            latencies.append((time.perf_counter() - began) * 1000)
+        latencies.sort()
+        print(f"{objective:<18}{statistics.median(latencies):>9.1f}{_percentile(latencies, 0.99):>9.1f}"
+              f"{found / len(queries):>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+"""
+Seeded synthetic datasets for scale testing, shared by the benchmarks and
+load tests: airports, users, a hub-and-spoke flight network and bookings
+with realistic lead times and seat choices.
+
+Everything is drawn from one NumPy generator, so the same preset, seed and
+as-of time always give the same rows (bar the users' bcrypt salt). Flights
+depart over the preset's days centred on the as-of time; departed flights
+are completed and mostly full, later ones partly sold as their booking
+window has only partly elapsed, and every booking is made before as-of.
+Rows are written with bulk_create into an empty database, with the
+non-unique indexes dropped for the load and the route inventory rebuilt
+after it. --verify generates the preset twice and compares exports.
+
+Usage:
+    python -m src.benchmarks.datasets small --url sqlite:///small.db
+    python -m src.benchmarks.datasets airline-scale --url sqlite:///scale.db
+    python -m src.benchmarks.datasets medium --verify
+"""
+import argparse
+import hashlib
+import math
+import os
+import string
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, NamedTuple, Optional, Union
+
+import numpy as np
+from sqlalchemy import select, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import (
+    Base, DATABASE_URL, create_db_engine, drop_indexes, ensure_indexes,
+    Airport, Booking, Flight, FlightStatus, User, UserRole
+)
+from src.dal.base_dal import BaseDAL
+from src.dal.inventory_dal import InventoryDAL
+from src.bll.export_service import ExportService
+from src.password_hashing import password_hasher
+from src.utils.seat_map import seat_layout
+
+class DatasetSize(NamedTuple):
+    airports: int
+    users: int
+    flights: int
+    bookings: int
+    # Days of departures, half before the as-of time and half after
+    days: int
+
+PRESETS = {
+    "small": DatasetSize(airports=40, users=2000, flights=1500, bookings=200000, days=60),
+    "medium": DatasetSize(airports=300, users=100000, flights=15000, bookings=2000000, days=90),
+    "airline-scale": DatasetSize(airports=1000, users=1000000, flights=80000, bookings=10000000, days=120),
+}
+
+# Every generated user's password; user 1 is the admin "admin", then STAFF_USERS staff
+DEFAULT_PASSWORD = "password"
+STAFF_USERS = 10
+
+# Where cached_dataset() keeps generated databases
+DATASET_DIR = os.getenv("DATASET_DIR", os.path.join(tempfile.gettempdir(), "airconnect-datasets"))
+
+# Part of the cached file names; bump it when generation changes so old files are not reused
+DATASET_VERSION = 2
+
+_LOAD_CHUNK_SIZE = 100000
+
+# Share of departures in each hour of the day, peaking in the morning and evening banks
+_HOURLY_DEPARTURES = np.array([1, 0.5, 0.3, 0.3, 0.5, 2, 6, 8, 7, 6, 5, 5, 6, 5, 5, 6, 7, 8, 7, 6, 5, 4, 3, 2])
+
+# (aircraft, seats) flown up to each distance in km
+_FLEET = (
+    (800, (("Embraer E190", 100), ("Airbus A220", 130))),
+    (4000, (("Airbus A320", 180), ("Boeing 737", 189), ("Airbus A321", 220))),
+    (math.inf, (("Boeing 787", 250), ("Airbus A330", 300), ("Boeing 777", 350))),
+)
+
+# Lead times are a mix of business (short) and leisure (long) bookings,
+# each exponential: (share of bookings, mean days booked ahead)
+_LEAD_TIME_MIX = ((0.45, 6.0), (0.55, 40.0))
+_MAX_LEAD_DAYS = 330
+# Seats left unsold even on the fullest flights
+_MAX_LOAD_FACTOR = 0.98
+
+_COUNTRIES = ("UK", "USA", "France", "Germany", "Spain", "Italy", "Netherlands", "Ireland", "Canada",
+              "Brazil", "Mexico", "Japan", "China", "India", "Singapore", "Australia", "UAE", "Turkey",
+              "South Africa", "Egypt")
+
+def _minutes(values) -> np.ndarray:
+    return np.asarray(values, dtype="datetime64[m]")
+
+def _datetimes(values: np.ndarray) -> list:
+    """datetime64 values as Python datetimes, as the DateTime columns take them."""
+    return values.astype("datetime64[us]").tolist()
+
+def _distances(lat, lon, origin, destination) -> np.ndarray:
+    """Great-circle distances in km between airport indexes."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    dlat = lat[destination] - lat[origin]
+    dlon = lon[destination] - lon[origin]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[origin]) * np.cos(lat[destination]) * np.sin(dlon / 2) ** 2
+    return 2 * 6371 * np.arcsin(np.sqrt(a))
+
+def _booked_share(days_ahead: np.ndarray) -> np.ndarray:
+    """Share of a flight's bookings already made days_ahead days before departure."""
+    return sum(share * np.exp(-days_ahead / mean) for share, mean in _LEAD_TIME_MIX)
+
+def _lead_days(rng: np.random.Generator, days_ahead: np.ndarray) -> np.ndarray:
+    """Lead times of bookings on flights departing days_ahead after as-of, so all are made by then.
+
+    Given lead >= days_ahead each exponential is days_ahead plus a fresh draw,
+    with the mix reweighted by how likely each kind is to book that early.
+    """
+    (business_share, business_mean), (leisure_share, leisure_mean) = _LEAD_TIME_MIX
+    business = business_share * np.exp(-days_ahead / business_mean)
+    leisure = leisure_share * np.exp(-days_ahead / leisure_mean)
+    is_business = rng.random(len(days_ahead)) * (business + leisure) < business
+    lead = days_ahead + rng.exponential(np.where(is_business, business_mean, leisure_mean))
+    # At least an hour ahead, and never before booking opens
+    return np.clip(lead, days_ahead + 1 / 24, np.maximum(_MAX_LEAD_DAYS, days_ahead + 1 / 24))
+
+def _seat_orders(rng: np.random.Generator, fleet) -> Dict[str, np.ndarray]:
+    """Seat numbers in the order passengers pick them, per (aircraft, seats) of the fleet.
+
+    Window seats and the front of the cabin go first, with some noise.
+    """
+    orders = {}
+    for aircraft_type, seats in sorted(fleet):
+        layout = seat_layout(aircraft_type, seats)
+        abreast = len(layout.letters)
+        positions = np.arange(seats)
+        rows, letters = positions // abreast, positions % abreast
+        window = (letters == 0) | (letters == abreast - 1)
+        score = rows / layout.rows + np.where(window, 0.0, 0.25) + rng.normal(0, 0.15, seats)
+        orders[aircraft_type] = np.array(layout.seat_numbers(), dtype=object)[np.argsort(score, kind="stable")]
+    return orders
+
+def _booking_counts(weight: np.ndarray, capacity: np.ndarray, bookings: int) -> np.ndarray:
+    """Split bookings over flights in proportion to weight, at most capacity each."""
+    if capacity.sum() < bookings:
+        raise ValueError(f"{bookings} bookings do not fit: the flights have room for {capacity.sum()}")
+    # The scale factor at which the capped shares add up to the bookings
+    low, high = 0.0, 1.0
+    while np.minimum(capacity, high * weight).sum() < bookings:
+        high *= 2
+    for _ in range(60):
+        middle = (low + high) / 2
+        if np.minimum(capacity, middle * weight).sum() < bookings:
+            low = middle
+        else:
+            high = middle
+    share = np.minimum(capacity, high * weight)
+    counts = np.floor(share).astype(np.int64)
+    # Hand what rounding down left over to the largest remainders
+    short = bookings - int(counts.sum())
+    if short > 0:
+        remainder = np.where(counts < capacity, share - counts, -1.0)
+        counts[np.argpartition(-remainder, short - 1)[:short]] += 1
+    elif short < 0:
+        counts[np.argpartition(-counts, -short - 1)[:-short]] -= 1
+    return counts
+
+def _check_empty(engine: Engine) -> None:
+    with engine.connect() as conn:
+        for model in (Airport, User, Flight, Booking):
+            if conn.execute(select(func.count()).select_from(model)).scalar():
+                raise ValueError(f"The database already has {model.__tablename__}; generate into an empty one")
+
+def generate(engine: Engine, size: Union[str, DatasetSize], seed: int = 0, as_of: Optional[datetime] = None,
+             progress: Optional[Callable[[str], None]] = None) -> Dict[str, int]:
+    """Fill an empty database with a synthetic dataset; returns the row counts."""
+    size = PRESETS[size] if isinstance(size, str) else size
+    as_of = as_of or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    progress = progress or (lambda message: None)
+    rng = np.random.default_rng(seed)
+    Base.metadata.create_all(engine)
+    _check_empty(engine)
+    now = np.datetime64(as_of, "m")
+
+    # Airports: a few hubs with Zipf-like traffic spread around the world, and
+    # much smaller spokes clustered around the hub that is their home
+    letters = np.array(list(string.ascii_uppercase))
+    all_codes = np.char.add(np.char.add(letters[:, None, None], letters[None, :, None]), letters[None, None, :])
+    codes = rng.permutation(all_codes.ravel())[:size.airports]
+    hubs = max(2, size.airports // 25)
+    spokes = np.arange(hubs, size.airports)
+    traffic = np.concatenate([20 / np.arange(1, hubs + 1) ** 0.8, rng.lognormal(0, 0.7, len(spokes))])
+    hub_weight = traffic[:hubs] / traffic[:hubs].sum()
+    home = np.concatenate([np.arange(hubs), rng.choice(hubs, len(spokes), p=hub_weight)])
+    lat = rng.uniform(-40, 60, hubs)[home] + np.concatenate([np.zeros(hubs), rng.normal(0, 5, len(spokes))])
+    lon = rng.uniform(-120, 145, hubs)[home] + np.concatenate([np.zeros(hubs), rng.normal(0, 7, len(spokes))])
+    countries = rng.integers(0, len(_COUNTRIES), hubs)[home]
+
+    # Routes: hub to hub, each spoke to its home hub and sometimes a second
+    # one, and some point to point between spokes of the same hub
+    pairs = [(a, b) for a in range(hubs) for b in range(hubs) if a != b]
+    for spoke in spokes:
+        pairs += [(spoke, home[spoke]), (home[spoke], spoke)]
+        if rng.random() < 0.4:
+            hub = rng.choice(hubs, p=hub_weight)
+            if hub != home[spoke]:
+                pairs += [(spoke, hub), (hub, spoke)]
+    for a in rng.choice(spokes, size=size.airports // 10):
+        neighbours = spokes[(home[spokes] == home[a]) & (spokes != a)]
+        if len(neighbours):
+            b = rng.choice(neighbours)
+            pairs += [(a, b), (b, a)]
+    routes = np.unique(np.array(pairs), axis=0)
+    route_weight = traffic[routes[:, 0]] * traffic[routes[:, 1]]
+
+    # Flights: spread over routes by traffic, days evenly, hours by the daily banks
+    route = np.repeat(np.arange(len(routes)), rng.multinomial(size.flights, route_weight / route_weight.sum()))
+    origin, destination = routes[route, 0], routes[route, 1]
+    distance = _distances(lat, lon, origin, destination)
+    first_day = _minutes(as_of.date()) - np.timedelta64(size.days // 2 * 24 * 60, "m")
+    departure = (first_day
+                 + rng.integers(0, size.days, size.flights) * np.timedelta64(24 * 60, "m")
+                 + rng.choice(24, size.flights, p=_HOURLY_DEPARTURES / _HOURLY_DEPARTURES.sum())
+                 * np.timedelta64(60, "m")
+                 + rng.integers(0, 12, size.flights) * np.timedelta64(5, "m"))
+    duration = (30 + np.round(distance / 800 * 12) * 5).astype(np.int64)
+    aircraft = np.empty(size.flights, dtype=object)
+    seats = np.empty(size.flights, dtype=np.int64)
+    band_start = 0.0
+    for band_end, fleet in _FLEET:
+        in_band = np.flatnonzero((distance >= band_start) & (distance < band_end))
+        pick = rng.integers(0, len(fleet), len(in_band))
+        aircraft[in_band] = [fleet[i][0] for i in pick]
+        seats[in_band] = [fleet[i][1] for i in pick]
+        band_start = band_end
+    base_price = np.round(40 + 0.11 * distance * rng.uniform(0.8, 1.25, size.flights), 2)
+    # Flights are numbered, and get their IDs, in departure order
+    order = np.argsort(departure, kind="stable")
+    origin, destination, departure, duration = origin[order], destination[order], departure[order], duration[order]
+    aircraft, seats, base_price, route = aircraft[order], seats[order], base_price[order], route[order]
+    days_ahead = np.maximum(0, (departure - now) / np.timedelta64(1, "D"))
+
+    # Bookings per flight: popular routes and departed flights sell most seats
+    popularity = rng.beta(6, 2, size.flights) * (route_weight[route] / route_weight.max()) ** 0.2
+    counts = _booking_counts(seats * _booked_share(days_ahead) * popularity,
+                             np.floor(seats * _MAX_LOAD_FACTOR).astype(np.int64), size.bookings)
+    flight = np.repeat(np.arange(size.flights), counts)
+    lead = _lead_days(rng, days_ahead[flight])
+    # Within a flight, earlier bookings come first and pick the better seats
+    by_flight = np.lexsort((-lead, flight))
+    lead = lead[by_flight]
+    ordinal = np.arange(size.bookings) - np.repeat(np.cumsum(counts) - counts, counts)
+    seat = np.empty(size.bookings, dtype=object)
+    booking_aircraft = aircraft[flight]
+    fleet = {plane for _, planes in _FLEET for plane in planes}
+    for aircraft_type, seat_order in _seat_orders(rng, fleet).items():
+        on_type = booking_aircraft == aircraft_type
+        seat[on_type] = seat_order[ordinal[on_type]]
+    booking_date = departure[flight] - (lead * 24 * 60).astype("timedelta64[m]")
+    # Long-lead bookings are cancelled more often; a cancelled seat is not resold
+    cancelled = rng.random(size.bookings) < np.where(lead > 30, 0.12, 0.05)
+    price = np.round(base_price[flight] * (1 + 0.6 * np.exp(-lead / 14)) * rng.uniform(0.9, 1.1, size.bookings), 2)
+    confirmed = np.bincount(flight[~cancelled], minlength=size.flights)
+
+    # Users: frequent flyers at the low IDs book far more than the rest
+    customers = size.users - 1 - STAFF_USERS
+    if customers < 1:
+        raise ValueError(f"A dataset needs more than {STAFF_USERS + 1} users")
+    customer = np.floor(customers * rng.random(size.bookings) ** 1.3).astype(np.int64)
+    signup = now - (rng.integers(0, 3 * 365 * 24 * 60, size.users)).astype("timedelta64[m]")
+
+    # Bookings are inserted in the order they were made
+    made = np.argsort(booking_date, kind="stable")
+    progress(f"planned {size.flights} flights on {len(routes)} routes and {size.bookings} bookings")
+
+    counts_by_table = {}
+    dropped = drop_indexes(engine, Flight.__table__) + drop_indexes(engine, Booking.__table__)
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        airport_ids = np.array(BaseDAL(session, Airport).bulk_create([{
+            "code": code, "name": f"{code} International", "city": f"City {code}",
+            "country": _COUNTRIES[country]
+        } for code, country in zip(codes.tolist(), countries.tolist())], return_ids=True))
+        counts_by_table["airports"] = size.airports
+
+        password_hash = password_hasher.hash_sync(DEFAULT_PASSWORD)
+        roles = [UserRole.ADMIN] + [UserRole.STAFF] * STAFF_USERS + [UserRole.CUSTOMER] * customers
+        names = ["admin"] + [f"staff{i}" for i in range(1, STAFF_USERS + 1)] + [f"user{i}" for i in range(1, customers + 1)]
+        user_ids = []
+        for first in range(0, size.users, _LOAD_CHUNK_SIZE):
+            last = min(first + _LOAD_CHUNK_SIZE, size.users)
+            user_ids += BaseDAL(session, User).bulk_create([{
+                "username": name, "email": f"{name}@example.com", "password_hash": password_hash,
+                "role": role, "is_active": True, "created_at": created_at
+            } for name, role, created_at in zip(names[first:last], roles[first:last],
+                                                _datetimes(signup[first:last]))],
+                chunk_size=_LOAD_CHUNK_SIZE, return_ids=True)
+        customer_ids = np.array(user_ids[1 + STAFF_USERS:])
+        counts_by_table["users"] = size.users
+        progress(f"wrote {size.airports} airports and {size.users} users")
+
+        status = np.where(departure < now, FlightStatus.COMPLETED.value, FlightStatus.SCHEDULED.value).astype(object)
+        soon = np.flatnonzero((days_ahead > 0) & (days_ahead < 2))
+        status[soon[rng.random(len(soon)) < 0.05]] = FlightStatus.DELAYED.value
+        flight_ids = np.array(BaseDAL(session, Flight).bulk_create([{
+            "flight_number": f"AC{i + 1}",
+            "departure_airport_id": departure_id,
+            "arrival_airport_id": arrival_id,
+            "departure_time": departure_time,
+            "arrival_time": arrival_time,
+            "aircraft_type": aircraft_type,
+            "total_seats": total_seats,
+            "available_seats": total_seats - sold,
+            "status": FlightStatus(flight_status),
+            "base_price": price_of_flight,
+        } for i, (departure_id, arrival_id, departure_time, arrival_time, aircraft_type, total_seats, sold,
+                  flight_status, price_of_flight) in enumerate(zip(
+            airport_ids[origin].tolist(), airport_ids[destination].tolist(), _datetimes(departure),
+            _datetimes(departure + duration.astype("timedelta64[m]")), aircraft.tolist(), seats.tolist(),
+            confirmed.tolist(), status.tolist(), base_price.tolist()
+        ))], chunk_size=_LOAD_CHUNK_SIZE, return_ids=True))
+        counts_by_table["flights"] = size.flights
+        progress(f"wrote {size.flights} flights")
+
+        booking_dal = BaseDAL(session, Booking)
+        for first in range(0, size.bookings, _LOAD_CHUNK_SIZE):
+            rows = made[first:first + _LOAD_CHUNK_SIZE]
+            booking_dal.bulk_create([{
+                "user_id": user_id, "flight_id": flight_id, "seat_number": seat_number,
+                "booking_status": "cancelled" if is_cancelled else "confirmed",
+                "total_price": total_price, "booking_date": booked_at,
+            } for user_id, flight_id, seat_number, is_cancelled, total_price, booked_at in zip(
+                customer_ids[customer[rows]].tolist(), flight_ids[flight[rows]].tolist(),
+                seat[rows].tolist(), cancelled[rows].tolist(), price[rows].tolist(),
+                _datetimes(booking_date[rows])
+            )], chunk_size=_LOAD_CHUNK_SIZE)
+            if (first // _LOAD_CHUNK_SIZE) % 10 == 9 or first + len(rows) == size.bookings:
+                progress(f"wrote {first + len(rows)} bookings")
+        counts_by_table["bookings"] = size.bookings
+
+        ensure_indexes(engine)
+        progress(f"rebuilt indexes {', '.join(dropped)}")
+        counts_by_table["route_days"] = InventoryDAL(session).rebuild()
+    return counts_by_table
+
+def cached_dataset(preset: str, seed: int = 0, as_of: Optional[datetime] = None,
+                   directory: str = DATASET_DIR) -> str:
+    """URL of a SQLite database holding the dataset, generated on first use and kept in directory.
+
+    Datasets are keyed on preset, seed, as-of day and DATASET_VERSION, so
+    benchmarks and load tests asking for the same one share a single generated file.
+    """
+    as_of = as_of or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{preset}-{seed}-{as_of:%Y%m%dT%H%M}-v{DATASET_VERSION}.db")
+    if not os.path.exists(path):
+        # Generate under a temporary name so an interrupted run is not reused
+        partial = f"{path}.partial"
+        if os.path.exists(partial):
+            os.remove(partial)
+        engine = create_db_engine(f"sqlite:///{partial}", profile="bulk-load")
+        try:
+            generate(engine, preset, seed=seed, as_of=as_of)
+        finally:
+            engine.dispose()
+        os.replace(partial, path)
+    return f"sqlite:///{path}"
+
+def _digest(engine: Engine) -> str:
+    """SHA-256 of the flight and booking exports, which hold every generated value but users."""
+    digest = hashlib.sha256()
+    with sessionmaker(bind=engine)() as session:
+        exports = ExportService(session)
+        for export in (exports.export_flights, exports.export_bookings):
+            for data in export("csv"):
+                digest.update(data)
+    return digest.hexdigest()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("preset", choices=list(PRESETS))
+    parser.add_argument("--url", default=DATABASE_URL, help="empty database to fill (default DATABASE_URL)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--as-of", type=datetime.fromisoformat,
+                        help="the dataset's present: flights depart around it, bookings are made before it "
+                             "(default: today at midnight)")
+    parser.add_argument("--verify", action="store_true",
+                        help="generate twice into temporary databases and check the results are identical")
+    args = parser.parse_args()
+    as_of = args.as_of or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def report(message: str):
+        print(f"{time.perf_counter() - began:8.1f}s  {message}", flush=True)
+
+    if args.verify:
+        digests = []
+        with tempfile.TemporaryDirectory() as tmp:
+            for attempt in range(2):
+                engine = create_db_engine(f"sqlite:///{os.path.join(tmp, f'{attempt}.db')}", profile="bulk-load")
+                began = time.perf_counter()
+                generate(engine, args.preset, seed=args.seed, as_of=as_of, progress=report)
+                digests.append(_digest(engine))
+                engine.dispose()
+        if digests[0] != digests[1]:
+            print("MISMATCH: the two datasets differ")
+            sys.exit(1)
+        print(f"both datasets are identical ({digests[0][:16]})")
+        return
+
+    engine = create_db_engine(args.url, profile="bulk-load")
+    began = time.perf_counter()
+    try:
+        counts = generate(engine, args.preset, seed=args.seed, as_of=as_of, progress=report)
+    except ValueError as e:
+        parser.error(str(e))
+    report(", ".join(f"{count} {table}" for table, count in counts.items()))
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
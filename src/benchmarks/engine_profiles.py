@@ -0,0 +1,128 @@
+"""
+Read/write throughput of the named engine profiles under mixed load.
+
+Usage:
+    python -m src.benchmarks.engine_profiles --duration 5 --readers 4 --writers 2
+"""
+import argparse
+import itertools
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert
+from sqlalchemy.exc import OperationalError
+
+from src.models.database import (
+    Base, ENGINE_PROFILES, create_db_engine, Airport, Booking, Flight, FlightStatus, User, UserRole
+)
+from src.utils.seat_map import seat_number
+
+def _seed(engine, flight_count: int) -> None:
+    """Create the schema and a small route network to read from."""
+    Base.metadata.create_all(engine)
+    now = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(insert(Airport), [
+            {"code": f"A{i:02d}", "name": f"Airport {i}", "city": f"City {i}", "country": "XX"}
+            for i in range(20)
+        ])
+        conn.execute(insert(User), [{
+            "username": "bench", "email": "bench@example.com",
+            "password_hash": "x", "role": UserRole.CUSTOMER
+        }])
+        conn.execute(insert(Flight), [{
+            "flight_number": f"BM{i}",
+            "departure_airport_id": i % 20 + 1,
+            "arrival_airport_id": (i + 7) % 20 + 1,
+            "departure_time": now + timedelta(hours=i),
+            "arrival_time": now + timedelta(hours=i + 3),
+            "aircraft_type": "Airbus A320",
+            "total_seats": 180,
+            "available_seats": 180,
+            "status": FlightStatus.SCHEDULED,
+            "base_price": 100.0,
+        } for i in range(flight_count)])
+
+def _run_profile(profile: str, duration: float, readers: int, writers: int, flight_count: int) -> dict:
+    """Run concurrent readers and writers against a fresh database file."""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", profile)
+        _seed(engine, flight_count)
+
+        counts = {"reads": 0, "writes": 0, "lock_errors": 0}
+        lock = threading.Lock()
+        # Each write books the next free seat position, as a confirmed seat can only be booked once
+        positions = itertools.count()
+        deadline = time.perf_counter() + duration
+
+        def reader():
+            rng = random.Random()
+            done = 0
+            while time.perf_counter() < deadline:
+                origin = rng.randint(1, 20)
+                stmt = select(Flight.id, Flight.available_seats).where(
+                    Flight.departure_airport_id == origin,
+                    Flight.available_seats > 0
+                )
+                with engine.connect() as conn:
+                    conn.execute(stmt).fetchall()
+                done += 1
+            with lock:
+                counts["reads"] += done
+
+        def writer():
+            done = errors = 0
+            while time.perf_counter() < deadline:
+                position = next(positions)
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(insert(Booking).values(
+                            user_id=1,
+                            flight_id=position % flight_count + 1,
+                            seat_number=seat_number(position // flight_count),
+                            booking_status="confirmed",
+                            total_price=100.0
+                        ))
+                    done += 1
+                except OperationalError:
+                    errors += 1
+            with lock:
+                counts["writes"] += done
+                counts["lock_errors"] += errors
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    return {
+        "profile": profile,
+        "reads_per_sec": counts["reads"] / duration,
+        "writes_per_sec": counts["writes"] / duration,
+        "lock_errors": counts["lock_errors"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--flights", type=int, default=5000)
+    parser.add_argument("--profile", action="append", choices=sorted(ENGINE_PROFILES))
+    args = parser.parse_args()
+
+    print(f"{'profile':<18}{'reads/s':>12}{'writes/s':>12}{'lock errors':>14}")
+    for profile in args.profile or list(ENGINE_PROFILES):
+        result = _run_profile(profile, args.duration, args.readers, args.writers, args.flights)
+        print(f"{result['profile']:<18}{result['reads_per_sec']:>12.0f}"
+              f"{result['writes_per_sec']:>12.0f}{result['lock_errors']:>14}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Bulk export of bookings: check every format round-trips the table and that
+memory stays flat as the table grows, against loading the bookings as ORM
+objects with get_bookings_by_date_range.
+
+Each format is exported from the sync service (as the CLI does) to a file,
+read back and compared with the table's row count and totals; the async
+service (as the API does) must produce the same bytes. Peak Python memory
+is measured with tracemalloc for a tenth of the bookings and for all of
+them. Exits non-zero on a mismatch.
+
+Usage:
+    python -m src.benchmarks.export_streaming --bookings 1000000
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import (
+    Base, create_db_engine, create_async_db_engine, Airport, Booking, Flight, FlightStatus, User, UserRole
+)
+from src.dal.base_dal import BaseDAL
+from src.dal.booking_dal import BookingDAL
+from src.bll.export_service import ExportService
+from src.bll.async_export_service import AsyncExportService
+from src.utils.export_formats import CSV, NDJSON, ARROW, EXPORT_FORMATS
+from src.utils.seat_map import SEAT_POSITIONS, seat_number
+
+_LOAD_CHUNK_SIZE = 100000
+
+def _seed(session, rng: random.Random, bookings: int, start: datetime) -> None:
+    """Bookings made over 100 days, one seat each on enough flights."""
+    BaseDAL(session, Airport).bulk_create([
+        {"code": "LHR", "name": "London Heathrow", "city": "London", "country": "UK"},
+        {"code": "JFK", "name": "John F. Kennedy", "city": "New York", "country": "USA"},
+    ])
+    BaseDAL(session, User).bulk_create([{
+        "username": "load", "email": "load@example.com", "password_hash": "x", "role": UserRole.CUSTOMER
+    }])
+    flights = bookings // SEAT_POSITIONS + 1
+    BaseDAL(session, Flight).bulk_create([{
+        "flight_number": f"EX{i}",
+        "departure_airport_id": 1 + i % 2,
+        "arrival_airport_id": 2 - i % 2,
+        "departure_time": start + timedelta(days=100, hours=i),
+        "arrival_time": start + timedelta(days=100, hours=i + 8),
+        "aircraft_type": "Boeing 777",
+        "total_seats": SEAT_POSITIONS,
+        "available_seats": SEAT_POSITIONS,
+        "status": FlightStatus.SCHEDULED,
+        "base_price": 500.0,
+    } for i in range(flights)])
+    dal = BaseDAL(session, Booking)
+    for first in range(0, bookings, _LOAD_CHUNK_SIZE):
+        dal.bulk_create([{
+            "user_id": 1, "flight_id": i // SEAT_POSITIONS + 1, "seat_number": seat_number(i % SEAT_POSITIONS),
+            "booking_status": "cancelled" if rng.random() < 0.1 else "confirmed",
+            "total_price": rng.randint(5000, 90000) / 100,
+            "booking_date": start + timedelta(seconds=i * 100 * 86400 // bookings),
+        } for i in range(first, min(first + _LOAD_CHUNK_SIZE, bookings))], chunk_size=_LOAD_CHUNK_SIZE)
+    session.commit()
+
+def _read_back(path: str, export_format: str) -> tuple:
+    """(rows, sum of ids, sum of prices) of an exported file, read as a stream."""
+    rows = ids = 0
+    prices = 0.0
+    if export_format == CSV:
+        with open(path, newline="") as file:
+            reader = csv.reader(file)
+            header = next(reader)
+            id_column, price_column = header.index("id"), header.index("total_price")
+            for row in reader:
+                rows += 1
+                ids += int(row[id_column])
+                prices += float(row[price_column])
+    elif export_format == NDJSON:
+        with open(path) as file:
+            for line in file:
+                row = json.loads(line)
+                rows += 1
+                ids += row["id"]
+                prices += row["total_price"]
+    else:
+        import pyarrow as pa
+        with pa.OSFile(path) as file:
+            for batch in pa.ipc.open_stream(file):
+                rows += batch.num_rows
+                ids += sum(batch.column("id").to_pylist())
+                prices += sum(batch.column("total_price").to_pylist())
+    return rows, ids, round(prices, 2)
+
+def _export(Session, export_format: str, path: str, end: datetime) -> int:
+    written = 0
+    with Session() as session, open(path, "wb") as file:
+        for data in ExportService(session).export_bookings(export_format, end_date=end):
+            file.write(data)
+            written += len(data)
+    return written
+
+def _async_digest(url: str, export_format: str, end: datetime) -> str:
+    async def run():
+        engine = create_async_db_engine(url)
+        try:
+            async with async_sessionmaker(engine)() as session:
+                digest = hashlib.sha256()
+                async for data in AsyncExportService(session).export_bookings(export_format, end_date=end):
+                    digest.update(data)
+                return digest.hexdigest()
+        finally:
+            await engine.dispose()
+    return asyncio.run(run())
+
+def _peak_mb(action) -> float:
+    tracemalloc.start()
+    try:
+        action()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=20)
+    args = parser.parse_args()
+
+    formats = list(EXPORT_FORMATS)
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        formats.remove(ARROW)
+        print("pyarrow is not installed; skipping Arrow")
+
+    rng = random.Random(args.seed)
+    start = datetime(2024, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'export.db')}"
+        engine = create_db_engine(url)
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as session:
+            _seed(session, rng, args.bookings, start)
+        everything = start + timedelta(days=101)
+        # A tenth of the bookings by date
+        tenth = start + timedelta(days=10)
+
+        print(f"{'format':<10}{'MB':>9}{'rows/s':>11}{'peak MB 10%':>13}{'peak MB 100%':>14}")
+        for export_format in formats:
+            path = os.path.join(tmp, f"bookings.{export_format}")
+            began = time.perf_counter()
+            written = _export(Session, export_format, path, everything)
+            seconds = time.perf_counter() - began
+
+            with Session() as session:
+                count, id_total, price_total = session.execute(
+                    select(func.count(), func.sum(Booking.id), func.sum(Booking.total_price))
+                ).one()
+            expected = (count, id_total, round(price_total, 2))
+            got = _read_back(path, export_format)
+            if got != expected:
+                print(f"MISMATCH {export_format}: read back {got}, expected {expected}")
+                sys.exit(1)
+            with open(path, "rb") as file:
+                digest = hashlib.file_digest(file, "sha256").hexdigest()
+            if _async_digest(url, export_format, everything) != digest:
+                print(f"MISMATCH {export_format}: the async export differs from the sync export")
+                sys.exit(1)
+
+            peaks = [_peak_mb(lambda: _export(Session, export_format, path, end)) for end in (tenth, everything)]
+            print(f"{export_format:<10}{written / 1e6:>9.1f}{count / seconds:>11.0f}"
+                  f"{peaks[0]:>13.1f}{peaks[1]:>14.1f}")
+
+        def load_orm(end: datetime):
+            with Session() as session:
+                BookingDAL(session).get_bookings_by_date_range(start, end)
+        orm_peak = _peak_mb(lambda: load_orm(tenth))
+        print(f"\nget_bookings_by_date_range on 10% of the bookings: peak {orm_peak:.1f} MB")
+        print("all exports match the table, sync and async")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
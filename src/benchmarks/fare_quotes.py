@@ -0,0 +1,93 @@
+"""
+Check that the vectorized fare engine matches the scalar fare rules exactly,
+and time both on a batch of flights.
+
+Random flights are drawn around every rule boundary: departures a few
+microseconds either side of whole days (including the 7 and 30 day cut-offs
+and past departures), seat shares either side of the scarcity threshold, and
+base prices on half cents so rounding ties are exercised. Exits non-zero on
+the first mismatch.
+
+Usage:
+    python -m src.benchmarks.fare_quotes --flights 10000 --rounds 20
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.bll.pricing import (
+    quote_fare, quote_fares, EARLY_BOOKING_DAYS, LAST_MINUTE_DAYS, SCARCITY_THRESHOLD
+)
+
+def _random_flights(rng: random.Random, count: int, now: datetime) -> list:
+    boundary_days = [-1, 0, 1, LAST_MINUTE_DAYS - 1, LAST_MINUTE_DAYS, LAST_MINUTE_DAYS + 1,
+                     EARLY_BOOKING_DAYS - 1, EARLY_BOOKING_DAYS, EARLY_BOOKING_DAYS + 1]
+    flights = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            days = rng.choice(boundary_days)
+            offset = timedelta(days=days, microseconds=rng.choice([-1, 0, 1]))
+        else:
+            offset = timedelta(seconds=rng.uniform(-5 * 86400, 400 * 86400))
+
+        total_seats = rng.choice([1, 5, 10, 100, 180, 500])
+        if rng.random() < 0.3:
+            # Seat counts right at and around the scarcity threshold
+            at_threshold = int(total_seats * SCARCITY_THRESHOLD)
+            available_seats = max(0, min(total_seats, at_threshold + rng.choice([-1, 0, 1])))
+        else:
+            available_seats = rng.randint(0, total_seats)
+
+        if rng.random() < 0.3:
+            base_price = rng.randint(1, 200000) / 200    # half cents
+        else:
+            base_price = rng.uniform(1, 5000)
+
+        flights.append((base_price, now + offset, available_seats, total_seats))
+    return flights
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--flights", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=20, help="random batches to check")
+    parser.add_argument("--seed", type=int, default=14)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = datetime.now()
+    checked = 0
+    scalar_seconds = vector_seconds = 0.0
+    for _ in range(args.rounds):
+        flights = _random_flights(rng, args.flights, now)
+        seat_count = rng.randint(1, 4)
+        base_prices, departures, available, total = zip(*flights)
+
+        started = time.perf_counter()
+        expected = [quote_fare(*flight, now=now, seat_count=seat_count) for flight in flights]
+        scalar_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        quotes = quote_fares(base_prices, departures, available, total, now=now, seat_count=seat_count)
+        vector_seconds += time.perf_counter() - started
+
+        # Departure times given as a datetime64 array take the other code path
+        as_datetime64 = quote_fares(base_prices, np.array(departures, dtype='datetime64[us]'),
+                                    available, total, now=now, seat_count=seat_count)
+
+        for quoted in (quotes, as_datetime64):
+            for flight, want, got in zip(flights, expected, quoted.tolist()):
+                if want != got:
+                    print(f"MISMATCH for {flight} x{seat_count}: scalar {want!r}, vectorized {got!r}")
+                    sys.exit(1)
+        checked += len(flights)
+
+    print(f"{checked} quotes match the scalar rules exactly")
+    print(f"scalar:     {scalar_seconds / args.rounds * 1000:8.2f} ms per {args.flights} flights")
+    print(f"vectorized: {vector_seconds / args.rounds * 1000:8.2f} ms per {args.flights} flights")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Micro-benchmarks of the DAL and service hot paths against the shared
+synthetic datasets, compared with a JSON baseline.
+
+For each preset (see datasets.py) every call is timed in --repeats rounds
+of --iterations runs, with inputs sampled from the dataset and each run in
+a fresh session as an API request would have. Throughput and p50/p99
+latency of the fastest round, and statements per call, are reported. Bookings are created and then cancelled on a copy of the
+cached dataset, so the cached one stays untouched.
+
+With --update-baseline, or when the baseline file does not exist, results
+are written to it. Otherwise they are compared with it, and the run exits
+non-zero when a call's throughput falls by more than --threshold, its p99
+rises by more than --p99-threshold, or it issues more statements than
+before.
+
+Usage:
+    python -m src.benchmarks.hot_paths --presets small medium --update-baseline
+    python -m src.benchmarks.hot_paths --presets small medium --threshold 0.1 --p99-threshold 0.3
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+import numpy as np
+from sqlalchemy import select, func
+from sqlalchemy.orm import aliased, sessionmaker
+
+from src.models.database import create_db_engine, Airport, Booking, Flight, User, UserRole
+from src.dal.flight_dal import FlightDAL
+from src.dal.user_dal import UserDAL
+from src.bll.booking_service import BookingService
+from src.bll.flight_service import FlightService
+from src.password_hashing import password_hasher
+from src.utils.seat_map import seat_number
+from src.benchmarks.datasets import PRESETS, DEFAULT_PASSWORD, cached_dataset
+from src.benchmarks.query_counts import count_queries
+
+DEFAULT_BASELINE = "hot_paths_baseline.json"
+DEFAULT_THRESHOLD = 0.25
+# A p99 rests on a handful of the slowest runs, so it is allowed to move further
+DEFAULT_P99_THRESHOLD = 0.5
+# bcrypt makes a login cost tens of milliseconds, so it gets fewer runs
+AUTH_ITERATIONS = 20
+WARMUP_ITERATIONS = 5
+
+def _as_of() -> datetime:
+    return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _inputs(engine, rng: random.Random, count: int, booking_count: int, as_of: datetime) -> Dict[str, list]:
+    """count argument sets for each read and booking_count bookings to make, drawn from the dataset."""
+    departure, arrival = aliased(Airport), aliased(Airport)
+    with engine.connect() as conn:
+        flights = conn.execute(select(func.max(Flight.id))).scalar()
+        bookings = conn.execute(select(func.max(Booking.id))).scalar()
+        sample = rng.sample(range(1, flights + 1), count)
+        routes = conn.execute(
+            select(departure.code, arrival.code, Flight.departure_time)
+            .join(departure, Flight.departure_airport_id == departure.id)
+            .join(arrival, Flight.arrival_airport_id == arrival.id)
+            .where(Flight.id.in_(sample)).order_by(Flight.id)
+        ).all()
+        # Users in proportion to their bookings, so frequent flyers come up as often as in traffic
+        booking_users = conn.execute(
+            select(Booking.user_id).where(Booking.id.in_(rng.sample(range(1, bookings + 1), count)))
+            .order_by(Booking.id)
+        ).scalars().all()
+        customers = conn.execute(select(User.id).where(User.role == UserRole.CUSTOMER)).scalars().all()
+
+        # Free seats on flights far enough ahead to be cancelled again
+        bookable = conn.execute(
+            select(Flight.id, Flight.total_seats).where(
+                Flight.departure_time > as_of + timedelta(days=3), Flight.available_seats > 0
+            ).order_by(Flight.id)
+        ).all()
+        if len(bookable) < booking_count:
+            raise ValueError(f"Only {len(bookable)} flights can take a new booking; use fewer iterations")
+        bookings_to_make = []
+        for flight_id, total_seats in rng.sample(bookable, booking_count):
+            taken = set(conn.execute(select(Booking.seat_number).where(
+                Booking.flight_id == flight_id, Booking.booking_status == "confirmed"
+            )).scalars())
+            free = [seat for seat in map(seat_number, range(total_seats)) if seat not in taken]
+            bookings_to_make.append((rng.choice(customers), flight_id, rng.choice(free)))
+
+    return {
+        "search": [(code_from, code_to, departure_time.replace(hour=0, minute=0, second=0, microsecond=0))
+                   for code_from, code_to, departure_time in routes],
+        "flights": sample,
+        "users": booking_users,
+        # Only admins may log in (UserDAL.get_login_user), so logins are timed as the admin
+        "usernames": ["admin"] * (AUTH_ITERATIONS + WARMUP_ITERATIONS),
+        "bookings": bookings_to_make,
+    }
+
+def _time_calls(Session, engine, call: Callable, arguments: list, repeats: int) -> dict:
+    """Run call(session, *args) for each argument set and summarise the fastest round.
+
+    The argument sets after the warm-up ones are split into repeats equal
+    rounds; as with timeit, the round with the best throughput is kept,
+    since slower ones measure interference rather than the code. Also as
+    with timeit, the garbage collector is off while timing; it runs once
+    before each round.
+    """
+    latencies, statements, results = [], [], []
+    per_round = -(-(len(arguments) - WARMUP_ITERATIONS) // repeats)
+    gc.disable()
+    try:
+        for index, args in enumerate(arguments):
+            if index >= WARMUP_ITERATIONS and (index - WARMUP_ITERATIONS) % per_round == 0:
+                gc.collect()
+            with count_queries(engine) as counter:
+                began = time.perf_counter_ns()
+                with Session() as session:
+                    results.append(call(session, *args))
+                elapsed = time.perf_counter_ns() - began
+            if index >= WARMUP_ITERATIONS:
+                latencies.append(elapsed / 1e6)
+                statements.append(counter["count"])
+    finally:
+        gc.enable()
+    rounds = np.array_split(np.array(latencies), repeats)
+    best = max(rounds, key=lambda latency: len(latency) / latency.sum())
+    return {
+        "ops_per_sec": round(1000 * len(best) / best.sum(), 1),
+        "p50_ms": round(float(np.percentile(best, 50)), 3),
+        "p99_ms": round(float(np.percentile(best, 99)), 3),
+        "queries": round(sum(statements) / len(statements), 2),
+        "iterations": len(best),
+        "results": results,
+    }
+
+def _repeated(arguments: list, repeats: int) -> list:
+    """The warm-up argument sets, then the rest once per round."""
+    return arguments[:WARMUP_ITERATIONS] + arguments[WARMUP_ITERATIONS:] * repeats
+
+def run_preset(preset: str, iterations: int, repeats: int, seed: int) -> Dict[str, dict]:
+    """Time every hot path on one dataset."""
+    as_of = _as_of()
+    cached_url = cached_dataset(preset, seed=seed, as_of=as_of)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "hot_paths.db")
+        shutil.copyfile(cached_url[len("sqlite:///"):], path)
+        engine = create_db_engine(f"sqlite:///{path}")
+        Session = sessionmaker(bind=engine)
+        rng = random.Random(seed)
+        # Reads repeat the same arguments each round; every booking needs a seat of its own
+        inputs = _inputs(engine, rng, WARMUP_ITERATIONS + iterations, WARMUP_ITERATIONS + iterations * repeats,
+                         as_of)
+
+        # Log in with the cost the dataset was hashed with, so no login rewrites its hash
+        with engine.connect() as conn:
+            stored_hash = conn.execute(select(User.password_hash).limit(1)).scalar()
+        password_hasher.set_rounds(int(stored_hash.split("$")[2]))
+
+        history_end = as_of
+        history_start = as_of - timedelta(days=90)
+        results = {}
+        results["FlightDAL.search_flights"] = _time_calls(
+            Session, engine, lambda s, *a: FlightDAL(s).search_flights(*a),
+            _repeated(inputs["search"], repeats), repeats)
+        results["FlightService.calculate_flight_price"] = _time_calls(
+            Session, engine, lambda s, flight_id: FlightService(s).calculate_flight_price(flight_id),
+            _repeated([(flight_id,) for flight_id in inputs["flights"]], repeats), repeats)
+        results["BookingService.get_user_bookings"] = _time_calls(
+            Session, engine, lambda s, user_id: BookingService(s).get_user_bookings(user_id),
+            _repeated([(user_id,) for user_id in inputs["users"]], repeats), repeats)
+        results["BookingService.get_booking_history"] = _time_calls(
+            Session, engine,
+            lambda s, user_id: BookingService(s).get_booking_history(user_id, history_start, history_end),
+            _repeated([(user_id,) for user_id in inputs["users"]], repeats), repeats)
+        results["UserDAL.authenticate"] = _time_calls(
+            Session, engine, lambda s, username: UserDAL(s).authenticate(username, DEFAULT_PASSWORD),
+            _repeated([(username,) for username in inputs["usernames"]], repeats), repeats)
+
+        created = _time_calls(
+            Session, engine, lambda s, *a: BookingService(s).create_booking(*a), inputs["bookings"], repeats)
+        results["BookingService.create_booking"] = created
+        made = [(booking["booking_id"], user_id)
+                for booking, (user_id, _, _) in zip(created["results"], inputs["bookings"]) if booking]
+        results["BookingService.cancel_booking"] = _time_calls(
+            Session, engine, lambda s, *a: BookingService(s).cancel_booking(*a), made, repeats)
+        engine.dispose()
+
+    # Every sampled booking is on a free seat and far enough ahead to cancel
+    for name in ("UserDAL.authenticate", "BookingService.create_booking", "BookingService.cancel_booking"):
+        if not all(results[name]["results"]):
+            raise RuntimeError(f"{name} failed on {preset}")
+    for result in results.values():
+        del result["results"]
+    return results
+
+def compare(baseline: dict, current: dict, threshold: float, p99_threshold: float) -> List[str]:
+    """Describe each regression of current against baseline."""
+    regressions = []
+    for preset, calls in current.items():
+        for name, result in calls.items():
+            before = baseline.get(preset, {}).get(name)
+            if before is None:
+                continue
+            if result["ops_per_sec"] < before["ops_per_sec"] * (1 - threshold):
+                regressions.append(f"{preset} {name}: {result['ops_per_sec']} ops/s, "
+                                   f"baseline {before['ops_per_sec']}")
+            if result["p99_ms"] > before["p99_ms"] * (1 + p99_threshold):
+                regressions.append(f"{preset} {name}: p99 {result['p99_ms']} ms, baseline {before['p99_ms']}")
+            if result["queries"] > before["queries"]:
+                regressions.append(f"{preset} {name}: {result['queries']} queries per call, "
+                                   f"baseline {before['queries']}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--presets", nargs="+", choices=list(PRESETS), default=["small", "medium"])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=3, help="rounds per call; the fastest is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help=f"JSON file (default {DEFAULT_BASELINE})")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed fall in throughput, as a fraction (default 0.25)")
+    parser.add_argument("--p99-threshold", type=float, default=DEFAULT_P99_THRESHOLD,
+                        help="allowed rise in p99 latency, as a fraction (default 0.5)")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args()
+
+    current = {}
+    print(f"{'preset':<15}{'call':<40}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'queries':>9}")
+    for preset in args.presets:
+        current[preset] = run_preset(preset, args.iterations, args.repeats, args.seed)
+        for name, result in current[preset].items():
+            print(f"{preset:<15}{name:<40}{result['ops_per_sec']:>10.1f}{result['p50_ms']:>10.3f}"
+                  f"{result['p99_ms']:>10.3f}{result['queries']:>9.2f}")
+
+    context = {
+        "machine": platform.node(), "python": platform.python_version(),
+        "iterations": args.iterations, "repeats": args.repeats, "seed": args.seed, "bcrypt_rounds": password_hasher.rounds,
+    }
+    if args.update_baseline or not os.path.exists(args.baseline):
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                baseline = json.load(file)
+        # Presets not run this time keep their previous numbers
+        baseline.setdefault("results", {}).update(current)
+        baseline["context"] = context
+        baseline["recorded_at"] = datetime.now().isoformat(timespec="seconds")
+        with open(args.baseline, "w") as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if baseline.get("context") != context:
+        print(f"\nWarning: the baseline was recorded with {baseline.get('context')}, this run is {context}")
+    regressions = compare(baseline.get("results", {}), current, args.threshold, args.p99_threshold)
+    if regressions:
+        print(f"\nRegressions against {args.baseline}:")
+        for regression in regressions:
+            print(f"    {regression}")
+        sys.exit(1)
+    print(f"\nNo regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Check that the route inventory summary stays consistent through bookings,
+cancellations and flight changes, then time reading route/day totals for
+one day and for a month from the summary against aggregating flights and
+bookings directly.
+
+A random mix of bookings and cancellations runs through both the sync and
+the async booking services, flights are created and moved through the ORM
+and upserted in bulk; the summary must then match a full aggregation.
+Exits non-zero on any difference.
+
+Usage:
+    python -m src.benchmarks.inventory_summary --flights 20000 --bookings 200000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import (
+    Base, create_db_engine, create_async_db_engine, Airport, Booking, Flight, FlightStatus, User, UserRole
+)
+from src.dal.base_dal import BaseDAL
+from src.dal.flight_dal import FlightDAL
+from src.dal.inventory_dal import InventoryDAL
+from src.dal.unit_of_work import UnitOfWork, AsyncUnitOfWork
+from src.bll.booking_service import BookingService
+from src.bll.async_booking_service import AsyncBookingService
+from src.utils.seat_map import SEAT_POSITIONS, seat_number
+
+def _flight_rows(rng: random.Random, count: int, airports: int, start: datetime, prefix: str) -> list:
+    rows = []
+    for i in range(count):
+        origin = rng.randrange(airports)
+        departure = start + timedelta(minutes=rng.randrange(30 * 24 * 60))
+        rows.append({
+            "flight_number": f"{prefix}{i}",
+            "departure_airport_id": origin + 1,
+            "arrival_airport_id": (origin + rng.randrange(1, airports)) % airports + 1,
+            "departure_time": departure,
+            "arrival_time": departure + timedelta(hours=3),
+            "aircraft_type": "Boeing 777",
+            "total_seats": SEAT_POSITIONS,
+            "available_seats": SEAT_POSITIONS,
+            "status": FlightStatus.SCHEDULED,
+            "base_price": rng.randint(50, 900),
+        })
+    return rows
+
+def _seed(session, rng: random.Random, flights: int, airports: int, bookings: int, start: datetime) -> None:
+    """Flights and confirmed or cancelled bookings, bulk loaded, then the summary rebuilt."""
+    BaseDAL(session, Airport).bulk_create([
+        {"code": f"{i:03d}", "name": f"Airport {i}", "city": f"City {i}", "country": "XX"}
+        for i in range(airports)
+    ])
+    BaseDAL(session, User).bulk_create([{
+        "username": "load", "email": "load@example.com", "password_hash": "x", "role": UserRole.CUSTOMER
+    }])
+    BaseDAL(session, Flight).bulk_create(_flight_rows(rng, flights, airports, start, "IN"))
+    rows = []
+    for i in range(bookings):
+        rows.append({
+            "user_id": 1, "flight_id": rng.randint(1, flights),
+            "seat_number": seat_number(i % SEAT_POSITIONS),
+            "booking_status": "cancelled", "total_price": rng.randint(50, 900),
+            "booking_date": start,
+        })
+    BaseDAL(session, Booking).bulk_create(rows)
+    session.commit()
+    InventoryDAL(session).rebuild()
+
+def _exercise_sync(Session, rng: random.Random, flights: int, airports: int, operations: int,
+                   start: datetime) -> None:
+    booked = []
+    for _ in range(operations):
+        with Session() as session:
+            with UnitOfWork(session):
+                roll = rng.random()
+                if roll < 0.6 or not booked:
+                    result = BookingService(session).create_booking(
+                        1, rng.randint(1, flights), seat_number(rng.randrange(SEAT_POSITIONS)))
+                    if result:
+                        booked.append(result['booking_id'])
+                elif roll < 0.85:
+                    BookingService(session).cancel_booking(booked.pop(rng.randrange(len(booked))), 1)
+                elif roll < 0.95:
+                    # Move a flight to another day and change its capacity through the ORM
+                    flight = session.get(Flight, rng.randint(1, flights))
+                    flight.departure_time += timedelta(days=rng.choice([-1, 1]), hours=rng.randint(0, 5))
+                    flight.total_seats += 10
+                    flight.available_seats += 10
+                    session.flush()
+                else:
+                    FlightDAL(session).upsert_flights(_flight_rows(rng, 5, airports, start, f"UP{rng.randrange(50)}-"))
+
+async def _exercise_async(Session, rng: random.Random, flights: int, operations: int) -> None:
+    booked = []
+    for _ in range(operations):
+        async with Session() as session:
+            async with AsyncUnitOfWork(session):
+                if rng.random() < 0.6 or not booked:
+                    result = await AsyncBookingService(session).create_booking(
+                        1, rng.randint(1, flights), seat_number(rng.randrange(SEAT_POSITIONS)))
+                    if result:
+                        booked.append(result['booking_id'])
+                else:
+                    await AsyncBookingService(session).cancel_booking(booked.pop(rng.randrange(len(booked))), 1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--flights", type=int, default=20000)
+    parser.add_argument("--airports", type=int, default=50)
+    parser.add_argument("--bookings", type=int, default=200000, help="bulk loaded historical bookings")
+    parser.add_argument("--operations", type=int, default=1000, help="service calls per session type")
+    parser.add_argument("--seed", type=int, default=18)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    start = (datetime.now() + timedelta(days=2)).replace(hour=0, minute=0, second=0, microsecond=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'inventory.db')}"
+        engine = create_db_engine(url)
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as session:
+            _seed(session, rng, args.flights, args.airports, args.bookings, start)
+
+        _exercise_sync(Session, rng, args.flights, args.airports, args.operations, start)
+        async_engine = create_async_db_engine(url)
+
+        async def run_async():
+            try:
+                await _exercise_async(async_sessionmaker(async_engine, expire_on_commit=False),
+                                      rng, args.flights, args.operations)
+            finally:
+                await async_engine.dispose()
+        asyncio.run(run_async())
+
+        with Session() as session:
+            inventory = InventoryDAL(session)
+            problems = inventory.check()
+            if problems:
+                print(f"{len(problems)} differences between the summary and flights/bookings:")
+                for problem in problems[:20]:
+                    print(f"  {problem}")
+                sys.exit(1)
+            print(f"Summary consistent after {args.operations} sync and {args.operations} async operations\n")
+
+            timings = []
+            for days in (1, 30):
+                first_day = start + timedelta(days=7)
+                last_day = first_day + timedelta(days=days - 1)
+                summary = InventoryDAL._summary_query(first_day.date(), last_day.date())
+                aggregate = InventoryDAL._aggregate((
+                    Flight.departure_time >= first_day,
+                    Flight.departure_time < last_day + timedelta(days=1),
+                ))
+                timings.append((days, _best_ms(session, summary), _best_ms(session, aggregate)))
+        engine.dispose()
+
+    print(f"{'days':>6}{'rows':>8}{'summary ms':>12}{'aggregate ms':>14}")
+    for days, (rows, summary_ms), (_, aggregate_ms) in timings:
+        print(f"{days:>6}{rows:>8}{summary_ms:>12.1f}{aggregate_ms:>14.1f}")
+
+def _best_ms(session, stmt, repeats: int = 5) -> tuple:
+    """Rows returned and best time of a few runs of a statement."""
+    best = float("inf")
+    for _ in range(repeats):
+        began = time.perf_counter()
+        rows = session.execute(stmt).all()
+        best = min(best, (time.perf_counter() - began) * 1000)
+    return len(rows), best
+
+if __name__ == "__main__":
+    main()
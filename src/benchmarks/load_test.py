@@ -0,0 +1,473 @@
+"""
+Load test of the API: drive the FastAPI app with a mix of login, search,
+book, cancel and history requests, and report throughput, latency
+percentiles, error rates and database lock waits per endpoint.
+
+The app runs in this process on a copy of a cached dataset (see
+datasets.py). By default requests go straight to it through httpx's ASGI
+transport; with --uvicorn it is served by uvicorn on a local port, so each
+request also pays for HTTP parsing and the loopback socket, as behind a
+proxy on the same box. Either way it is one worker on one event loop.
+
+Arrival models:
+    closed  --users virtual users each send a request, wait for the
+            response and think for an exponentially distributed --think-ms
+            before the next, so throughput is what the app sustains at
+            that concurrency.
+    open    requests arrive as a Poisson process at --rate per second
+            whatever the response times, and latency is measured from the
+            scheduled arrival, so queueing shows up as it would for real
+            traffic. Arrivals beyond --max-in-flight are dropped and
+            counted as errors.
+
+The first --warmup seconds are not recorded. Logins are the admin's (only
+admins may log in); the other calls are made as customers with minted
+tokens. Bookings take free seats on flights at least three days out, and
+cancellations undo those or existing bookings far enough ahead.
+
+Lock waits: SQLite takes the write lock at a transaction's first write
+statement, and a writer blocked by another connection waits there for up
+to busy_timeout. The time spent in each transaction's first write is
+summed per endpoint (it also holds the statement's own work and, under
+load, the event loop's delay in resuming the request), as are "database
+is locked" errors once busy_timeout runs out.
+
+Usage:
+    python -m src.benchmarks.load_test --preset small --users 32 --duration 30
+    python -m src.benchmarks.load_test --arrival open --rate 200 --mix search=70,history=15,book=8,cancel=5,login=2
+    python -m src.benchmarks.load_test --uvicorn --users 64 --output load.json
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+OPERATIONS = ("login", "search", "book", "cancel", "history")
+DEFAULT_MIX = "search=60,history=15,book=10,cancel=10,login=5"
+# Header naming the operation a measured request belongs to, read by the ASGI wrapper
+OPERATION_HEADER = "x-load-operation"
+PERCENTILES = (50, 95, 99, 99.9)
+
+# Inputs sampled from the dataset before the run
+SEARCH_SAMPLE = 2000
+USER_SAMPLE = 2000
+BOOKABLE_FLIGHTS = 500
+CANCELLABLE_SAMPLE = 10000
+# Bookings must stay cancellable (24 hours ahead) and searches must find upcoming flights
+BOOKING_DAYS_AHEAD = 3
+
+# Operation of the request being handled, for the database event listeners
+_operation = contextvars.ContextVar("load_test_operation", default=None)
+
+# Statements that take the write lock; write sessions take it with BEGIN IMMEDIATE
+_WRITES = ("INSERT", "UPDATE", "DELETE", "REPLACE", "BEGIN IMMEDIATE")
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Parse name=weight pairs into operation weights."""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}; use {', '.join(OPERATIONS)}")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"weight of {name} is not a number: {weight!r}")
+        if mix[name] < 0:
+            raise argparse.ArgumentTypeError(f"weight of {name} is negative")
+    if not sum(mix.values()) > 0:
+        raise argparse.ArgumentTypeError("the mix needs a positive weight")
+    return mix
+
+def _labelled(app):
+    """Wrap an ASGI app so database events know which measured operation they serve."""
+    async def asgi(scope, receive, send):
+        name = None
+        if scope["type"] == "http":
+            name = dict(scope["headers"]).get(OPERATION_HEADER.encode())
+        token = _operation.set(name.decode() if name else None)
+        try:
+            await app(scope, receive, send)
+        finally:
+            _operation.reset(token)
+    return asgi
+
+def _instrument(engine, stats: Dict[str, Counter]) -> None:
+    """Sum statement time, first-write (lock) time and lock errors per operation."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["statement_started"] = time.perf_counter()
+        conn.info["takes_lock"] = not conn.info.get("writing") and \
+            statement.lstrip()[:15].upper().startswith(_WRITES)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        _finished(conn)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        conn = context.connection
+        if conn is None or "statement_started" not in conn.info:
+            return
+        locked = "database is locked" in str(context.original_exception)
+        _finished(conn, locked)
+
+    def _finished(conn, locked: bool = False):
+        elapsed = time.perf_counter() - conn.info.pop("statement_started")
+        takes_lock = conn.info.pop("takes_lock", False)
+        if takes_lock and not locked:
+            conn.info["writing"] = True
+        name = _operation.get()
+        if name is None:
+            return
+        stats[name]["db_seconds"] += elapsed
+        if takes_lock:
+            stats[name]["lock_seconds"] += elapsed
+        if locked:
+            stats[name]["locked"] += 1
+
+    # The write lock is held until the transaction ends
+    @event.listens_for(engine, "commit")
+    @event.listens_for(engine, "rollback")
+    def _ended(conn):
+        conn.info.pop("writing", None)
+
+    @event.listens_for(engine, "checkin")
+    def _checked_in(dbapi_connection, connection_record):
+        connection_record.info.pop("writing", None)
+
+class Workload:
+    """Inputs for each operation, drawn from the dataset, and the calls that use them."""
+
+    def __init__(self, engine, rng: random.Random, password: str, now: datetime):
+        from sqlalchemy import select, func
+        from sqlalchemy.orm import aliased
+        from src.auth import create_access_token
+        from src.models.database import Airport, Booking, Flight, User, UserRole
+        from src.utils.seat_map import seat_layout
+
+        self.rng = rng
+        self.password = password
+        self._create_token = create_access_token
+        self._tokens: Dict[str, str] = {}
+        departure, arrival = aliased(Airport), aliased(Airport)
+        with engine.connect() as conn:
+            upcoming = conn.execute(
+                select(Flight.id).where(Flight.departure_time > now)
+            ).scalars().all()
+            routes = conn.execute(
+                select(departure.code, arrival.code, Flight.departure_time)
+                .join(departure, Flight.departure_airport_id == departure.id)
+                .join(arrival, Flight.arrival_airport_id == arrival.id)
+                .where(Flight.id.in_(rng.sample(upcoming, min(SEARCH_SAMPLE, len(upcoming)))))
+            ).all()
+            self.searches = [
+                {"departure_airport": code_from, "arrival_airport": code_to,
+                 "date": departure_time.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()}
+                for code_from, code_to, departure_time in routes
+            ]
+
+            # History as users in proportion to their bookings, booking as any customer
+            bookings = conn.execute(select(func.max(Booking.id))).scalar() or 0
+            self.history_users = conn.execute(
+                select(User.username).join(Booking, Booking.user_id == User.id)
+                .where(Booking.id.in_(rng.sample(range(1, bookings + 1), min(USER_SAMPLE, bookings))))
+            ).scalars().all()
+            customers = conn.execute(
+                select(User.username).where(User.role == UserRole.CUSTOMER)
+            ).scalars().all()
+            self.customers = rng.sample(customers, min(USER_SAMPLE, len(customers)))
+
+            bookable = conn.execute(
+                select(Flight.id, Flight.aircraft_type, Flight.total_seats).where(
+                    Flight.departure_time > now + timedelta(days=BOOKING_DAYS_AHEAD), Flight.available_seats > 0
+                )
+            ).all()
+            # Free seats of each sampled flight, taken in random order by the bookings
+            self.free_seats: Dict[int, List[str]] = {}
+            for flight_id, aircraft_type, total_seats in rng.sample(bookable, min(BOOKABLE_FLIGHTS, len(bookable))):
+                taken = set(conn.execute(select(Booking.seat_number).where(
+                    Booking.flight_id == flight_id, Booking.booking_status == "confirmed"
+                )).scalars())
+                free = [seat for seat in seat_layout(aircraft_type, total_seats).seat_numbers() if seat not in taken]
+                rng.shuffle(free)
+                self.free_seats[flight_id] = free
+            self.bookable_flights = [flight_id for flight_id, free in self.free_seats.items() if free]
+
+            self.cancellable = conn.execute(
+                select(Booking.id, User.username).join(User, Booking.user_id == User.id)
+                .join(Flight, Booking.flight_id == Flight.id)
+                .where(Booking.booking_status == "confirmed",
+                       Flight.departure_time > now + timedelta(days=BOOKING_DAYS_AHEAD))
+                .order_by(func.random()).limit(CANCELLABLE_SAMPLE)
+            ).all()
+        self.history_range = {
+            "start_date": (now - timedelta(days=90)).isoformat(),
+            "end_date": (now + timedelta(days=90)).isoformat(),
+        }
+
+    def _headers(self, username: Optional[str], name: Optional[str]) -> dict:
+        headers = {OPERATION_HEADER: name} if name else {}
+        if username is not None:
+            if username not in self._tokens:
+                self._tokens[username] = self._create_token(data={"sub": username})
+            headers["Authorization"] = f"Bearer {self._tokens[username]}"
+        return headers
+
+    async def login(self, client: httpx.AsyncClient, name: Optional[str]) -> Optional[httpx.Response]:
+        return await client.post("/token", data={"username": "admin", "password": self.password},
+                                 headers=self._headers(None, name))
+
+    async def search(self, client: httpx.AsyncClient, name: Optional[str]) -> Optional[httpx.Response]:
+        return await client.post("/api/flights/search", json=self.rng.choice(self.searches),
+                                 headers=self._headers(self.rng.choice(self.customers), name))
+
+    async def history(self, client: httpx.AsyncClient, name: Optional[str]) -> Optional[httpx.Response]:
+        return await client.post("/api/bookings/history", json=self.history_range,
+                                 headers=self._headers(self.rng.choice(self.history_users), name))
+
+    async def book(self, client: httpx.AsyncClient, name: Optional[str]) -> Optional[httpx.Response]:
+        if not self.bookable_flights:
+            return None
+        index = self.rng.randrange(len(self.bookable_flights))
+        flight_id = self.bookable_flights[index]
+        seat = self.free_seats[flight_id].pop()
+        if not self.free_seats[flight_id]:
+            self.bookable_flights[index] = self.bookable_flights[-1]
+            self.bookable_flights.pop()
+        username = self.rng.choice(self.customers)
+        response = await client.post("/api/bookings/", json={"flight_id": flight_id, "seat_number": seat},
+                                     headers=self._headers(username, name))
+        if response.status_code == 200:
+            self.cancellable.append((response.json()["id"], username))
+        return response
+
+    async def cancel(self, client: httpx.AsyncClient, name: Optional[str]) -> Optional[httpx.Response]:
+        if not self.cancellable:
+            return None
+        index = self.rng.randrange(len(self.cancellable))
+        self.cancellable[index], self.cancellable[-1] = self.cancellable[-1], self.cancellable[index]
+        booking_id, username = self.cancellable.pop()
+        return await client.post(f"/api/bookings/{booking_id}/cancel", headers=self._headers(username, name))
+
+class Recorder:
+    """Latencies and outcomes of the measured requests, per operation."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, name: str, outcome, seconds: Optional[float] = None) -> None:
+        self.outcomes[name][outcome] += 1
+        if seconds is not None:
+            self.latencies[name].append(seconds * 1000)
+
+    def summary(self, duration: float, db_stats: Dict[str, Counter]) -> Dict[str, dict]:
+        names = [name for name in OPERATIONS if self.outcomes.get(name)] + ["all"]
+        summary = {}
+        for name in names:
+            if name == "all":
+                outcomes = sum(self.outcomes.values(), Counter())
+                latencies = [latency for values in self.latencies.values() for latency in values]
+                db = sum(db_stats.values(), Counter())
+            else:
+                outcomes, latencies, db = self.outcomes[name], self.latencies[name], db_stats.get(name, Counter())
+            requests = sum(count for outcome, count in outcomes.items() if outcome != "skipped")
+            errors = {str(outcome): count for outcome, count in outcomes.items()
+                      if outcome != "skipped" and not (isinstance(outcome, int) and outcome < 400)}
+            row = {
+                "requests": requests,
+                "requests_per_sec": round(requests / duration, 1),
+                "error_rate": round(sum(errors.values()) / requests, 4) if requests else 0.0,
+                "errors": errors,
+                "skipped": outcomes.get("skipped", 0),
+                "db_ms_per_request": round(1000 * db["db_seconds"] / requests, 3) if requests else 0.0,
+                "lock_ms_per_request": round(1000 * db["lock_seconds"] / requests, 3) if requests else 0.0,
+                "locked": db["locked"],
+            }
+            for percentile in PERCENTILES:
+                row[f"p{percentile:g}_ms"] = round(float(np.percentile(latencies, percentile)), 2) \
+                    if latencies else None
+            summary[name] = row
+        return summary
+
+async def _closed_loop(send, pick, users: int, think: float, measure_from: float, end: float,
+                       rng: random.Random) -> None:
+    async def user(user_rng: random.Random):
+        while True:
+            began = time.perf_counter()
+            if began >= end:
+                return
+            await send(pick(user_rng), began, began >= measure_from)
+            if think:
+                await asyncio.sleep(user_rng.expovariate(1 / think))
+
+    await asyncio.gather(*(user(random.Random(rng.random())) for _ in range(users)))
+
+async def _open_loop(send, pick, recorder: Recorder, rate: float, max_in_flight: int, measure_from: float,
+                     end: float, rng: random.Random) -> None:
+    in_flight = set()
+    arrival = time.perf_counter()
+    while arrival < end:
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        name, measured = pick(rng), arrival >= measure_from
+        if len(in_flight) >= max_in_flight:
+            if measured:
+                recorder.record(name, "dropped")
+        else:
+            task = asyncio.ensure_future(send(name, arrival, measured))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        arrival += rng.expovariate(rate)
+    await asyncio.gather(*in_flight)
+
+async def run(app, workload: Workload, args, recorder: Recorder) -> None:
+    """Drive the app through the warm-up and the measured duration."""
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+
+    def pick(rng: random.Random) -> str:
+        return rng.choices(names, weights)[0]
+
+    async def send(name: str, scheduled: float, measured: bool) -> None:
+        try:
+            response = await getattr(workload, name)(client, name if measured else None)
+            outcome = "skipped" if response is None else response.status_code
+        except httpx.HTTPError as e:
+            outcome = type(e).__name__
+        if measured:
+            recorder.record(name, outcome, None if outcome == "skipped" else time.perf_counter() - scheduled)
+
+    connections = args.users if args.arrival == "closed" else args.max_in_flight
+    server = None
+    if args.uvicorn:
+        import uvicorn
+        server = uvicorn.Server(uvicorn.Config(_labelled(app), host="127.0.0.1", port=args.port, log_level="warning"))
+        serving = asyncio.ensure_future(server.serve())
+        while not server.started:
+            if serving.done():
+                serving.result()
+                raise RuntimeError("uvicorn stopped during startup")
+            await asyncio.sleep(0.05)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None,
+                                   limits=httpx.Limits(max_connections=connections,
+                                                       max_keepalive_connections=connections))
+    else:
+        await app.router.startup()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=_labelled(app), raise_app_exceptions=False),
+                                   base_url="http://load-test", timeout=None)
+
+    rng = random.Random(args.seed)
+    measure_from = time.perf_counter() + args.warmup
+    end = measure_from + args.duration
+    try:
+        if args.arrival == "closed":
+            await _closed_loop(send, pick, args.users, args.think_ms / 1000, measure_from, end, rng)
+        else:
+            await _open_loop(send, pick, recorder, args.rate, args.max_in_flight, measure_from, end, rng)
+    finally:
+        await client.aclose()
+        if server is not None:
+            server.should_exit = True
+            await serving
+        else:
+            await app.router.shutdown()
+
+def _print_summary(summary: Dict[str, dict]) -> None:
+    print(f"{'endpoint':<10}{'requests':>9}{'req/s':>9}{'errors':>8}"
+          + "".join(f"{f'p{percentile:g} ms':>10}" for percentile in PERCENTILES)
+          + f"{'db ms':>8}{'lock ms':>9}{'locked':>8}")
+    for name, row in summary.items():
+        latencies = "".join(f"{row[f'p{percentile:g}_ms']:>10.2f}" if row[f"p{percentile:g}_ms"] is not None
+                            else f"{'-':>10}" for percentile in PERCENTILES)
+        print(f"{name:<10}{row['requests']:>9}{row['requests_per_sec']:>9.1f}{row['error_rate']:>8.1%}"
+              f"{latencies}{row['db_ms_per_request']:>8.2f}{row['lock_ms_per_request']:>9.2f}{row['locked']:>8}")
+    for name, row in summary.items():
+        if name != "all" and (row["errors"] or row["skipped"]):
+            outcomes = [f"{count} x {outcome}" for outcome, count in sorted(row["errors"].items())]
+            if row["skipped"]:
+                outcomes.append(f"{row['skipped']} skipped, nothing left to {name}")
+            print(f"    {name}: {', '.join(outcomes)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--preset", default="small", help="dataset preset (default small)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profile", default=os.getenv("DATABASE_PROFILE", "dev"), help="database engine profile")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--arrival", choices=("closed", "open"), default="closed")
+    parser.add_argument("--users", type=int, default=32, help="virtual users of the closed loop")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean think time of the closed loop")
+    parser.add_argument("--rate", type=float, default=100.0, help="requests per second of the open loop")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="open loop arrivals beyond this are dropped")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds before recording starts")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds recorded")
+    parser.add_argument("--uvicorn", action="store_true", help="serve the app with uvicorn on a local port")
+    parser.add_argument("--port", type=int, default=0, help="uvicorn port (default: any free one)")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "load_test.db")
+        # The app's engines are created from the environment when its modules
+        # are first imported, so they are only imported once it points at the copy
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+        os.environ["DATABASE_PROFILE"] = args.profile
+        os.environ.pop("DATABASE_READ_URL", None)
+        from sqlalchemy import select
+        from src.benchmarks.datasets import DEFAULT_PASSWORD, PRESETS, cached_dataset
+        if args.preset not in PRESETS:
+            parser.error(f"unknown preset {args.preset}; use {', '.join(PRESETS)}")
+        as_of = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        shutil.copyfile(cached_dataset(args.preset, seed=args.seed, as_of=as_of)[len("sqlite:///"):], path)
+
+        from src.main import app
+        from src.models.database import engine, async_engine, User
+        from src.password_hashing import password_hasher
+
+        # Log in with the cost the dataset was hashed with, so no login rewrites its hash
+        with engine.connect() as conn:
+            stored_hash = conn.execute(select(User.password_hash).where(User.username == "admin")).scalar()
+        password_hasher.set_rounds(int(stored_hash.split("$")[2]))
+        workload = Workload(engine, random.Random(args.seed), DEFAULT_PASSWORD, datetime.now())
+
+        db_stats: Dict[str, Counter] = defaultdict(Counter)
+        _instrument(async_engine.sync_engine, db_stats)
+        recorder = Recorder()
+        load = f"{args.users} users, {args.think_ms:g} ms think time" if args.arrival == "closed" \
+            else f"{args.rate:g} requests/s offered"
+        print(f"{args.preset}: {args.arrival} loop, {load}, {'uvicorn' if args.uvicorn else 'in-process ASGI'}, "
+              f"{args.warmup:g} s warm-up, {args.duration:g} s measured\n")
+        asyncio.run(run(app, workload, args, recorder))
+        engine.dispose()
+
+    summary = recorder.summary(args.duration, db_stats)
+    _print_summary(summary)
+    if args.output:
+        context = {key: value for key, value in vars(args).items() if key != "output"}
+        context["bcrypt_rounds"] = password_hasher.rounds
+        with open(args.output, "w") as file:
+            json.dump({"context": context, "recorded_at": datetime.now().isoformat(timespec="seconds"),
+                       "results": summary}, file, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
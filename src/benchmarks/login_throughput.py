@@ -0,0 +1,90 @@
+"""
+Login throughput under concurrency, verifying bcrypt on the event loop versus
+on the password hashing pool, plus the worst event-loop stall seen meanwhile.
+
+Usage:
+    python -m src.benchmarks.login_throughput --logins 64 --concurrency 16 --rounds 12
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Base, create_db_engine, create_async_db_engine, UserRole
+from src.dal.user_dal import UserDAL
+from src.bll.user_service import UserService
+from src.password_hashing import password_hasher
+
+async def _loop_lag_monitor(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Largest delay beyond interval seen between event loop ticks."""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+async def _run(Session, AsyncSession, logins: int, concurrency: int, offload: bool) -> tuple:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            if offload:
+                async with AsyncSession() as session:
+                    user = await UserService(session).authenticate("admin", "admin-password")
+            else:
+                with Session() as session:
+                    user = UserDAL(session).authenticate("admin", "admin-password")
+            assert user is not None
+
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_loop_lag_monitor(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return elapsed, await monitor
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--target-ms", type=float, help="calibrate the cost to this hash latency instead")
+    args = parser.parse_args()
+
+    if args.target_ms:
+        print(f"calibrated bcrypt cost for {args.target_ms:.0f} ms: {password_hasher.calibrate(args.target_ms)}")
+    else:
+        password_hasher.set_rounds(args.rounds)
+    print(f"bcrypt cost {password_hasher.rounds}, {password_hasher.max_workers} hashing workers\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'login.db')}"
+        engine = create_db_engine(url)
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as session:
+            UserDAL(session).create_user("admin", "admin@example.com", "admin-password", UserRole.ADMIN)
+
+        print(f"{'verify':<16}{'logins':>8}{'logins/s':>10}{'max loop stall ms':>20}")
+        for name, offload in (("on event loop", False), ("hashing pool", True)):
+            # A fresh async engine per run, as asyncio.run gives each run its own loop
+            async_engine = create_async_db_engine(url)
+            AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+            async def run():
+                try:
+                    return await _run(Session, AsyncSession, args.logins, args.concurrency, offload)
+                finally:
+                    await async_engine.dispose()
+            elapsed, stall = asyncio.run(run())
+            print(f"{name:<16}{args.logins:>8}{args.logins / elapsed:>10.1f}{stall * 1000:>20.1f}")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Query-count checks for the booking and flight listing services.
+
+Seeds a user with many bookings and asserts that formatting their bookings,
+history and flight searches issues a constant number of SELECTs rather than
+several per row. Exits non-zero when a service exceeds its budget.
+
+Usage:
+    python -m src.benchmarks.query_counts --bookings 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Base, create_db_engine, Airport, Booking, Flight, FlightStatus, User, UserRole
+from src.dal.base_dal import BaseDAL
+from src.bll.booking_service import BookingService
+from src.bll.flight_service import FlightService
+from src.utils.seat_map import seat_number
+
+# Largest number of statements each service call may issue
+QUERY_BUDGETS = {
+    "BookingService.get_user_bookings": 3,
+    "BookingService.get_booking_history": 3,
+    "FlightService.search_available_flights": 3,
+    "FlightService.get_flights_by_route": 3,
+}
+
+@contextmanager
+def count_queries(engine):
+    """Count the statements executed on the engine inside the block."""
+    counter = {"count": 0}
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        counter["count"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", before_execute)
+
+def service_calls(day: datetime) -> Dict[str, Callable]:
+    """Service calls with a budget in QUERY_BUDGETS, each taking a session, for data seeded by _seed."""
+    return {
+        "BookingService.get_user_bookings":
+            lambda s: BookingService(s).get_user_bookings(1),
+        "BookingService.get_booking_history":
+            lambda s: BookingService(s).get_booking_history(
+                1, datetime.now() - timedelta(days=365), datetime.now()),
+        "FlightService.search_available_flights":
+            lambda s: FlightService(s).search_available_flights("LHR", "JFK", day),
+        "FlightService.get_flights_by_route":
+            lambda s: FlightService(s).get_flights_by_route(1, 2),
+    }
+
+def _seed(session, booking_count: int, flight_count: int) -> datetime:
+    """Create one user with booking_count bookings spread over a route's flights."""
+    BaseDAL(session, Airport).bulk_create([
+        {"code": "LHR", "name": "London Heathrow", "city": "London", "country": "UK"},
+        {"code": "JFK", "name": "John F. Kennedy", "city": "New York", "country": "USA"},
+    ])
+    BaseDAL(session, User).bulk_create([{
+        "username": "frequent", "email": "frequent@example.com",
+        "password_hash": "x", "role": UserRole.CUSTOMER
+    }])
+    day = (datetime.now() + timedelta(days=14)).replace(hour=0, minute=0, second=0, microsecond=0)
+    flight_ids = BaseDAL(session, Flight).bulk_create([{
+        "flight_number": f"QC{i}",
+        "departure_airport_id": 1,
+        "arrival_airport_id": 2,
+        "departure_time": day + timedelta(minutes=10 * i),
+        "arrival_time": day + timedelta(minutes=10 * i, hours=8),
+        "aircraft_type": "Boeing 777",
+        "total_seats": 300,
+        "available_seats": 300,
+        "status": FlightStatus.SCHEDULED,
+        "base_price": 500.0,
+    } for i in range(flight_count)], return_ids=True)
+    BaseDAL(session, Booking).bulk_create([{
+        "user_id": 1,
+        "flight_id": flight_ids[i % flight_count],
+        "booking_date": datetime.now() - timedelta(minutes=i),
+        "seat_number": seat_number(i // flight_count),
+        "booking_status": "confirmed",
+        "total_price": 500.0,
+    } for i in range(booking_count)])
+    session.commit()
+    return day
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=1000)
+    parser.add_argument("--flights", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'counts.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as session:
+            day = _seed(session, args.bookings, args.flights)
+
+        calls = service_calls(day)
+
+        failures = []
+        print(f"{'call':<42}{'rows':>8}{'queries':>10}{'budget':>8}")
+        for name, call in calls.items():
+            with Session() as session, count_queries(engine) as counter:
+                rows = call(session)
+            budget = QUERY_BUDGETS[name]
+            print(f"{name:<42}{len(rows):>8}{counter['count']:>10}{budget:>8}")
+            if counter["count"] > budget:
+                failures.append(f"{name}: {counter['count']} queries (budget {budget})")
+        engine.dispose()
+
+    if failures:
+        print("\nQuery budgets exceeded:")
+        for failure in failures:
+            print(f"    {failure}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+EXPLAIN QUERY PLAN checks for the DAL search and booking hot paths.
+
+Runs each hot DAL query against a scratch database, captures the SQL it
+emits and asserts that SQLite answers it through an index rather than a
+full table scan. Exits non-zero when any query scans flights or bookings.
+
+Usage:
+    python -m src.benchmarks.query_plans
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from typing import Callable, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Base, create_db_engine, ensure_indexes
+from src.dal.base_dal import _encode_cursor
+from src.dal.flight_dal import FlightDAL
+from src.dal.booking_dal import BookingDAL
+
+# Tables that must never be fully scanned by a hot-path query
+HOT_TABLES = ("flights", "bookings")
+
+def _hot_queries(session) -> List[Tuple[str, Callable]]:
+    """DAL calls whose statements must be index-backed."""
+    flight_dal = FlightDAL(session)
+    booking_dal = BookingDAL(session)
+    day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return [
+        ("FlightDAL.search_flights", lambda: flight_dal.search_flights("LHR", "JFK", day)),
+        ("FlightDAL.get_route_fares", lambda: flight_dal.get_route_fares(
+            "LHR", "JFK", day, day + timedelta(days=31))),
+        ("FlightDAL.get_flights_by_route", lambda: flight_dal.get_flights_by_route(1, 2)),
+        ("FlightDAL.get_flights_by_date_range",
+         lambda: flight_dal.get_flights_by_date_range(day, day + timedelta(days=7))),
+        ("FlightDAL.get_flights_page", lambda: flight_dal.get_flights_page(
+            cursor=_encode_cursor(('departure_time', 'id'), [day, 1]), limit=50)),
+        ("BookingDAL.get_flight_bookings", lambda: booking_dal.get_flight_bookings(1)),
+        ("BookingDAL.get_user_bookings", lambda: booking_dal.get_user_bookings(1)),
+        ("BookingDAL.get_user_bookings_by_date_range",
+         lambda: booking_dal.get_user_bookings_by_date_range(1, day - timedelta(days=30), day)),
+        ("BookingDAL.get_user_bookings_page", lambda: booking_dal.get_user_bookings_page(
+            1, cursor=_encode_cursor(('booking_date', 'id'), [day, 1]), limit=50)),
+        ("BookingDAL.get_bookings_by_date_range",
+         lambda: booking_dal.get_bookings_by_date_range(day - timedelta(days=30), day)),
+    ]
+
+def _full_scans(plan_rows) -> List[str]:
+    """Plan steps that scan a hot table without an index."""
+    scans = []
+    for row in plan_rows:
+        detail = row[-1]
+        if not detail.startswith("SCAN "):
+            continue
+        table = detail.split()[1]
+        if table in HOT_TABLES and "INDEX" not in detail:
+            scans.append(detail)
+    return scans
+
+def check_query_plans(engine) -> List[str]:
+    """Run every hot query and return a failure message per full scan."""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    Session = sessionmaker(bind=engine)
+    failures = []
+    with Session() as session:
+        for name, call in _hot_queries(session):
+            captured.clear()
+            event.listen(engine, "before_cursor_execute", capture)
+            try:
+                call()
+            finally:
+                event.remove(engine, "before_cursor_execute", capture)
+
+            for statement, parameters in captured:
+                plan = session.connection().exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters
+                ).fetchall()
+                for detail in _full_scans(plan):
+                    failures.append(f"{name}: {detail}")
+                print(f"{name}:")
+                for row in plan:
+                    print(f"    {row[-1]}")
+    return failures
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'plans.db')}")
+        Base.metadata.create_all(engine)
+        ensure_indexes(engine)
+        failures = check_query_plans(engine)
+        engine.dispose()
+
+    if failures:
+        print("\nFull table scans on hot paths:")
+        for failure in failures:
+            print(f"    {failure}")
+        sys.exit(1)
+    print("\nAll hot-path queries use an index.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Booking write throughput under heavy search and listing load, with the reads
+on the primary engine versus on a separate read engine.
+
+Writer tasks book seats back to back while reader tasks page through flights
+and booking history as the listing routes do, all on one event loop like a
+uvicorn worker. The read engine is a read-only, immutable snapshot of the
+primary written with VACUUM INTO, as `python -m src.init_db snapshot` makes.
+
+Usage:
+    python -m src.benchmarks.read_replica --readers 64 --writers 4 --seconds 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import (
+    Base, create_db_engine, create_async_db_engine, snapshot_database,
+    Airport, Flight, FlightStatus, User, UserRole
+)
+from src.dal.base_dal import BaseDAL
+from src.dal.unit_of_work import AsyncUnitOfWork
+from src.bll.async_flight_service import AsyncFlightService
+from src.bll.async_booking_service import AsyncBookingService
+from src.utils.seat_map import SEAT_POSITIONS, seat_number
+
+def _seed(session, users: int, flights: int) -> None:
+    BaseDAL(session, Airport).bulk_create([
+        {"code": "LHR", "name": "London Heathrow", "city": "London", "country": "UK"},
+        {"code": "JFK", "name": "John F. Kennedy", "city": "New York", "country": "USA"},
+    ])
+    BaseDAL(session, User).bulk_create([{
+        "username": f"user{i}", "email": f"user{i}@example.com",
+        "password_hash": "x", "role": UserRole.CUSTOMER
+    } for i in range(users)])
+    departure = datetime.now() + timedelta(days=10)
+    BaseDAL(session, Flight).bulk_create([{
+        "flight_number": f"RR{i}",
+        "departure_airport_id": 1,
+        "arrival_airport_id": 2,
+        "departure_time": departure + timedelta(hours=i),
+        "arrival_time": departure + timedelta(hours=i + 8),
+        "aircraft_type": "Boeing 777",
+        "total_seats": SEAT_POSITIONS,
+        "available_seats": SEAT_POSITIONS,
+        "status": FlightStatus.SCHEDULED,
+        "base_price": 500.0,
+    } for i in range(flights)])
+    session.commit()
+
+async def _writer(Session, stop: asyncio.Event, rng: random.Random, users: int, flights: int,
+                  counts: dict) -> None:
+    while not stop.is_set():
+        async with Session() as session:
+            async with AsyncUnitOfWork(session):
+                booked = await AsyncBookingService(session).create_booking(
+                    rng.randint(1, users), rng.randint(1, flights), seat_number(rng.randrange(SEAT_POSITIONS))
+                )
+        counts["attempts"] += 1
+        counts["booked"] += booked is not None
+
+async def _reader(Session, stop: asyncio.Event, rng: random.Random, users: int, counts: dict) -> None:
+    while not stop.is_set():
+        async with Session() as session:
+            if rng.random() < 0.5:
+                await AsyncFlightService(session).get_all_flights(limit=100)
+            else:
+                await AsyncBookingService(session).get_user_bookings_page(rng.randint(1, users), limit=50)
+        counts["reads"] += 1
+
+async def _run(write_factory, read_factory, readers: int, writers: int, seconds: float,
+               users: int, flights: int, seed: int) -> dict:
+    counts = {"attempts": 0, "booked": 0, "reads": 0}
+    stop = asyncio.Event()
+    tasks = [
+        asyncio.create_task(_writer(write_factory, stop, random.Random(seed + i), users, flights, counts))
+        for i in range(writers)
+    ] + [
+        asyncio.create_task(_reader(read_factory, stop, random.Random(seed + 1000 + i), users, counts))
+        for i in range(readers)
+    ]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--readers", type=int, default=64)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--flights", type=int, default=200)
+    parser.add_argument("--profile", default="prod-read-heavy")
+    parser.add_argument("--seed", type=int, default=17)
+    args = parser.parse_args()
+
+    scenarios = (
+        ("writes only", 0, False),
+        ("reads on primary", args.readers, False),
+        ("reads on replica", args.readers, True),
+    )
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:g} s per run, "
+          f"profile {args.profile}\n")
+    print(f"{'scenario':<20}{'bookings/s':>12}{'reads/s':>10}")
+    for name, readers, use_replica in scenarios:
+        # Fresh databases per run so every scenario books into empty flights
+        with tempfile.TemporaryDirectory() as tmp:
+            primary_path = os.path.join(tmp, "primary.db")
+            engine = create_db_engine(f"sqlite:///{primary_path}", args.profile)
+            Base.metadata.create_all(engine)
+            with sessionmaker(bind=engine)() as session:
+                _seed(session, args.users, args.flights)
+            replica_path = os.path.join(tmp, "replica.db")
+            snapshot_database(engine, replica_path)
+            engine.dispose()
+
+            primary = create_async_db_engine(f"sqlite:///{primary_path}", args.profile)
+            write_factory = async_sessionmaker(primary, autoflush=False, expire_on_commit=False)
+            replica = None
+            if use_replica:
+                replica = create_async_db_engine(
+                    f"sqlite:///file:{replica_path}?mode=ro&immutable=1&uri=true", args.profile
+                )
+                read_factory = async_sessionmaker(replica, autoflush=False, expire_on_commit=False)
+            else:
+                read_factory = write_factory
+
+            async def run():
+                try:
+                    return await _run(write_factory, read_factory, readers, args.writers,
+                                      args.seconds, args.users, args.flights, args.seed)
+                finally:
+                    await primary.dispose()
+                    if replica is not None:
+                        await replica.dispose()
+            started = time.perf_counter()
+            counts = asyncio.run(run())
+            elapsed = time.perf_counter() - started
+
+        print(f"{name:<20}{counts['booked'] / elapsed:>12.0f}{counts['reads'] / elapsed:>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Per-request SQL check of the API: call the customer and admin endpoints
+in-process with QUERY_CHECKS on, on a copy of a shared dataset, and print
+each endpoint's statements and database time from /api/admin/query-stats.
+
+Bookings and history are requested as the dataset's most frequent flyers,
+where an N+1 would show most. First the detector itself is checked: a
+lazy load and a statement repeated per row must both raise. Exits non-zero
+if they do not, or if a request fails (including on a repeated statement
+or lazy load) or lacks the X-DB-* headers.
+
+Usage:
+    python -m src.benchmarks.request_queries --preset small
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import httpx
+
+# Calls of each endpoint
+CALLS = 5
+
+def _check_detector(Session) -> list:
+    """Problems with the detector: a lazy load and an N+1 that it let through."""
+    from sqlalchemy import select
+    from src.models.database import Booking, Flight
+    from src.query_stats import QueryCheckError, track_queries
+
+    problems = []
+    with Session() as session:
+        try:
+            with track_queries(checks=True):
+                booking = session.execute(select(Booking).limit(1)).scalar_one()
+                booking.flight.flight_number
+            problems.append("a lazy load of Booking.flight did not raise")
+        except QueryCheckError:
+            pass
+    with Session() as session:
+        try:
+            with track_queries(checks=True, repeat_limit=5) as queries:
+                for flight_id in range(1, 12):
+                    session.execute(select(Flight).where(Flight.id == flight_id)).scalar_one()
+            problems.append(f"a statement run {queries.max_repeats} times did not raise")
+        except QueryCheckError:
+            pass
+    return problems
+
+async def _call_endpoints(app, Session) -> list:
+    """Call each endpoint CALLS times; returns the failures."""
+    from sqlalchemy import select, func
+    from sqlalchemy.orm import aliased
+    from src.auth import create_access_token
+    from src.models.database import Airport, Booking, Flight, User
+    from src.utils.seat_map import seat_layout
+
+    now = datetime.now()
+    departure, arrival = aliased(Airport), aliased(Airport)
+    with Session() as session:
+        flyers = session.execute(
+            select(User.username).join(Booking, Booking.user_id == User.id)
+            .group_by(User.id).order_by(func.count().desc()).limit(CALLS)
+        ).scalars().all()
+        flights = session.execute(
+            select(Flight.id, departure.code, arrival.code, Flight.departure_time, Flight.aircraft_type,
+                   Flight.total_seats)
+            .join(departure, Flight.departure_airport_id == departure.id)
+            .join(arrival, Flight.arrival_airport_id == arrival.id)
+            .where(Flight.departure_time > now + timedelta(days=3), Flight.available_seats > 0)
+            .order_by(Flight.id).limit(CALLS)
+        ).all()
+        taken = set(session.execute(select(Booking.flight_id, Booking.seat_number).where(
+            Booking.flight_id.in_([flight.id for flight in flights]), Booking.booking_status == "confirmed"
+        )).all())
+
+    def headers(username: str) -> dict:
+        return {"Authorization": f"Bearer {create_access_token(data={'sub': username})}"}
+
+    admin = headers("admin")
+    today = now.date()
+    failures = []
+    await app.router.startup()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://request-queries", timeout=None) as client:
+
+        async def call(method: str, url: str, **kwargs) -> httpx.Response:
+            try:
+                response = await client.request(method, url, **kwargs)
+            except Exception as e:
+                failures.append(f"{method} {url}: {type(e).__name__}: {e}")
+                return None
+            if response.status_code >= 400:
+                failures.append(f"{method} {url}: {response.status_code} {response.text[:200]}")
+            elif "X-DB-Statements" not in response.headers:
+                failures.append(f"{method} {url}: no X-DB-Statements header")
+            return response
+
+        for username, (flight_id, code_from, code_to, departure_time, aircraft_type, total_seats) in zip(flyers, flights):
+            customer = headers(username)
+            day = departure_time.replace(hour=0, minute=0, second=0, microsecond=0)
+            search = {"departure_airport": code_from, "arrival_airport": code_to, "date": day.isoformat()}
+            await call("GET", "/api/flights/", headers=customer)
+            await call("POST", "/api/flights/search", json=search, headers=customer)
+            await call("POST", "/api/flights/connections", json=search, headers=customer)
+            await call("GET", "/api/flights/calendar", headers=customer, params={
+                "departure_airport": code_from, "arrival_airport": code_to, "date": day.isoformat()
+            })
+            await call("GET", f"/api/flights/{flight_id}/seats", headers=customer)
+            await call("GET", "/api/bookings/", headers=customer, params={"limit": 500})
+            await call("POST", "/api/bookings/history", headers=customer, params={"limit": 500}, json={
+                "start_date": (now - timedelta(days=365)).isoformat(), "end_date": now.isoformat()
+            })
+            seat = next(seat for seat in seat_layout(aircraft_type, total_seats).seat_numbers()
+                        if (flight_id, seat) not in taken)
+            booked = await call("POST", "/api/bookings/", headers=customer,
+                                json={"flight_id": flight_id, "seat_number": seat})
+            if booked is not None and booked.status_code == 200:
+                await call("POST", f"/api/bookings/{booked.json()['id']}/cancel", headers=customer)
+
+            await call("GET", "/api/admin/inventory", headers=admin, params={
+                "start_date": today.isoformat(), "end_date": (today + timedelta(days=7)).isoformat()
+            })
+            await call("GET", "/api/admin/analytics/bookings", headers=admin)
+            for name in ("bookings", "flights"):
+                await call("GET", f"/api/admin/export/{name}", headers=admin, params={
+                    "format": "ndjson", "start_date": (now - timedelta(days=1)).isoformat(),
+                    "end_date": now.isoformat()
+                })
+
+        response = await client.get("/api/admin/query-stats", headers=admin)
+    await app.router.shutdown()
+
+    print(f"{'endpoint':<42}{'requests':>9}{'stmts/req':>10}{'max':>5}{'db ms/req':>11}{'slowest ms':>12}"
+          f"{'repeats':>9}")
+    for endpoint, stats in response.json().items():
+        print(f"{endpoint:<42}{stats['requests']:>9}{stats['statements_per_request']:>10.1f}"
+              f"{stats['max_statements']:>5}{stats['db_ms_per_request']:>11.2f}{stats['slowest_ms']:>12.2f}"
+              f"{stats['max_repeats']:>9}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--preset", default="small", help="dataset preset (default small)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "request_queries.db")
+        # The app's engines and query checks are configured from the environment
+        # when its modules are first imported, so they are imported after this
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+        os.environ["QUERY_CHECKS"] = "1"
+        os.environ.pop("DATABASE_READ_URL", None)
+        from src.benchmarks.datasets import cached_dataset
+        as_of = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        shutil.copyfile(cached_dataset(args.preset, seed=args.seed, as_of=as_of)[len("sqlite:///"):], path)
+
+        from src.main import app
+        from src.models.database import SessionLocal, engine
+
+        failures = _check_detector(SessionLocal)
+        failures += asyncio.run(_call_endpoints(app, SessionLocal))
+        engine.dispose()
+
+    if failures:
+        print("\nFailures:")
+        for failure in failures:
+            print(f"    {failure}")
+        sys.exit(1)
+    print("\nNo request repeated a statement or lazy-loaded, and every response has X-DB-* headers")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Schedule import: time loading a season of flights from a CSV feed, and check
+that an import killed part-way resumes to the same result.
+
+A feed of --flights flights over 1,000 airports is loaded into an empty
+database with the flight indexes kept in place and with them dropped and
+rebuilt (the default). The same feed is then imported by `init_db
+import-schedule` in a subprocess that is killed with SIGKILL once some
+chunks are committed; the rerun must resume after them and leave exactly
+the feed's flights, the flight indexes and a consistent route inventory.
+Finally the feed's first flights are imported again as JSON and NDJSON
+with more seats, and flights that sold seats must keep them. Exits
+non-zero on a mismatch.
+
+Usage:
+    python -m src.benchmarks.schedule_import --flights 500000
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func, inspect, update
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Base, create_db_engine, Airport, Flight, FlightStatus
+from src.dal.base_dal import BaseDAL
+from src.dal.inventory_dal import InventoryDAL
+from src.bll.schedule_import_service import ScheduleImportService, DEFAULT_IMPORT_CHUNK_SIZE
+
+AIRPORTS = 1000
+FIELDS = ["flight_number", "departure_airport", "arrival_airport", "departure_time", "arrival_time",
+          "aircraft_type", "total_seats", "base_price", "status"]
+# Flights re-imported as JSON and NDJSON to check updates
+UPDATED_FLIGHTS = 20000
+
+def _codes() -> list:
+    return ["".join(letters) for letters in itertools.islice(itertools.product(string.ascii_uppercase, repeat=3),
+                                                             AIRPORTS)]
+
+def _write_feed(path: str, flights: int, rng: random.Random, start: datetime) -> tuple:
+    """Write the CSV feed; returns (flights, sum of total_seats)."""
+    codes = _codes()
+    seats = 0
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(FIELDS)
+        for i in range(flights):
+            departure, arrival = rng.sample(codes, 2)
+            departure_time = start + timedelta(minutes=rng.randrange(180 * 24 * 60))
+            total_seats = rng.choice((150, 180, 250, 300))
+            seats += total_seats
+            writer.writerow([
+                f"S{i}", departure, arrival, departure_time.isoformat(),
+                (departure_time + timedelta(minutes=rng.randint(60, 900))).isoformat(),
+                "Airbus A320", total_seats, rng.randint(5000, 90000) / 100, "scheduled"
+            ])
+    return flights, seats
+
+def _database(tmp: str, name: str):
+    url = f"sqlite:///{os.path.join(tmp, name)}"
+    engine = create_db_engine(url)
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        BaseDAL(session, Airport).bulk_create([
+            {"code": code, "name": code, "city": code, "country": "Testland"} for code in _codes()
+        ])
+    return url, engine
+
+def _totals(engine) -> tuple:
+    with engine.connect() as conn:
+        return tuple(conn.execute(select(
+            func.count(), func.count(func.distinct(Flight.flight_number)), func.sum(Flight.total_seats)
+        )).one())
+
+def _check(engine, expected: tuple, label: str) -> None:
+    flights, seats = expected
+    got = _totals(engine)
+    if got != (flights, flights, seats):
+        print(f"MISMATCH {label}: (flights, distinct numbers, seats) {got}, expected {(flights, flights, seats)}")
+        sys.exit(1)
+    indexes = {index["name"] for index in inspect(engine).get_indexes("flights")}
+    missing = {index.name for index in Flight.__table__.indexes} - indexes
+    if missing:
+        print(f"MISMATCH {label}: flight indexes missing after the import: {', '.join(sorted(missing))}")
+        sys.exit(1)
+    with sessionmaker(bind=engine)() as session:
+        problems = InventoryDAL(session).check()
+    if problems:
+        print(f"MISMATCH {label}: route inventory differs, e.g. {problems[0]}")
+        sys.exit(1)
+
+def _timed_import(tmp: str, feed: str, expected: tuple, keep_indexes: bool) -> dict:
+    name = "keep.db" if keep_indexes else "drop.db"
+    _, engine = _database(tmp, name)
+    with sessionmaker(bind=engine)() as session:
+        result = ScheduleImportService(session).import_schedule(feed, keep_indexes=keep_indexes)
+    _check(engine, expected, name)
+    engine.dispose()
+    return result
+
+def _killed_and_resumed(tmp: str, feed: str, expected: tuple, chunk_size: int) -> dict:
+    url, engine = _database(tmp, "resume.db")
+    env = dict(os.environ, DATABASE_URL=url)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.init_db", "import-schedule", feed, "--chunk-size", str(chunk_size)],
+        env=env, stdout=subprocess.DEVNULL
+    )
+    # Kill it once a third of the feed is committed
+    committed = 0
+    while process.poll() is None and committed < expected[0] // 3:
+        time.sleep(0.2)
+        with engine.connect() as conn:
+            committed = conn.exec_driver_sql("SELECT coalesce(max(records_read), 0) FROM schedule_imports").scalar()
+    process.kill()
+    process.wait()
+    with engine.connect() as conn:
+        committed = conn.exec_driver_sql("SELECT coalesce(max(records_read), 0) FROM schedule_imports").scalar()
+        loaded = conn.execute(select(func.count()).select_from(Flight)).scalar()
+    if committed == 0 or committed >= expected[0] or committed != loaded:
+        print(f"MISMATCH kill: {committed} records committed but {loaded} flights loaded")
+        sys.exit(1)
+
+    with sessionmaker(bind=engine)() as session:
+        result = ScheduleImportService(session).import_schedule(feed, chunk_size=chunk_size)
+    if result["resumed_from"] != committed:
+        print(f"MISMATCH resume: started after record {result['resumed_from']}, {committed} were committed")
+        sys.exit(1)
+    _check(engine, expected, "resumed import")
+    return {"committed": committed, "engine": engine, "result": result}
+
+def _updated_feeds(tmp: str, feed: str, engine) -> None:
+    """Re-import the first flights with 10 more seats; seats already sold must stay sold."""
+    with open(feed, newline="") as file:
+        records = list(itertools.islice(csv.DictReader(file), UPDATED_FLIGHTS))
+    for record in records:
+        record["total_seats"] = int(record["total_seats"]) + 10
+    json_path = os.path.join(tmp, "update.json")
+    ndjson_path = os.path.join(tmp, "update.ndjson")
+    with open(json_path, "w") as file:
+        json.dump(records[:UPDATED_FLIGHTS // 2], file, indent=1)
+    with open(ndjson_path, "w") as file:
+        file.writelines(json.dumps(record) + "\n" for record in records[UPDATED_FLIGHTS // 2:])
+
+    sold = {f"S{i}": 7 for i in range(0, UPDATED_FLIGHTS, 3)}
+    with sessionmaker(bind=engine)() as session:
+        session.execute(update(Flight).where(Flight.flight_number.in_(sold)).values(
+            available_seats=Flight.available_seats - 7
+        ))
+        session.commit()
+        before = dict(session.execute(select(Flight.flight_number, Flight.total_seats)).all())
+        for path in (json_path, ndjson_path):
+            result = ScheduleImportService(session).import_schedule(path)
+            if result["flights_loaded"] != UPDATED_FLIGHTS // 2 or result["rejected"]:
+                print(f"MISMATCH {path}: {result['flights_loaded']} loaded, {result['rejected']} rejected")
+                sys.exit(1)
+        rows = session.execute(select(
+            Flight.flight_number, Flight.total_seats, Flight.available_seats, Flight.status
+        ).where(Flight.flight_number.in_([record["flight_number"] for record in records]))).all()
+    for number, total_seats, available_seats, status in rows:
+        want = before[number] + 10
+        if total_seats != want or available_seats != want - sold.get(number, 0) \
+                or status != FlightStatus.SCHEDULED:
+            print(f"MISMATCH update of {number}: {total_seats} seats, {available_seats} available")
+            sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--flights", type=int, default=500000)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_IMPORT_CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=21)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        feed = os.path.join(tmp, "season.csv")
+        expected = _write_feed(feed, args.flights, rng, datetime(2025, 3, 30))
+        print(f"{args.flights} flights over {AIRPORTS} airports, {os.path.getsize(feed) / 1e6:.1f} MB of CSV\n")
+
+        print(f"{'indexes':<22}{'load s':>8}{'rows/s':>10}{'index s':>9}{'inventory s':>13}")
+        for keep_indexes in (True, False):
+            result = _timed_import(tmp, feed, expected, keep_indexes)
+            print(f"{'kept' if keep_indexes else 'dropped and rebuilt':<22}{result['load_seconds']:>8.1f}"
+                  f"{result['rows_per_second']:>10.0f}{result['index_seconds']:>9.1f}"
+                  f"{result['inventory_seconds']:>13.1f}")
+
+        resumed = _killed_and_resumed(tmp, feed, expected, args.chunk_size)
+        print(f"\nkilled after {resumed['committed']} committed records; resumed and loaded the other "
+              f"{args.flights - resumed['committed']} at {resumed['result']['rows_per_second']:.0f} rows/s")
+        _updated_feeds(tmp, feed, resumed["engine"])
+        resumed["engine"].dispose()
+        print("imports match the feed; resumed, JSON and NDJSON imports are consistent")
+
+if __name__ == "__main__":
+    main()
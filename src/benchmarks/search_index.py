@@ -0,0 +1,124 @@
+"""
+Flight search latency: in-memory route/date index versus the database path.
+
+Usage:
+    python -m src.benchmarks.search_index --flights 1000000 --airports 200 --searches 5000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Base, create_db_engine, ensure_indexes, Airport, Flight, FlightStatus
+from src.dal.base_dal import BaseDAL
+from src.bll.flight_service import FlightService
+from src.bll.flight_search_index import flight_search_index
+from src.bll.search_cache import search_cache
+
+def _seed(session, flight_count: int, airport_count: int, days: int) -> datetime:
+    BaseDAL(session, Airport).bulk_create([
+        {"code": f"{i:03d}", "name": f"Airport {i}", "city": f"City {i}", "country": "XX"}
+        for i in range(airport_count)
+    ])
+    start = (datetime.now() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    rng = random.Random(7)
+    batch = []
+    for i in range(flight_count):
+        origin = rng.randrange(airport_count)
+        destination = (origin + rng.randrange(1, airport_count)) % airport_count
+        departure = start + timedelta(minutes=rng.randrange(days * 24 * 60))
+        batch.append({
+            "flight_number": f"IX{i}",
+            "departure_airport_id": origin + 1,
+            "arrival_airport_id": destination + 1,
+            "departure_time": departure,
+            "arrival_time": departure + timedelta(hours=3),
+            "aircraft_type": "Airbus A320",
+            "total_seats": 180,
+            "available_seats": 180,
+            "status": FlightStatus.SCHEDULED,
+            "base_price": 120.0,
+        })
+        if len(batch) == 50000:
+            BaseDAL(session, Flight).bulk_create(batch)
+            batch = []
+    if batch:
+        BaseDAL(session, Flight).bulk_create(batch)
+    session.commit()
+    return start
+
+def _time_searches(service, queries) -> list:
+    latencies = []
+    for origin, destination, day in queries:
+        started = time.perf_counter()
+        service.search_available_flights(origin, destination, day)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+def _report(name: str, latencies: list) -> None:
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<10}{len(latencies):>10}{statistics.median(latencies):>12.3f}{p99:>12.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--flights", type=int, default=200000)
+    parser.add_argument("--airports", type=int, default=200)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--searches", type=int, default=5000)
+    parser.add_argument("--db-searches", type=int, default=500)
+    args = parser.parse_args()
+
+    # Measure the search paths themselves, not the result cache in front of them
+    search_cache.max_bytes = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'search.db')}", "prod-read-heavy")
+        Base.metadata.create_all(engine)
+        ensure_indexes(engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as session:
+            start = _seed(session, args.flights, args.airports, args.days)
+
+        rng = random.Random(11)
+        queries = [
+            (f"{rng.randrange(args.airports):03d}", f"{rng.randrange(args.airports):03d}",
+             start + timedelta(days=rng.randrange(args.days)))
+            for _ in range(args.searches)
+        ]
+
+        with Session() as session:
+            service = FlightService(session)
+            db_latencies = _time_searches(service, queries[:args.db_searches])
+
+            started = time.perf_counter()
+            loaded = flight_search_index.load(session.connection())
+            print(f"index load: {loaded} flights in {time.perf_counter() - started:.2f}s\n")
+            mismatches = sum(
+                service.search_available_flights(*query) != _db_search(session, *query)
+                for query in queries[:100]
+            )
+            index_latencies = _time_searches(service, queries)
+            flight_search_index.clear()
+        engine.dispose()
+
+    print(f"{'path':<10}{'searches':>10}{'p50 ms':>12}{'p99 ms':>12}")
+    _report("database", db_latencies)
+    _report("index", index_latencies)
+    print(f"\nresult mismatches against the database (100 searches): {mismatches}")
+
+def _db_search(session, origin, destination, day):
+    """Run a search on the database path while the index is loaded."""
+    flight_search_index.loaded = False
+    try:
+        return FlightService(session).search_available_flights(origin, destination, day)
+    finally:
+        flight_search_index.loaded = True
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Concurrent booking contention on a single flight.
+
+Many threads race to book random seats on one flight through
+BookingService.create_booking. Afterwards the run is checked for oversells
+(more confirmed bookings than seats taken from the flight, or a negative
+seat count) and for seats held by more than one confirmed booking.
+
+Usage:
+    python -m src.benchmarks.seat_contention --threads 16 --seats 200 --attempts 2000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Base, create_db_engine, Airport, Booking, Flight, FlightStatus, User, UserRole
+from src.dal.base_dal import BaseDAL
+from src.bll.booking_service import BookingService
+from src.utils.seat_map import seat_layout
+
+AIRCRAFT_TYPE = "Boeing 777"
+
+def _seed(session, seats: int) -> None:
+    BaseDAL(session, Airport).bulk_create([
+        {"code": "LHR", "name": "London Heathrow", "city": "London", "country": "UK"},
+        {"code": "JFK", "name": "John F. Kennedy", "city": "New York", "country": "USA"},
+    ])
+    BaseDAL(session, User).bulk_create([{
+        "username": "racer", "email": "racer@example.com",
+        "password_hash": "x", "role": UserRole.CUSTOMER
+    }])
+    departure = datetime.now() + timedelta(days=10)
+    BaseDAL(session, Flight).bulk_create([{
+        "flight_number": "RC1",
+        "departure_airport_id": 1,
+        "arrival_airport_id": 2,
+        "departure_time": departure,
+        "arrival_time": departure + timedelta(hours=8),
+        "aircraft_type": AIRCRAFT_TYPE,
+        "total_seats": seats,
+        "available_seats": seats,
+        "status": FlightStatus.SCHEDULED,
+        "base_price": 500.0,
+    }])
+    session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seats", type=int, default=200)
+    parser.add_argument("--attempts", type=int, default=2000, help="booking attempts in total")
+    parser.add_argument("--profile", default="dev")
+    args = parser.parse_args()
+
+    # Every seat of the flight, with more attempts than seats, so threads also race on a full flight
+    seat_numbers = seat_layout(AIRCRAFT_TYPE, args.seats).seat_numbers()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'contention.db')}", args.profile)
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as session:
+            _seed(session, args.seats)
+
+        counts = {"booked": 0, "rejected": 0, "lock_errors": 0}
+        lock = threading.Lock()
+        per_thread = args.attempts // args.threads
+
+        def worker():
+            rng = random.Random()
+            booked = rejected = errors = 0
+            with Session() as session:
+                service = BookingService(session)
+                for _ in range(per_thread):
+                    try:
+                        if service.create_booking(1, 1, rng.choice(seat_numbers)):
+                            booked += 1
+                        else:
+                            rejected += 1
+                    except OperationalError:
+                        session.rollback()
+                        errors += 1
+            with lock:
+                counts["booked"] += booked
+                counts["rejected"] += rejected
+                counts["lock_errors"] += errors
+
+        threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        with Session() as session:
+            flight = session.get(Flight, 1)
+            confirmed = session.execute(
+                select(func.count()).select_from(Booking).where(Booking.booking_status == "confirmed")
+            ).scalar_one()
+            duplicate_seats = session.execute(
+                select(Booking.seat_number)
+                .where(Booking.booking_status == "confirmed")
+                .group_by(Booking.flight_id, Booking.seat_number)
+                .having(func.count() > 1)
+            ).all()
+            available = flight.available_seats
+        engine.dispose()
+
+    oversold = confirmed - (args.seats - available)
+    print(f"attempts:         {per_thread * args.threads}")
+    print(f"booked:           {counts['booked']}")
+    print(f"rejected:         {counts['rejected']}")
+    print(f"lock errors:      {counts['lock_errors']}")
+    print(f"seats left:       {available}")
+    print(f"oversold:         {oversold}")
+    print(f"duplicate seats:  {len(duplicate_seats)}")
+    print(f"elapsed:          {elapsed:.2f}s")
+    print(f"bookings/sec:     {counts['booked'] / elapsed:.0f}")
+    print(f"attempts/sec:     {per_thread * args.threads / elapsed:.0f}")
+
+    if oversold or available < 0 or duplicate_seats or confirmed != counts["booked"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import asyncio
+from typing import List, Optional, Dict, Sequence
+from datetime import date, datetime
+from ..dal.async_booking_dal import AsyncBookingDAL
+from ..dal.async_flight_dal import AsyncFlightDAL
+from ..dal.unit_of_work import AsyncUnitOfWork
+from ..models.database import Booking, ReadSessionLocal
+from .booking_service import BookingService
+from .pricing import quote_flight
+from .booking_analytics import booking_rollup, report_rows, REFRESH_INTERVAL_SECONDS
+from sqlalchemy.ext.asyncio import AsyncSession
+
+def _refresh_booking_rollup() -> None:
+    with ReadSessionLocal() as session:
+        booking_rollup.refresh(session, max_age=REFRESH_INTERVAL_SECONDS)
+
+class AsyncBookingService:
+    """BookingService on an AsyncSession, used by the API routes."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.booking_dal = AsyncBookingDAL(session)
+        self.flight_dal = AsyncFlightDAL(session)
+
+    async def create_booking(self, user_id: int, flight_id: int, seat_number: str) -> Optional[Dict]:
+        """Create a new booking with business logic validation."""
+        async with AsyncUnitOfWork(self.session):
+            # Validate flight exists and has available seats
+            flight = await self.flight_dal.get_by_id(flight_id)
+            if not flight or flight.available_seats < 1:
+                return None
+
+            # Validate seat number format and availability
+            if not BookingService._is_valid_seat_number(seat_number, flight.aircraft_type, flight.total_seats):
+                return None
+
+            # Check if seat is already booked
+            if await self._is_seat_taken(flight_id, seat_number):
+                return None
+
+            # Calculate total price from the flight already loaded
+            total_price = quote_flight(flight)
+
+            booking = await self.booking_dal.create_booking(
+                user_id=user_id,
+                flight_id=flight_id,
+                seat_number=seat_number,
+                total_price=total_price
+            )
+
+            if booking:
+                return await self.booking_dal.get_booking_details(booking.id)
+            return None
+
+    async def cancel_booking(self, booking_id: int, user_id: int) -> Optional[Dict]:
+        """Cancel a booking with business logic validation."""
+        async with AsyncUnitOfWork(self.session):
+            booking = await self.booking_dal.get_by_id(booking_id)
+            if not booking:
+                return None
+
+            # Validate user owns the booking
+            if booking.user_id != user_id:
+                return None
+
+            # Check if cancellation is allowed (e.g., not too close to flight time)
+            flight = await self.flight_dal.get_by_id(booking.flight_id)
+            if not flight:
+                return None
+
+            hours_until_flight = (flight.departure_time - datetime.now()).total_seconds() / 3600
+            if hours_until_flight < 24:  # Less than 24 hours before flight
+                return None
+
+            cancelled_booking = await self.booking_dal.cancel_booking(booking_id)
+            if cancelled_booking:
+                return await self.booking_dal.get_booking_details(booking_id)
+            return None
+
+    async def get_booking(self, booking_id: int) -> Optional[Booking]:
+        """Get a booking with its flight loaded, in the shape the API returns."""
+        return await self.booking_dal.get_with_flight(booking_id)
+
+    async def get_user_bookings(self, user_id: int) -> List[Dict]:
+        """Get all bookings for a user with business logic."""
+        bookings = await self.booking_dal.get_user_bookings(user_id)
+        return await self.booking_dal.get_booking_details_many([booking.id for booking in bookings])
+
+    async def get_user_bookings_page(self, user_id: int, cursor: Optional[str] = None, limit: int = 100,
+                                     start_date: Optional[datetime] = None,
+                                     end_date: Optional[datetime] = None) -> Dict:
+        """Get one page of a user's bookings, optionally within a date range."""
+        bookings, next_cursor = await self.booking_dal.get_user_bookings_page(
+            user_id, cursor=cursor, limit=limit, start_date=start_date, end_date=end_date
+        )
+        return {'items': bookings, 'next_cursor': next_cursor}
+
+    async def get_booking_history(self, user_id: int, start_date: datetime, end_date: datetime) -> List[Dict]:
+        """Get booking history for a user within a date range."""
+        bookings = await self.booking_dal.get_user_bookings_by_date_range(user_id, start_date, end_date)
+        return await self.booking_dal.get_booking_details_many([booking.id for booking in bookings])
+
+    async def get_booking_rollup(self, group_by: Sequence[str], start_date: Optional[date] = None,
+                                 end_date: Optional[date] = None) -> List[Dict]:
+        """Get revenue, bookings, cancellations and load factor grouped by the given dimensions."""
+        # The refresh reads through a sync session on the read engine
+        # (ReadSessionLocal) on a worker thread, not through this request's
+        # async session: the first one rolls up every booking, which takes
+        # seconds of NumPy work at scale and would hold the event loop
+        # through run_sync
+        await asyncio.to_thread(_refresh_booking_rollup)
+        # The report itself is in memory
+        return report_rows(booking_rollup.report(group_by, start_date=start_date, end_date=end_date))
+
+    async def _is_seat_taken(self, flight_id: int, seat_number: str) -> bool:
+        """Check if a seat is already booked."""
+        seat_map = await self.flight_dal.get_seat_map(flight_id)
+        return seat_map is not None and seat_map.is_taken(seat_number)
@@ -0,0 +1,35 @@
+from typing import AsyncIterator, Optional
+from datetime import datetime
+from ..dal.async_export_dal import AsyncExportDAL
+from ..dal.export_dal import ExportDAL, DEFAULT_EXPORT_CHUNK_SIZE
+from ..utils.export_formats import export_writer
+from .export_service import check_export_request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+class AsyncExportService:
+    """ExportService on an AsyncSession, used by the API routes."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.export_dal = AsyncExportDAL(session)
+
+    def export_bookings(self, export_format: str, start_date: Optional[datetime] = None,
+                        end_date: Optional[datetime] = None,
+                        chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Bookings made in [start_date, end_date), in the export format."""
+        check_export_request(export_format, start_date, end_date)
+        return self._export(ExportDAL._bookings_query(start_date, end_date), export_format, chunk_size)
+
+    def export_flights(self, export_format: str, start_date: Optional[datetime] = None,
+                       end_date: Optional[datetime] = None,
+                       chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Flights departing in [start_date, end_date), in the export format."""
+        check_export_request(export_format, start_date, end_date)
+        return self._export(ExportDAL._flights_query(start_date, end_date), export_format, chunk_size)
+
+    async def _export(self, stmt, export_format: str, chunk_size: int) -> AsyncIterator[bytes]:
+        writer = export_writer(export_format, ExportDAL.columns(stmt))
+        yield writer.header()
+        async for chunk in self.export_dal.stream(stmt, chunk_size):
+            yield writer.rows(chunk)
+        yield writer.footer()
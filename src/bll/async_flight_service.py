@@ -0,0 +1,179 @@
+from typing import List, Optional, Dict
+from datetime import date, datetime, timedelta
+from ..models.database import Flight, FlightStatus
+from ..dal.async_flight_dal import AsyncFlightDAL
+from ..dal.async_inventory_dal import AsyncInventoryDAL
+from ..dal.unit_of_work import AsyncUnitOfWork
+from .flight_service import VALID_STATUS_TRANSITIONS, fare_calendar_window, check_summary_range
+from ..utils.seat_map import seat_layout
+from .flight_search_index import flight_search_index
+from .search_cache import search_cache
+from .pricing import quote_flight, price_results, fare_calendar
+from .connection_search import (
+    connection_graph, MAX_STOPS, MIN_CONNECTION_MINUTES, MAX_CONNECTION_MINUTES, EARLIEST_ARRIVAL
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+class AsyncFlightService:
+    """FlightService on an AsyncSession, used by the API routes."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.flight_dal = AsyncFlightDAL(session)
+        self.inventory_dal = AsyncInventoryDAL(session)
+
+    async def get_all_flights(self, cursor: Optional[str] = None, limit: int = 100) -> Dict:
+        """Get one page of flights in departure order with the next page's cursor."""
+        flights, next_cursor = await self.flight_dal.get_flights_page(cursor=cursor, limit=limit)
+        return {'items': flights, 'next_cursor': next_cursor}
+
+    async def create_flight(self, flight_data) -> Flight:
+        """Create a flight from FlightCreate data, with its airports loaded."""
+        fields = flight_data.dict()
+        fields['status'] = FlightStatus(fields['status'])
+        async with AsyncUnitOfWork(self.session):
+            flight = await self.flight_dal.create(**fields)
+            await self.session.refresh(flight, ['departure_airport', 'arrival_airport'])
+        return flight
+
+    async def search_available_flights(self, departure_airport: str, arrival_airport: str,
+                                       date: datetime) -> List[Dict]:
+        """Search for available flights with business logic validation."""
+        # Validate date is not in the past
+        if date < datetime.now():
+            return []
+
+        # Airport codes are stored upper-case; normalize so equal searches share a cache entry
+        departure_airport = departure_airport.strip().upper()
+        arrival_airport = arrival_airport.strip().upper()
+        results = await search_cache.get_or_load_async(
+            departure_airport, arrival_airport, date,
+            lambda: self._find_available_flights(departure_airport, arrival_airport, date)
+        )
+
+        # Fares depend on today's date, so they are quoted per request rather than cached
+        return price_results(results)
+
+    async def _find_available_flights(self, departure_airport: str, arrival_airport: str,
+                                      date: datetime) -> List[Dict]:
+        """Search for available flights, bypassing the result cache."""
+        # Answer from the in-memory index when it is loaded
+        if flight_search_index.loaded:
+            return flight_search_index.search(
+                departure_airport, arrival_airport,
+                date, date.replace(hour=23, minute=59, second=59)
+            )
+
+        flights = await self.flight_dal.search_flights(departure_airport, arrival_airport, date)
+        available_ids = [
+            flight.id for flight in flights
+            if flight.available_seats > 0 and flight.status == FlightStatus.SCHEDULED
+        ]
+        return await self.flight_dal.get_flight_details_many(available_ids)
+
+    async def get_fare_calendar(self, departure_airport: str, arrival_airport: str,
+                                date: Optional[datetime] = None, days: int = 3,
+                                month: Optional[str] = None) -> List[Dict]:
+        """Get the lowest fare and seats left for each day around a date or over a month."""
+        first_day, day_count = fare_calendar_window(date, days, month)
+        if not day_count:
+            return []
+
+        departure_airport = departure_airport.strip().upper()
+        arrival_airport = arrival_airport.strip().upper()
+        end = first_day + timedelta(days=day_count)
+        # One range scan over the whole window, from the index when it is loaded
+        if flight_search_index.loaded:
+            flights = flight_search_index.search(departure_airport, arrival_airport, first_day, end)
+        else:
+            flights = await self.flight_dal.get_route_fares(departure_airport, arrival_airport, first_day, end)
+        return fare_calendar(flights, first_day, day_count)
+
+    async def search_connections(self, departure_airport: str, arrival_airport: str, date: datetime,
+                                 max_stops: int = MAX_STOPS,
+                                 min_connection_minutes: int = MIN_CONNECTION_MINUTES,
+                                 max_connection_minutes: int = MAX_CONNECTION_MINUTES,
+                                 objective: str = EARLIEST_ARRIVAL, limit: int = 10) -> List[Dict]:
+        """Search for itineraries with up to max_stops connections, best first."""
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        if date < today:
+            return []
+
+        # Load the connection graph on first use when startup did not
+        if not connection_graph.loaded:
+            await self.session.run_sync(
+                lambda session: connection_graph.load(session.connection(), since=today)
+            )
+
+        # The search itself is in memory and never waits on the database
+        return connection_graph.search(
+            departure_airport.strip().upper(), arrival_airport.strip().upper(), date,
+            max_stops=max_stops,
+            min_connection_minutes=min_connection_minutes,
+            max_connection_minutes=max_connection_minutes,
+            objective=objective, limit=limit
+        )
+
+    async def update_flight_status(self, flight_id: int, new_status: FlightStatus) -> Optional[Dict]:
+        """Update flight status with business logic validation."""
+        flight = await self.flight_dal.get_by_id(flight_id)
+        if not flight:
+            return None
+
+        # Validate status transition
+        if new_status not in VALID_STATUS_TRANSITIONS.get(flight.status, []):
+            return None
+
+        updated_flight = await self.flight_dal.update_flight_status(flight_id, new_status)
+        if updated_flight:
+            return await self.flight_dal.get_flight_details(flight_id)
+        return None
+
+    async def get_flight_availability(self, flight_id: int) -> Optional[Dict]:
+        """Get flight availability with business logic."""
+        flight = await self.flight_dal.get_by_id(flight_id)
+        if not flight:
+            return None
+
+        # Calculate availability percentage
+        availability_percentage = (flight.available_seats / flight.total_seats) * 100
+
+        return {
+            'flight_number': flight.flight_number,
+            'total_seats': flight.total_seats,
+            'available_seats': flight.available_seats,
+            'availability_percentage': availability_percentage,
+            'status': flight.status.value
+        }
+
+    async def get_inventory_summary(self, start_date: date, end_date: date) -> List[Dict]:
+        """Get seats and bookings per route and day from the inventory summary."""
+        check_summary_range(start_date, end_date)
+        return await self.inventory_dal.get_summary(start_date, end_date)
+
+    async def get_seat_availability(self, flight_id: int) -> Optional[Dict]:
+        """Get the free seats of a flight from its seat map."""
+        flight = await self.flight_dal.get_by_id(flight_id)
+        if not flight:
+            return None
+
+        seat_map = await self.flight_dal.get_seat_map(flight_id)
+        return {
+            'flight_id': flight.id,
+            'flight_number': flight.flight_number,
+            'available_seats': flight.available_seats,
+            'free_seats': seat_map.free_seats(seat_layout(flight.aircraft_type, flight.total_seats))
+        }
+
+    async def get_flights_by_route(self, departure_airport_id: int, arrival_airport_id: int) -> List[Dict]:
+        """Get flights by route with business logic."""
+        flights = await self.flight_dal.get_flights_by_route(departure_airport_id, arrival_airport_id)
+        route_ids = [flight.id for flight in flights if flight.status != FlightStatus.CANCELLED]
+        return await self.flight_dal.get_flight_details_many(route_ids)
+
+    async def calculate_flight_price(self, flight_id: int, seat_count: int = 1) -> Optional[float]:
+        """Calculate flight price with business logic."""
+        flight = await self.flight_dal.get_by_id(flight_id)
+        if not flight:
+            return None
+        return quote_flight(flight, seat_count=seat_count)
@@ -0,0 +1,378 @@
+import time
+from datetime import date, datetime, timedelta
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+import numpy as np
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from ..dal.analytics_dal import AnalyticsDAL, LEAD_TIME_BOUNDS, Watermark
+from ..dal.flight_events import on_flights_committed
+from ..query_stats import allow_repeated_statements
+from .flight_search_index import FLIGHT_INDEX_TTL_SECONDS
+
+# Dimensions a rollup report can be grouped by
+ROUTE = "route"
+DAY = "day"
+HOUR = "hour"
+LEAD_TIME = "lead_time"
+DIMENSIONS = (ROUTE, DAY, HOUR, LEAD_TIME)
+
+LEAD_TIME_BUCKETS = len(LEAD_TIME_BOUNDS) + 1
+LEAD_TIME_LABELS = (
+    [f"<{LEAD_TIME_BOUNDS[0]}d"]
+    + [f"{low}-{high}d" for low, high in zip(LEAD_TIME_BOUNDS, LEAD_TIME_BOUNDS[1:])]
+    + [f"{LEAD_TIME_BOUNDS[-1]}d+"]
+)
+
+# Reports reuse a refresh this recent instead of querying for new bookings again
+REFRESH_INTERVAL_SECONDS = 5.0
+
+# Flights per IN list when reading changed flights or recounting rescheduled ones
+_FLIGHT_CHUNK_SIZE = 500
+
+_MINUTES_PER_DAY = 24 * 60
+_MINUTE = timedelta(minutes=1)
+_EPOCH = datetime(1970, 1, 1)
+
+def _day_number(value: date) -> int:
+    return int(np.datetime64(value, 'D').astype(np.int64))
+
+class _Flights:
+    """Flight dimensions as columns sorted by flight id."""
+    __slots__ = ('ids', 'departure_airport', 'arrival_airport', 'departure_minute', 'seats')
+
+    def __init__(self, rows: Sequence[tuple] = ()):
+        columns = list(zip(*rows)) if rows else [(), (), (), (), ()]
+        self.ids = np.asarray(columns[0], dtype=np.int64)
+        self.departure_airport = np.asarray(columns[1], dtype=np.int64)
+        self.arrival_airport = np.asarray(columns[2], dtype=np.int64)
+        # Minutes since the epoch; day and hour are divisions of it
+        self.departure_minute = np.asarray(
+            [(departure - _EPOCH) // _MINUTE for departure in columns[3]], dtype=np.int64
+        )
+        self.seats = np.asarray(columns[4], dtype=np.int64)
+
+    @property
+    def last_id(self) -> int:
+        return int(self.ids[-1]) if len(self.ids) else 0
+
+    def updated(self, flight_ids: np.ndarray, rows: Sequence[tuple]) -> "_Flights":
+        """These flights with flight_ids read again as rows; those without a row were deleted."""
+        fresh = _Flights(rows)
+        _, first = np.unique(fresh.ids, return_index=True)
+        keep = ~np.isin(self.ids, np.union1d(flight_ids, fresh.ids))
+        result = _Flights()
+        for name in self.__slots__:
+            setattr(result, name, np.concatenate([getattr(self, name)[keep], getattr(fresh, name)[first]]))
+        order = np.argsort(result.ids, kind='stable')
+        for name in self.__slots__:
+            setattr(result, name, getattr(result, name)[order])
+        return result
+
+    def rescheduled_since(self, previous: "_Flights") -> np.ndarray:
+        """IDs of flights whose departure time differs from previous."""
+        common, mine, theirs = np.intersect1d(self.ids, previous.ids, assume_unique=True, return_indices=True)
+        return common[self.departure_minute[mine] != previous.departure_minute[theirs]]
+
+class _Delta:
+    """Changes to cells, accumulated as column chunks until merged."""
+
+    def __init__(self):
+        self.keys: List[np.ndarray] = []
+        self.bookings: List[np.ndarray] = []
+        self.cancellations: List[np.ndarray] = []
+        self.revenue: List[np.ndarray] = []
+
+    def add(self, flight_ids, buckets, bookings, cancellations, revenue) -> None:
+        self.keys.append(np.asarray(flight_ids, dtype=np.int64) * LEAD_TIME_BUCKETS
+                         + np.asarray(buckets, dtype=np.int64))
+        self.bookings.append(np.asarray(bookings, dtype=np.int64))
+        self.cancellations.append(np.asarray(cancellations, dtype=np.int64))
+        self.revenue.append(np.asarray(revenue, dtype=np.float64))
+
+    def flight_ids(self) -> np.ndarray:
+        """Distinct flights with a changed cell."""
+        if not self.keys:
+            return np.empty(0, np.int64)
+        return np.unique(np.concatenate(self.keys) // LEAD_TIME_BUCKETS)
+
+    def columns(self, exclude_flights: np.ndarray) -> tuple:
+        """Keys and summed measures, one per distinct cell, without the excluded flights' cells."""
+        if not self.keys:
+            return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0)
+        keys = np.concatenate(self.keys)
+        keep = ~np.isin(keys // LEAD_TIME_BUCKETS, exclude_flights)
+        keys, inverse = np.unique(keys[keep], return_inverse=True)
+
+        def total(chunks, dtype):
+            values = np.bincount(inverse, weights=np.concatenate(chunks)[keep], minlength=len(keys))
+            return values.astype(dtype)
+        return (keys, total(self.bookings, np.int64), total(self.cancellations, np.int64),
+                total(self.revenue, np.float64))
+
+class BookingRollup:
+    """Booking measures rolled up by route, departure day and hour, and booking lead time.
+
+    The finest cells are one flight and lead time bucket, held as sorted NumPy
+    columns: the bookings, cancellations and revenue of each, grouped in SQL
+    and streamed in chunks. Reports group the cells by any of the dimensions
+    through the flights' current route and departure time, and add the
+    flights' seats for the load factor.
+
+    A refresh only reads what changed since its watermark, the highest
+    booking id and cancellation sequence number seen: bookings made since,
+    counted with their status as of the new watermark, and earlier bookings
+    cancelled since, moved from booked to cancelled. Flights rescheduled
+    since the last refresh have their bookings recounted, as their lead
+    times moved with them.
+
+    Only the flights a refresh needs are read again: those of the new
+    bookings and cancellations, those committed in this process since (see
+    mark_flights_changed) and any added after the highest known id. Every
+    flight is read again once the last full read is FLIGHT_INDEX_TTL_SECONDS
+    old, which picks up flights rescheduled by other processes.
+
+    Database reads happen outside the lock, which only guards swapping in
+    the result; a refresh that finds another one applied first drops its own.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._generation = 0
+        # Flights committed since a refresh last read them; kept across resets,
+        # as a rebuild that is dropped has not read them either
+        self._changed_flights: Set[int] = set()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.watermark: Watermark = (0, 0)
+        self.loaded = False
+        # Bumped on every change, so a refresh started before one is not applied over it
+        self._generation += 1
+        self._refreshed_at = 0.0
+        self._flights_read_at = 0.0
+        self._keys = np.empty(0, np.int64)
+        self._bookings = np.empty(0, np.int64)
+        self._cancellations = np.empty(0, np.int64)
+        self._revenue = np.empty(0, np.float64)
+        self._flights = _Flights()
+        self._airport_codes: Dict[int, str] = {}
+
+    def mark_flights_changed(self, flight_ids: Iterable[int]) -> None:
+        """Have the next refresh read these flights again, e.g. after they were rescheduled."""
+        with self._lock:
+            self._changed_flights.update(flight_ids)
+
+    def rebuild(self, session: Session) -> Dict:
+        """Drop the cells and roll up every booking again."""
+        with self._lock:
+            self._reset()
+        return self.refresh(session)
+
+    def refresh(self, session: Session, max_age: float = 0.0) -> Dict:
+        """Fold in the bookings and cancellations committed since the last refresh.
+
+        Does nothing when the last refresh is younger than max_age seconds.
+        """
+        with self._lock:
+            if self.loaded and time.monotonic() - self._refreshed_at < max_age:
+                return {'refreshed': False, 'cells': len(self._keys)}
+            generation, after, previous, loaded = self._generation, self.watermark, self._flights, self.loaded
+            changed = set(self._changed_flights)
+            read_all = not loaded or (FLIGHT_INDEX_TTL_SECONDS > 0
+                                      and time.monotonic() - self._flights_read_at >= FLIGHT_INDEX_TTL_SECONDS)
+
+        dal = AnalyticsDAL(session)
+        upto = dal.get_watermark()
+        airport_codes = dal.get_airport_codes()
+
+        delta = _Delta()
+        for chunk in dal.stream_booking_totals(after, upto):
+            flight_ids, buckets, bookings, revenue, cancellations = zip(*chunk)
+            delta.add(flight_ids, buckets, bookings, cancellations, revenue)
+        if loaded:
+            for chunk in dal.stream_cancellations(after, upto):
+                flight_ids, buckets, cancelled, revenue = zip(*chunk)
+                delta.add(flight_ids, buckets, np.negative(cancelled), cancelled, np.negative(revenue))
+
+        if read_all:
+            flights_read_at = time.monotonic()
+            flights = _Flights(dal.get_flight_dimensions())
+        else:
+            flights_read_at = None
+            wanted = np.union1d(delta.flight_ids(), np.fromiter(changed, np.int64, len(changed)))
+            rows = dal.get_flight_dimensions(after_id=previous.last_id)
+            with allow_repeated_statements():
+                for start in range(0, len(wanted), _FLIGHT_CHUNK_SIZE):
+                    batch = wanted[start:start + _FLIGHT_CHUNK_SIZE].tolist()
+                    rows += dal.get_flight_dimensions(flight_ids=batch)
+            flights = previous.updated(wanted, rows)
+        rescheduled = flights.rescheduled_since(previous) if loaded else np.empty(0, np.int64)
+
+        recount = _Delta()
+        with allow_repeated_statements():
+            for start in range(0, len(rescheduled), _FLIGHT_CHUNK_SIZE):
+                batch = rescheduled[start:start + _FLIGHT_CHUNK_SIZE].tolist()
+                for chunk in dal.stream_booking_totals(after, upto, flight_ids=batch):
+                    flight_ids, buckets, bookings, revenue, cancellations = zip(*chunk)
+                    recount.add(flight_ids, buckets, bookings, cancellations, revenue)
+
+        changes = delta.columns(exclude_flights=rescheduled)
+        recounted = recount.columns(exclude_flights=np.empty(0, np.int64))
+        with self._lock:
+            if self._generation != generation:
+                return {'refreshed': False, 'cells': len(self._keys)}
+            if len(rescheduled):
+                self._drop_flights(rescheduled)
+            self._merge(*changes)
+            self._merge(*recounted)
+            self._flights = flights
+            self._airport_codes = airport_codes
+            self.watermark = upto
+            self.loaded = True
+            self._generation += 1
+            self._refreshed_at = time.monotonic()
+            if flights_read_at is not None:
+                self._flights_read_at = flights_read_at
+            self._changed_flights -= changed
+            return {
+                'refreshed': True,
+                'bookings': upto[0] - after[0],
+                'cancellations': upto[1] - after[1],
+                'rescheduled_flights': len(rescheduled),
+                'cells': len(self._keys),
+            }
+
+    def _drop_flights(self, flight_ids: np.ndarray) -> None:
+        keep = ~np.isin(self._keys // LEAD_TIME_BUCKETS, flight_ids)
+        self._keys = self._keys[keep]
+        self._bookings = self._bookings[keep]
+        self._cancellations = self._cancellations[keep]
+        self._revenue = self._revenue[keep]
+
+    def _merge(self, keys: np.ndarray, bookings: np.ndarray, cancellations: np.ndarray,
+               revenue: np.ndarray) -> None:
+        """Add distinct, sorted cell changes: existing cells in place, new ones inserted in order."""
+        if not len(keys):
+            return
+        positions = np.searchsorted(self._keys, keys)
+        found = positions < len(self._keys)
+        found[found] = self._keys[positions[found]] == keys[found]
+        existing = positions[found]
+        self._bookings[existing] += bookings[found]
+        self._cancellations[existing] += cancellations[found]
+        self._revenue[existing] += revenue[found]
+        new = ~found
+        if new.any():
+            at = positions[new]
+            self._keys = np.insert(self._keys, at, keys[new])
+            self._bookings = np.insert(self._bookings, at, bookings[new])
+            self._cancellations = np.insert(self._cancellations, at, cancellations[new])
+            self._revenue = np.insert(self._revenue, at, revenue[new])
+
+    def report(self, group_by: Sequence[str] = (ROUTE, DAY), start_date: Optional[date] = None,
+               end_date: Optional[date] = None) -> Dict[str, np.ndarray]:
+        """Measures grouped by the given dimensions, for flights departing in [start_date, end_date].
+
+        Returns columns: the grouping ones (departure_airport and
+        arrival_airport, departure_date, departure_hour, lead_time) followed
+        by flights, seats, bookings, cancellations, revenue and load_factor.
+        Grouped by lead time, the flights and seats are those of the group's
+        flights, so the load factors of the buckets add up to the flights'.
+        """
+        unknown = set(group_by) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown rollup dimensions: {', '.join(sorted(unknown))}")
+        if start_date and end_date and end_date < start_date:
+            raise ValueError("end_date must not be before start_date")
+
+        with self._lock:
+            flights = self._flights
+            keys, bookings = self._keys, self._bookings
+            cancellations, revenue = self._cancellations, self._revenue
+            airport_codes = self._airport_codes
+
+            # Group the flights on their own dimensions first
+            day = flights.departure_minute // _MINUTES_PER_DAY
+            selected = np.ones(len(flights.ids), dtype=bool)
+            if start_date:
+                selected &= day >= _day_number(start_date)
+            if end_date:
+                selected &= day <= _day_number(end_date)
+            flight_columns = []
+            if ROUTE in group_by:
+                flight_columns += [flights.departure_airport, flights.arrival_airport]
+            if DAY in group_by:
+                flight_columns.append(day)
+            if HOUR in group_by:
+                flight_columns.append(flights.departure_minute // 60 % 24)
+            if flight_columns:
+                groups, inverse = np.unique(
+                    np.column_stack([column[selected] for column in flight_columns]),
+                    axis=0, return_inverse=True
+                )
+                inverse = inverse.reshape(-1)
+            else:
+                groups, inverse = np.empty((1, 0), np.int64), np.zeros(int(selected.sum()), np.int64)
+            flight_group = np.full(len(flights.ids), -1, dtype=np.int64)
+            flight_group[selected] = inverse
+            group_flights = np.bincount(inverse, minlength=len(groups))
+            group_seats = np.bincount(inverse, weights=flights.seats[selected], minlength=len(groups))
+
+            # Then the cells through their flight's group
+            cell_flights = keys // LEAD_TIME_BUCKETS
+            positions = np.minimum(np.searchsorted(flights.ids, cell_flights), max(len(flights.ids) - 1, 0))
+            cell_group = np.full(len(keys), -1, dtype=np.int64)
+            if len(flights.ids):
+                known = flights.ids[positions] == cell_flights
+                cell_group[known] = flight_group[positions[known]]
+            counted = cell_group >= 0
+            if LEAD_TIME in group_by:
+                combined = cell_group[counted] * LEAD_TIME_BUCKETS + keys[counted] % LEAD_TIME_BUCKETS
+                output, cell_output = np.unique(combined, return_inverse=True)
+                cell_output = cell_output.reshape(-1)
+                output_group = output // LEAD_TIME_BUCKETS
+                output_bucket = output % LEAD_TIME_BUCKETS
+            else:
+                cell_output = cell_group[counted]
+                output_group = np.arange(len(groups))
+                output_bucket = None
+
+            size = len(output_group)
+            result_bookings = np.bincount(cell_output, weights=bookings[counted], minlength=size).astype(np.int64)
+            result = {}
+            column = 0
+            if ROUTE in group_by:
+                codes = np.vectorize(airport_codes.get, otypes=[object])
+                result['departure_airport'] = codes(groups[output_group, column])
+                result['arrival_airport'] = codes(groups[output_group, column + 1])
+                column += 2
+            if DAY in group_by:
+                result['departure_date'] = groups[output_group, column].astype('datetime64[D]')
+                column += 1
+            if HOUR in group_by:
+                result['departure_hour'] = groups[output_group, column]
+            if output_bucket is not None:
+                result['lead_time'] = np.asarray(LEAD_TIME_LABELS, dtype=object)[output_bucket]
+            seats = group_seats[output_group].astype(np.int64)
+            result['flights'] = group_flights[output_group]
+            result['seats'] = seats
+            result['bookings'] = result_bookings
+            result['cancellations'] = np.bincount(
+                cell_output, weights=cancellations[counted], minlength=size).astype(np.int64)
+            result['revenue'] = np.bincount(cell_output, weights=revenue[counted], minlength=size)
+            result['load_factor'] = np.divide(result_bookings, seats, out=np.zeros(size), where=seats > 0)
+            return result
+
+def report_rows(columns: Dict[str, np.ndarray]) -> List[Dict]:
+    """Report columns as one dict of plain Python values per row."""
+    names = list(columns)
+    values = [columns[name].tolist() for name in names]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+booking_rollup = BookingRollup()
+
+def _mark_committed_flights(bind: Engine, flight_ids: Set[int]) -> None:
+    booking_rollup.mark_flights_changed(flight_ids)
+
+on_flights_committed(_mark_committed_flights)
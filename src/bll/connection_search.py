@@ -0,0 +1,344 @@
+import heapq
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import count
+from threading import RLock
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.engine import Connection, Engine
+from ..models.database import Flight, FlightStatus
+from ..dal.base_dal import DEFAULT_CHUNK_SIZE, _chunks
+from ..dal.flight_events import on_flights_committed
+from .flight_search_index import FlightSearchIndex
+from .pricing import quote_fare
+
+# Connection search limits; the connection times can be narrowed per query
+MAX_STOPS = 2
+MIN_CONNECTION_MINUTES = 45
+MAX_CONNECTION_MINUTES = 360
+
+EARLIEST_ARRIVAL = "earliest_arrival"
+CHEAPEST = "cheapest"
+OBJECTIVES = (EARLIEST_ARRIVAL, CHEAPEST)
+
+_EPOCH = datetime(1970, 1, 1)
+
+def _seconds(value: datetime) -> float:
+    """Naive datetime to seconds since the epoch, without a timezone round trip."""
+    return (value - _EPOCH) / timedelta(seconds=1)
+
+class _Departures:
+    """Flights leaving one airport (or flying one route), sorted by departure time."""
+    __slots__ = ('times', 'slots')
+
+    def __init__(self):
+        self.times: List[float] = []
+        self.slots: List[int] = []
+
+    def add(self, time: float, slot: int) -> None:
+        position = bisect_left(self.times, time)
+        self.times.insert(position, time)
+        self.slots.insert(position, slot)
+
+    def remove(self, time: float, slot: int) -> None:
+        position = bisect_left(self.times, time)
+        while position < len(self.slots) and self.slots[position] != slot:
+            position += 1
+        if position < len(self.slots):
+            del self.times[position]
+            del self.slots[position]
+
+    def window(self, start: float, end: float) -> List[int]:
+        """Slots of the flights departing in [start, end]."""
+        low = bisect_left(self.times, start)
+        high = bisect_left(self.times, end + 1e-6, low)
+        return self.slots[low:high]
+
+class ConnectionGraph:
+    """Time-expanded graph of bookable flights for multi-leg itinerary search.
+
+    Every flight is an edge from its departure event to its arrival event;
+    the departure events of each airport are kept sorted, so the transfer
+    edges from an arrival (departures between the minimum and maximum
+    connection time later) are a bisect away. Departures are also kept per
+    route, so the last leg of an itinerary is looked up directly towards the
+    destination instead of scanning every flight out of the connecting
+    airport. Flights are stored in slots that are reused as the graph is
+    refreshed per flight after every commit that changes flights.
+
+    A search quotes fares only for the slots it reaches, so its cost follows
+    the searched day's traffic rather than the whole loaded horizon.
+    """
+
+    def __init__(self):
+        self._lock = RLock()
+        # Flights refreshed while a load is reading, applied again once it is in place
+        self._refreshed_during_load: Optional[Set[int]] = None
+        self.loaded = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self._slot_of: Dict[int, int] = {}
+        self._free_slots: List[int] = []
+        self._records: List[Optional[dict]] = []
+        self._origin: List[str] = []
+        self._destination: List[str] = []
+        self._departure: List[float] = []
+        self._arrival: List[float] = []
+        self._base_price: List[float] = []
+        self._available_seats: List[int] = []
+        self._total_seats: List[int] = []
+        self._by_airport: Dict[str, _Departures] = {}
+        self._by_route: Dict[Tuple[str, str], _Departures] = {}
+        self._by_destination: Dict[str, _Departures] = {}
+        # Longest flight time loaded, bounding when the last leg can depart
+        self._longest_flight = 0.0
+
+    def load(self, conn: Connection, since: Optional[datetime] = None) -> int:
+        """Rebuild the graph from every bookable flight departing at or after since.
+
+        Flights departed before since drop out, so periodic reloads also prune the graph.
+        """
+        with self._lock:
+            self._refreshed_during_load = set()
+        stmt = FlightSearchIndex._flights_query()
+        if since is not None:
+            stmt = stmt.where(Flight.departure_time >= since)
+        rows = conn.execute(stmt.order_by(Flight.departure_time, Flight.id)).all()
+        with self._lock:
+            self._reset()
+            for row in rows:
+                self._add(row)
+            self.loaded = True
+            loaded = len(self._slot_of)
+            refreshed, self._refreshed_during_load = self._refreshed_during_load, None
+        # A commit refreshed these into the old graph, perhaps after the load read them
+        for chunk in _chunks(sorted(refreshed), DEFAULT_CHUNK_SIZE):
+            self.refresh(conn, chunk)
+        return loaded
+
+    def refresh(self, conn: Connection, flight_ids: Iterable[int]) -> None:
+        """Reload the given flights; ones no longer bookable drop out of the graph."""
+        flight_ids = list(flight_ids)
+        rows = conn.execute(FlightSearchIndex._flights_query().where(Flight.id.in_(flight_ids))).all()
+        with self._lock:
+            if self._refreshed_during_load is not None:
+                self._refreshed_during_load.update(flight_ids)
+            for flight_id in flight_ids:
+                self._remove(flight_id)
+            for row in rows:
+                self._add(row)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+            self.loaded = False
+
+    def search(self, origin: str, destination: str, date: datetime,
+               max_stops: int = MAX_STOPS,
+               min_connection_minutes: int = MIN_CONNECTION_MINUTES,
+               max_connection_minutes: int = MAX_CONNECTION_MINUTES,
+               objective: str = EARLIEST_ARRIVAL, limit: int = 10,
+               now: Optional[datetime] = None) -> List[dict]:
+        """Find the best itineraries whose first leg departs on the given day.
+
+        Itineraries have at most max_stops connections, never revisit an
+        airport, and leave each connecting airport between the minimum and
+        maximum connection time after landing. They are ranked by arrival
+        time or by total fare; a bounded heap keeps the best limit of them
+        and prunes partial itineraries that can no longer make it.
+        """
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective: {objective}")
+        if not 0 <= max_stops <= MAX_STOPS:
+            raise ValueError(f"max_stops must be between 0 and {MAX_STOPS}")
+        if not 0 <= min_connection_minutes <= max_connection_minutes:
+            raise ValueError("Connection times must satisfy 0 <= minimum <= maximum")
+        if limit < 1:
+            return []
+
+        day_start = _seconds(date.replace(hour=0, minute=0, second=0, microsecond=0))
+        day_end = day_start + 86400 - 1e-6
+        min_gap = min_connection_minutes * 60
+        max_gap = max_connection_minutes * 60
+        cheapest = objective == CHEAPEST
+
+        with self._lock:
+            fares = _Fares(self, now or datetime.now())
+            # The last leg departs at most max_stops flights and connections after the day
+            last_departure = day_end + max_stops * (self._longest_flight + max_gap)
+            rest = self._lowest_fare_into(destination, day_start, last_departure, fares) if cheapest else 0.0
+            arrival = self._arrival
+            target = self._destination
+            by_airport = self._by_airport
+            by_route = self._by_route
+            no_departures = _Departures()
+
+            # Max-heap of the best itineraries so far, as negated sort keys,
+            # and the key an itinerary must beat once the heap is full
+            best: List[tuple] = []
+            tie = count()
+            worst = [None]
+
+            def offer(legs: Tuple[int, ...]) -> None:
+                total = round(sum(fares[slot] for slot in legs), 2)
+                if cheapest:
+                    key = (total, arrival[legs[-1]], len(legs), legs)
+                else:
+                    key = (arrival[legs[-1]], len(legs), total, legs)
+                entry = (_Negated(key), next(tie), legs)
+                if len(best) < limit:
+                    heapq.heappush(best, entry)
+                elif key < best[0][0].key:
+                    heapq.heapreplace(best, entry)
+                else:
+                    return
+                if len(best) == limit:
+                    worst[0] = best[0][0].key
+
+            def hopeless(partial_arrival: float, partial_fare: float) -> bool:
+                """Whether every extension of a partial itinerary ranks below the heap.
+
+                A partial itinerary still needs a flight into the destination,
+                which costs at least rest; the half cent keeps totals that
+                round to the bound, which may still win on the next key.
+                """
+                bound = worst[0]
+                if bound is None:
+                    return False
+                if cheapest:
+                    return partial_fare + rest > bound[0] + 0.005
+                return partial_arrival >= bound[0]
+
+            for first in by_airport.get(origin, no_departures).window(day_start, day_end):
+                stop1 = target[first]
+                if stop1 == destination:
+                    offer((first,))
+                    continue
+                if max_stops < 1 or stop1 == origin or hopeless(arrival[first], fares[first]):
+                    continue
+
+                earliest = arrival[first] + min_gap
+                latest = arrival[first] + max_gap
+                for second in by_route.get((stop1, destination), no_departures).window(earliest, latest):
+                    offer((first, second))
+
+                if max_stops < 2:
+                    continue
+                for second in by_airport.get(stop1, no_departures).window(earliest, latest):
+                    stop2 = target[second]
+                    if stop2 in (origin, stop1, destination):
+                        continue
+                    route = by_route.get((stop2, destination))
+                    if route is None or hopeless(arrival[second], fares[first] + fares[second]):
+                        continue
+                    for third in route.window(arrival[second] + min_gap, arrival[second] + max_gap):
+                        offer((first, second, third))
+
+            ranked = sorted(best, key=lambda entry: entry[0].key)
+            return [self._itinerary(entry[2], fares) for entry in ranked]
+
+    def _itinerary(self, legs: Tuple[int, ...], fares: "_Fares") -> dict:
+        records = []
+        for slot in legs:
+            record = dict(self._records[slot])
+            record['price'] = fares[slot]
+            records.append(record)
+        departure_time = records[0]['departure_time']
+        arrival_time = records[-1]['arrival_time']
+        return {
+            'legs': records,
+            'stops': len(legs) - 1,
+            'departure_time': departure_time,
+            'arrival_time': arrival_time,
+            'duration_minutes': int((arrival_time - departure_time).total_seconds() // 60),
+            'price': round(sum(fares[slot] for slot in legs), 2)
+        }
+
+    def _lowest_fare_into(self, destination: str, start: float, end: float, fares: "_Fares") -> float:
+        """Lowest fare of the flights into destination departing in [start, end]."""
+        inbound = self._by_destination.get(destination)
+        if inbound is None:
+            return float('inf')
+        return min((fares[slot] for slot in inbound.window(start, end)), default=float('inf'))
+
+    def _quote(self, slot: int, now: datetime) -> float:
+        """Fare of the flight in a slot."""
+        return quote_fare(
+            self._base_price[slot], self._records[slot]['departure_time'],
+            self._available_seats[slot], self._total_seats[slot], now=now
+        )
+
+    def _add(self, row) -> None:
+        if row.status != FlightStatus.SCHEDULED or row.available_seats <= 0:
+            return
+        record = FlightSearchIndex._flight_record(row)
+        departure = _seconds(row.departure_time)
+        arrival = _seconds(row.arrival_time)
+        values = (
+            record, row.departure_code, row.arrival_code, departure, arrival,
+            row.base_price, row.available_seats, row.total_seats
+        )
+        columns = (
+            self._records, self._origin, self._destination, self._departure, self._arrival,
+            self._base_price, self._available_seats, self._total_seats
+        )
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            for column, value in zip(columns, values):
+                column[slot] = value
+        else:
+            slot = len(self._records)
+            for column, value in zip(columns, values):
+                column.append(value)
+
+        self._slot_of[row.id] = slot
+        self._by_airport.setdefault(row.departure_code, _Departures()).add(departure, slot)
+        self._by_route.setdefault((row.departure_code, row.arrival_code), _Departures()).add(departure, slot)
+        self._by_destination.setdefault(row.arrival_code, _Departures()).add(departure, slot)
+        self._longest_flight = max(self._longest_flight, arrival - departure)
+
+    def _remove(self, flight_id: int) -> None:
+        slot = self._slot_of.pop(flight_id, None)
+        if slot is None:
+            return
+        origin, destination, departure = self._origin[slot], self._destination[slot], self._departure[slot]
+        self._by_airport[origin].remove(departure, slot)
+        self._by_route[(origin, destination)].remove(departure, slot)
+        self._by_destination[destination].remove(departure, slot)
+        self._records[slot] = None
+        self._free_slots.append(slot)
+
+class _Fares(dict):
+    """Fares of the slots one search reaches, quoted on first use at the search's time."""
+    __slots__ = ('graph', 'now')
+
+    def __init__(self, graph: ConnectionGraph, now: datetime):
+        super().__init__()
+        self.graph = graph
+        self.now = now
+
+    def __missing__(self, slot: int) -> float:
+        fare = self[slot] = self.graph._quote(slot, self.now)
+        return fare
+
+class _Negated:
+    """Sort key wrapper that inverts ordering, turning heapq's min-heap into a max-heap."""
+    __slots__ = ('key',)
+
+    def __init__(self, key: tuple):
+        self.key = key
+
+    def __lt__(self, other: "_Negated") -> bool:
+        return other.key < self.key
+
+# Shared graph for the process, loaded at startup or on first use and
+# reloaded with the search index every FLIGHT_INDEX_TTL_SECONDS
+connection_graph = ConnectionGraph()
+
+def _refresh_committed_flights(bind: Engine, flight_ids: Set[int]) -> None:
+    if connection_graph.loaded:
+        with bind.connect() as conn:
+            connection_graph.refresh(conn, flight_ids)
+
+# A failed refresh drops the graph, which the next connection search loads again
+on_flights_committed(_refresh_committed_flights, on_failure=connection_graph.clear)
@@ -0,0 +1,40 @@
+from typing import Iterator, Optional
+from datetime import datetime
+from ..dal.export_dal import ExportDAL, DEFAULT_EXPORT_CHUNK_SIZE
+from ..utils.export_formats import check_export_format, export_writer
+from sqlalchemy.orm import Session
+
+def check_export_request(export_format: str, start_date: Optional[datetime] = None,
+                         end_date: Optional[datetime] = None) -> None:
+    """Raise ValueError for an export that cannot be made, before any of it is sent."""
+    check_export_format(export_format)
+    if start_date and end_date and end_date < start_date:
+        raise ValueError("end_date must not be before start_date")
+
+class ExportService:
+    """Bulk exports of bookings and flights, encoded chunk by chunk as rows are read."""
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.export_dal = ExportDAL(session)
+
+    def export_bookings(self, export_format: str, start_date: Optional[datetime] = None,
+                        end_date: Optional[datetime] = None,
+                        chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+        """Bookings made in [start_date, end_date), in the export format."""
+        check_export_request(export_format, start_date, end_date)
+        return self._export(ExportDAL._bookings_query(start_date, end_date), export_format, chunk_size)
+
+    def export_flights(self, export_format: str, start_date: Optional[datetime] = None,
+                       end_date: Optional[datetime] = None,
+                       chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+        """Flights departing in [start_date, end_date), in the export format."""
+        check_export_request(export_format, start_date, end_date)
+        return self._export(ExportDAL._flights_query(start_date, end_date), export_format, chunk_size)
+
+    def _export(self, stmt, export_format: str, chunk_size: int) -> Iterator[bytes]:
+        writer = export_writer(export_format, ExportDAL.columns(stmt))
+        yield writer.header()
+        for chunk in self.export_dal.stream(stmt, chunk_size):
+            yield writer.rows(chunk)
+        yield writer.footer()
@@ -0,0 +1,171 @@
+import os
+from bisect import bisect_left, insort
+from datetime import datetime
+from threading import RLock
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import aliased
+from ..models.database import Airport, Flight, FlightStatus
+from ..dal.base_dal import DEFAULT_CHUNK_SIZE, _chunks
+from ..dal.flight_events import on_flights_committed
+
+RouteKey = Tuple[str, str]
+SortKey = Tuple[datetime, int]
+
+# Seconds between full reloads of the index and of the connection graph, which
+# pick up flights changed by other processes (other workers, init_db); 0 disables them
+FLIGHT_INDEX_TTL_SECONDS = float(os.getenv("FLIGHT_INDEX_TTL_SECONDS", "300"))
+
+class _Route:
+    """Flights of one route kept sorted by (departure_time, id)."""
+    __slots__ = ('keys', 'records')
+
+    def __init__(self):
+        self.keys: List[SortKey] = []
+        self.records: List[dict] = []
+
+class FlightSearchIndex:
+    """In-process flight search index keyed by (origin code, destination code).
+
+    Each route holds its flights sorted by departure time, so a day window is
+    two bisects. The index is loaded once and then refreshed per flight from
+    the database after every commit in this process that changes flights.
+    Flights changed by other processes are picked up by reloading it every
+    FLIGHT_INDEX_TTL_SECONDS.
+    """
+
+    def __init__(self):
+        self._lock = RLock()
+        self._routes: Dict[RouteKey, _Route] = {}
+        self._positions: Dict[int, Tuple[RouteKey, SortKey]] = {}
+        # Flights refreshed while a load is reading, applied again once it is in place
+        self._refreshed_during_load: Optional[Set[int]] = None
+        self.loaded = False
+
+    def load(self, conn: Connection, since: Optional[datetime] = None) -> int:
+        """Replace the index with every flight departing at or after since.
+
+        Searches keep using the current index until the new one is built.
+        """
+        with self._lock:
+            self._refreshed_during_load = set()
+        stmt = self._flights_query()
+        if since is not None:
+            stmt = stmt.where(Flight.departure_time >= since)
+
+        routes: Dict[RouteKey, _Route] = {}
+        positions: Dict[int, Tuple[RouteKey, SortKey]] = {}
+        for row in conn.execute(stmt.order_by(Flight.departure_time, Flight.id)):
+            route_key, sort_key, record = self._record(row)
+            route = routes.setdefault(route_key, _Route())
+            route.keys.append(sort_key)
+            route.records.append(record)
+            positions[row.id] = (route_key, sort_key)
+
+        with self._lock:
+            self._routes = routes
+            self._positions = positions
+            self.loaded = True
+            refreshed, self._refreshed_during_load = self._refreshed_during_load, None
+        # A commit refreshed these into the old index, perhaps after the load read them
+        for chunk in _chunks(sorted(refreshed), DEFAULT_CHUNK_SIZE):
+            self.refresh(conn, chunk)
+        return len(positions)
+
+    def refresh(self, conn: Connection, flight_ids: Iterable[int]) -> None:
+        """Reload the given flights from the database into the index."""
+        flight_ids = list(flight_ids)
+        rows = conn.execute(self._flights_query().where(Flight.id.in_(flight_ids))).all()
+        with self._lock:
+            if self._refreshed_during_load is not None:
+                self._refreshed_during_load.update(flight_ids)
+            for flight_id in flight_ids:
+                self._remove(flight_id)
+            for row in rows:
+                route_key, sort_key, record = self._record(row)
+                route = self._routes.setdefault(route_key, _Route())
+                position = bisect_left(route.keys, sort_key)
+                route.keys.insert(position, sort_key)
+                route.records.insert(position, record)
+                self._positions[row.id] = (route_key, sort_key)
+
+    def search(self, departure_airport: str, arrival_airport: str,
+               start: datetime, end: datetime) -> List[dict]:
+        """Get scheduled flights with seats left departing in [start, end)."""
+        with self._lock:
+            route = self._routes.get((departure_airport, arrival_airport))
+            if route is None:
+                return []
+            low = bisect_left(route.keys, (start, 0))
+            high = bisect_left(route.keys, (end, 0), low)
+            records = route.records[low:high]
+        return [
+            dict(record) for record in records
+            if record['available_seats'] > 0 and record['status'] == FlightStatus.SCHEDULED.value
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._routes = {}
+            self._positions = {}
+            self.loaded = False
+
+    def _remove(self, flight_id: int) -> None:
+        position = self._positions.pop(flight_id, None)
+        if position is None:
+            return
+        route_key, sort_key = position
+        route = self._routes[route_key]
+        index = bisect_left(route.keys, sort_key)
+        if index < len(route.keys) and route.keys[index] == sort_key:
+            del route.keys[index]
+            del route.records[index]
+
+    @staticmethod
+    def _flights_query():
+        departure = aliased(Airport)
+        arrival = aliased(Airport)
+        return select(
+            Flight.id, Flight.flight_number, Flight.departure_time, Flight.arrival_time,
+            Flight.status, Flight.available_seats, Flight.total_seats, Flight.base_price,
+            departure.code.label('departure_code'), departure.name.label('departure_name'),
+            arrival.code.label('arrival_code'), arrival.name.label('arrival_name')
+        ).join(
+            departure, Flight.departure_airport_id == departure.id
+        ).join(
+            arrival, Flight.arrival_airport_id == arrival.id
+        )
+
+    @staticmethod
+    def _record(row) -> Tuple[RouteKey, SortKey, dict]:
+        """Build the index entry of a flight row."""
+        record = FlightSearchIndex._flight_record(row)
+        return (row.departure_code, row.arrival_code), (row.departure_time, row.id), record
+
+    @staticmethod
+    def _flight_record(row) -> dict:
+        """Build the record of a _flights_query row, shaped like get_flight_details."""
+        return {
+            'id': row.id,
+            'flight_number': row.flight_number,
+            'departure_airport': row.departure_name,
+            'arrival_airport': row.arrival_name,
+            'departure_time': row.departure_time,
+            'arrival_time': row.arrival_time,
+            'status': row.status.value,
+            'available_seats': row.available_seats,
+            'total_seats': row.total_seats,
+            'base_price': row.base_price
+        }
+
+# Shared index for the process; FlightService falls back to the database until it is loaded
+flight_search_index = FlightSearchIndex()
+
+def _refresh_committed_flights(bind: Engine, flight_ids: Set[int]) -> None:
+    if flight_search_index.loaded:
+        with bind.connect() as conn:
+            flight_search_index.refresh(conn, flight_ids)
+
+# A failed refresh leaves searches on the database until the next reload
+on_flights_committed(_refresh_committed_flights, on_failure=flight_search_index.clear)
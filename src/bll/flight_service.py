@@ -1,12 +1,79 @@
-from typing import List, Optional, Dict
-from datetime import datetime
+from typing import List, Optional, Dict, Tuple
+from datetime import date, datetime, timedelta
 from ..models.database import Flight, FlightStatus
 from ..dal.flight_dal import FlightDAL
+from ..dal.inventory_dal import InventoryDAL
+from ..utils.seat_map import seat_layout
+from .flight_search_index import flight_search_index
+from .search_cache import search_cache
+from .pricing import quote_flight, price_results, fare_calendar
+from .connection_search import (
+    connection_graph, MAX_STOPS, MIN_CONNECTION_MINUTES, MAX_CONNECTION_MINUTES, EARLIEST_ARRIVAL
+)
 from sqlalchemy.orm import Session
 
+# Status changes a flight may go through
+VALID_STATUS_TRANSITIONS = {
+    FlightStatus.SCHEDULED: [FlightStatus.BOARDING, FlightStatus.DELAYED, FlightStatus.CANCELLED],
+    FlightStatus.BOARDING: [FlightStatus.COMPLETED, FlightStatus.DELAYED],
+    FlightStatus.DELAYED: [FlightStatus.SCHEDULED, FlightStatus.CANCELLED],
+    FlightStatus.CANCELLED: [FlightStatus.SCHEDULED],
+    FlightStatus.COMPLETED: []
+}
+
+# Widest +/- window of days a fare calendar may ask for
+MAX_CALENDAR_DAYS = 31
+
+# Longest range of departure days an inventory summary may cover
+MAX_SUMMARY_DAYS = 366
+
+def check_summary_range(start_date: date, end_date: date) -> None:
+    """Reject inventory summary ranges that are reversed or too long."""
+    if end_date < start_date:
+        raise ValueError("end_date must not be before start_date")
+    if (end_date - start_date).days >= MAX_SUMMARY_DAYS:
+        raise ValueError(f"An inventory summary covers at most {MAX_SUMMARY_DAYS} days")
+
+def fare_calendar_window(date: Optional[datetime] = None, days: int = 3,
+                         month: Optional[str] = None) -> Tuple[datetime, int]:
+    """First day and number of days a fare calendar covers, starting today at the earliest.
+
+    The window is the given month ("YYYY-MM") when there is one, otherwise
+    days either side of date.
+    """
+    if month:
+        try:
+            first_day = datetime.strptime(month, "%Y-%m")
+        except ValueError:
+            raise ValueError("month must be given as YYYY-MM")
+        last_day = (first_day.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    elif date is not None:
+        if not 0 <= days <= MAX_CALENDAR_DAYS:
+            raise ValueError(f"days must be between 0 and {MAX_CALENDAR_DAYS}")
+        day = date.replace(hour=0, minute=0, second=0, microsecond=0)
+        first_day, last_day = day - timedelta(days=days), day + timedelta(days=days)
+    else:
+        raise ValueError("Either a date or a month is required")
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    first_day = max(first_day, today)
+    return first_day, max((last_day - first_day).days + 1, 0)
+
 class FlightService:
     def __init__(self, session: Session):
         self.flight_dal = FlightDAL(session)
+        self.inventory_dal = InventoryDAL(session)
+
+    def get_all_flights(self, cursor: Optional[str] = None, limit: int = 100) -> Dict:
+        """Get one page of flights in departure order with the next page's cursor."""
+        flights, next_cursor = self.flight_dal.get_flights_page(cursor=cursor, limit=limit)
+        return {'items': flights, 'next_cursor': next_cursor}
+
+    def create_flight(self, flight_data) -> Flight:
+        """Create a flight from FlightCreate data."""
+        fields = flight_data.dict()
+        fields['status'] = FlightStatus(fields['status'])
+        return self.flight_dal.create(**fields)
 
     def search_available_flights(self, departure_airport: str, arrival_airport: str, 
                                date: datetime) -> List[Dict]:
@@ -15,18 +82,76 @@ class FlightService:
         if date < datetime.now():
             return []
 
+        # Airport codes are stored upper-case; normalize so equal searches share a cache entry
+        departure_airport = departure_airport.strip().upper()
+        arrival_airport = arrival_airport.strip().upper()
+        results = search_cache.get_or_load(
+            departure_airport, arrival_airport, date,
+            lambda: self._find_available_flights(departure_airport, arrival_airport, date)
+        )
+
+        # Fares depend on today's date, so they are quoted per request rather than cached
+        return price_results(results)
+
+    def _find_available_flights(self, departure_airport: str, arrival_airport: str,
+                                date: datetime) -> List[Dict]:
+        """Search for available flights, bypassing the result cache."""
+        # Answer from the in-memory index when it is loaded
+        if flight_search_index.loaded:
+            return flight_search_index.search(
+                departure_airport, arrival_airport,
+                date, date.replace(hour=23, minute=59, second=59)
+            )
+
         # Search for flights
         flights = self.flight_dal.search_flights(departure_airport, arrival_airport, date)
         
         # Filter and format results
-        available_flights = []
-        for flight in flights:
-            if flight.available_seats > 0 and flight.status == FlightStatus.SCHEDULED:
-                flight_details = self.flight_dal.get_flight_details(flight.id)
-                if flight_details:
-                    available_flights.append(flight_details)
-        
-        return available_flights
+        available_ids = [
+            flight.id for flight in flights
+            if flight.available_seats > 0 and flight.status == FlightStatus.SCHEDULED
+        ]
+        return self.flight_dal.get_flight_details_many(available_ids)
+
+    def get_fare_calendar(self, departure_airport: str, arrival_airport: str,
+                          date: Optional[datetime] = None, days: int = 3,
+                          month: Optional[str] = None) -> List[Dict]:
+        """Get the lowest fare and seats left for each day around a date or over a month."""
+        first_day, day_count = fare_calendar_window(date, days, month)
+        if not day_count:
+            return []
+
+        departure_airport = departure_airport.strip().upper()
+        arrival_airport = arrival_airport.strip().upper()
+        end = first_day + timedelta(days=day_count)
+        # One range scan over the whole window, from the index when it is loaded
+        if flight_search_index.loaded:
+            flights = flight_search_index.search(departure_airport, arrival_airport, first_day, end)
+        else:
+            flights = self.flight_dal.get_route_fares(departure_airport, arrival_airport, first_day, end)
+        return fare_calendar(flights, first_day, day_count)
+
+    def search_connections(self, departure_airport: str, arrival_airport: str, date: datetime,
+                           max_stops: int = MAX_STOPS,
+                           min_connection_minutes: int = MIN_CONNECTION_MINUTES,
+                           max_connection_minutes: int = MAX_CONNECTION_MINUTES,
+                           objective: str = EARLIEST_ARRIVAL, limit: int = 10) -> List[Dict]:
+        """Search for itineraries with up to max_stops connections, best first."""
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        if date < today:
+            return []
+
+        # Load the connection graph on first use when startup did not
+        if not connection_graph.loaded:
+            connection_graph.load(self.flight_dal.session.connection(), since=today)
+
+        return connection_graph.search(
+            departure_airport.strip().upper(), arrival_airport.strip().upper(), date,
+            max_stops=max_stops,
+            min_connection_minutes=min_connection_minutes,
+            max_connection_minutes=max_connection_minutes,
+            objective=objective, limit=limit
+        )
 
     def update_flight_status(self, flight_id: int, new_status: FlightStatus) -> Optional[Dict]:
         """Update flight status with business logic validation."""
@@ -35,15 +160,7 @@ class FlightService:
             return None
 
         # Validate status transition
-        valid_transitions = {
-            FlightStatus.SCHEDULED: [FlightStatus.BOARDING, FlightStatus.DELAYED, FlightStatus.CANCELLED],
-            FlightStatus.BOARDING: [FlightStatus.COMPLETED, FlightStatus.DELAYED],
-            FlightStatus.DELAYED: [FlightStatus.SCHEDULED, FlightStatus.CANCELLED],
-            FlightStatus.CANCELLED: [FlightStatus.SCHEDULED],
-            FlightStatus.COMPLETED: []
-        }
-
-        if new_status not in valid_transitions.get(flight.status, []):
+        if new_status not in VALID_STATUS_TRANSITIONS.get(flight.status, []):
             return None
 
         # Update status
@@ -69,42 +186,36 @@ class FlightService:
             'status': flight.status.value
         }
 
+    def get_inventory_summary(self, start_date: date, end_date: date) -> List[Dict]:
+        """Get seats and bookings per route and day from the inventory summary."""
+        check_summary_range(start_date, end_date)
+        return self.inventory_dal.get_summary(start_date, end_date)
+
+    def get_seat_availability(self, flight_id: int) -> Optional[Dict]:
+        """Get the free seats of a flight from its seat map."""
+        flight = self.flight_dal.get_by_id(flight_id)
+        if not flight:
+            return None
+
+        seat_map = self.flight_dal.get_seat_map(flight_id)
+        return {
+            'flight_id': flight.id,
+            'flight_number': flight.flight_number,
+            'available_seats': flight.available_seats,
+            'free_seats': seat_map.free_seats(seat_layout(flight.aircraft_type, flight.total_seats))
+        }
+
     def get_flights_by_route(self, departure_airport_id: int, arrival_airport_id: int) -> List[Dict]:
         """Get flights by route with business logic."""
         flights = self.flight_dal.get_flights_by_route(departure_airport_id, arrival_airport_id)
         
         # Format and filter results
-        route_flights = []
-        for flight in flights:
-            if flight.status != FlightStatus.CANCELLED:
-                flight_details = self.flight_dal.get_flight_details(flight.id)
-                if flight_details:
-                    route_flights.append(flight_details)
-        
-        return route_flights
+        route_ids = [flight.id for flight in flights if flight.status != FlightStatus.CANCELLED]
+        return self.flight_dal.get_flight_details_many(route_ids)
 
     def calculate_flight_price(self, flight_id: int, seat_count: int = 1) -> Optional[float]:
         """Calculate flight price with business logic."""
         flight = self.flight_dal.get_by_id(flight_id)
         if not flight:
             return None
-
-        # Basic price calculation
-        base_price = flight.base_price
-
-        # Apply business rules for pricing
-        # 1. Early booking discount (if booking is more than 30 days in advance)
-        days_until_flight = (flight.departure_time - datetime.now()).days
-        if days_until_flight > 30:
-            base_price *= 0.9  # 10% discount
-
-        # 2. Last-minute booking surcharge (if booking is less than 7 days in advance)
-        elif days_until_flight < 7:
-            base_price *= 1.2  # 20% surcharge
-
-        # 3. Apply seat availability factor
-        availability_factor = flight.available_seats / flight.total_seats
-        if availability_factor < 0.2:  # Less than 20% seats available
-            base_price *= 1.15  # 15% surcharge
-
-        return round(base_price * seat_count, 2) 
\ No newline at end of file
+        return quote_flight(flight, seat_count=seat_count)
\ No newline at end of file
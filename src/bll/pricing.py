@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence
+import numpy as np
+from ..models.database import Flight
+
+# Fare rules, applied to the flight's base price in this order
+EARLY_BOOKING_DAYS = 30        # more days than this before departure...
+EARLY_BOOKING_FACTOR = 0.9     # ...gives a 10% discount
+LAST_MINUTE_DAYS = 7           # fewer days than this...
+LAST_MINUTE_FACTOR = 1.2       # ...adds a 20% surcharge
+SCARCITY_THRESHOLD = 0.2       # under this share of seats left...
+SCARCITY_FACTOR = 1.15         # ...adds a 15% surcharge
+
+_ONE_DAY = np.timedelta64(1, 'D')
+
+def quote_fare(base_price: float, departure_time: datetime, available_seats: int, total_seats: int,
+               now: datetime, seat_count: int = 1) -> float:
+    """Price one flight with the fare rules, one value at a time.
+
+    This is the reference the vectorized quote_fares must match exactly.
+    """
+    price = base_price
+
+    # 1. Early booking discount / last-minute surcharge
+    days_until_flight = (departure_time - now).days
+    if days_until_flight > EARLY_BOOKING_DAYS:
+        price *= EARLY_BOOKING_FACTOR
+    elif days_until_flight < LAST_MINUTE_DAYS:
+        price *= LAST_MINUTE_FACTOR
+
+    # 2. Seat availability factor
+    availability_factor = available_seats / total_seats
+    if availability_factor < SCARCITY_THRESHOLD:
+        price *= SCARCITY_FACTOR
+
+    return round(price * seat_count, 2)
+
+def quote_fares(base_prices: Sequence[float], departure_times: Sequence[datetime],
+                available_seats: Sequence[int], total_seats: Sequence[int],
+                now: Optional[datetime] = None, seat_count: int = 1) -> np.ndarray:
+    """Price many flights at once with the fare rules.
+
+    Takes parallel sequences (or arrays) of the flights' fields, with
+    departure times as datetimes or a datetime64 array, and returns a
+    float64 array of quotes, equal element for element to quote_fare.
+    """
+    now = now or datetime.now()
+    prices = np.asarray(base_prices, dtype=np.float64)
+    available = np.asarray(available_seats, dtype=np.float64)
+    total = np.asarray(total_seats, dtype=np.float64)
+    days_until_flight = _days_until(departure_times, now)
+    time_factor = np.where(
+        days_until_flight > EARLY_BOOKING_DAYS, EARLY_BOOKING_FACTOR,
+        np.where(days_until_flight < LAST_MINUTE_DAYS, LAST_MINUTE_FACTOR, 1.0)
+    )
+    # Multiplying by 1.0 is exact, so applying every factor keeps the scalar result
+    prices = prices * time_factor
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        availability_factor = available / total
+    prices = prices * np.where(availability_factor < SCARCITY_THRESHOLD, SCARCITY_FACTOR, 1.0)
+
+    return _round_cents(prices * seat_count)
+
+def _days_until(departure_times, now: datetime) -> np.ndarray:
+    """Whole days from now to each departure, floored like timedelta.days."""
+    if isinstance(departure_times, np.ndarray) and np.issubdtype(departure_times.dtype, np.datetime64):
+        # timedelta64 floor division floors too
+        return (departure_times.astype('datetime64[us]') - np.datetime64(now, 'us')) // _ONE_DAY
+    # NumPy converts datetime objects one at a time and slowly; take the
+    # days while building the array instead
+    return np.fromiter(
+        ((departure - now).days for departure in departure_times),
+        dtype=np.int64, count=len(departure_times)
+    )
+
+def _round_cents(values: np.ndarray) -> np.ndarray:
+    """Round to two decimals exactly as the builtin round() does.
+
+    np.round scales by 100 in floating point, which can move a value that is
+    just below or above a half cent onto the other side; those few near-ties
+    are settled with the builtin's correctly rounded result.
+    """
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for index in np.flatnonzero(near_tie):
+        rounded[index] = round(float(values[index]), 2)
+    return rounded
+
+def quote_flight(flight: Flight, now: Optional[datetime] = None, seat_count: int = 1) -> float:
+    """Price one loaded flight with the fare engine."""
+    return float(quote_fares(
+        [flight.base_price], [flight.departure_time],
+        [flight.available_seats], [flight.total_seats],
+        now=now, seat_count=seat_count
+    )[0])
+
+def price_results(results: List[dict], now: Optional[datetime] = None) -> List[dict]:
+    """Add a 'price' quote to each flight details dict, in place, in one batch."""
+    if not results:
+        return results
+    prices = quote_fares(
+        [result['base_price'] for result in results],
+        [result['departure_time'] for result in results],
+        [result['available_seats'] for result in results],
+        [result['total_seats'] for result in results],
+        now=now
+    )
+    for result, price in zip(results, prices.tolist()):
+        result['price'] = price
+    return results
+
+def fare_calendar(flights: List[dict], first_day: datetime, day_count: int,
+                  now: Optional[datetime] = None) -> List[dict]:
+    """Lowest quote, seats left and number of flights for each of day_count days.
+
+    Flights are dicts with the fare fields of get_flight_details; they are
+    priced in one batch and grouped by whole days since first_day. Days
+    without a bookable flight get a None price.
+    """
+    lowest = np.full(day_count, np.inf)
+    seats = np.zeros(day_count, dtype=np.int64)
+    counts = np.zeros(day_count, dtype=np.int64)
+    if flights:
+        prices = quote_fares(
+            [flight['base_price'] for flight in flights],
+            [flight['departure_time'] for flight in flights],
+            [flight['available_seats'] for flight in flights],
+            [flight['total_seats'] for flight in flights],
+            now=now
+        )
+        days = _days_until([flight['departure_time'] for flight in flights], first_day)
+        available = np.array([flight['available_seats'] for flight in flights], dtype=np.int64)
+        in_range = (days >= 0) & (days < day_count)
+        days, prices, available = days[in_range], prices[in_range], available[in_range]
+        np.minimum.at(lowest, days, prices)
+        np.add.at(seats, days, available)
+        counts += np.bincount(days, minlength=day_count)
+
+    return [
+        {
+            'date': (first_day + timedelta(days=day)).date(),
+            'price': price if count else None,
+            'available_seats': seat_total,
+            'flights': count
+        }
+        for day, (price, seat_total, count) in enumerate(zip(lowest.tolist(), seats.tolist(), counts.tolist()))
+    ]
@@ -0,0 +1,219 @@
+import collections
+import itertools
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Mapping, Optional
+from sqlalchemy.orm import Session
+from ..models.database import Flight, FlightStatus, drop_indexes, ensure_indexes
+from ..dal.flight_dal import FlightDAL
+from ..dal.inventory_dal import InventoryDAL
+from ..dal.schedule_import_dal import ScheduleImportDAL
+from ..dal.unit_of_work import UnitOfWork
+from ..utils.schedule_formats import CSV, detect_schedule_format, read_schedule
+
+DEFAULT_IMPORT_CHUNK_SIZE = 10000
+
+# Rejected records listed in the result; any beyond this are only counted
+MAX_LISTED_REJECTS = 100
+
+def _text(record: Mapping[str, Any], field: str, max_length: int) -> str:
+    value = record.get(field)
+    if value is None or not str(value).strip():
+        raise ValueError(f"{field} is required")
+    value = str(value).strip()
+    if len(value) > max_length:
+        raise ValueError(f"{field} is longer than {max_length} characters")
+    return value
+
+def _optional(record: Mapping[str, Any], field: str) -> Any:
+    """The field's value, with missing and empty both read as None."""
+    value = record.get(field)
+    return None if value is None or value == "" else value
+
+def _datetime(record: Mapping[str, Any], field: str) -> datetime:
+    """An ISO 8601 time; times with an offset are stored as naive UTC like the rest of the schema."""
+    value = _optional(record, field)
+    if value is None:
+        raise ValueError(f"{field} is required")
+    try:
+        value = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"{field} is not an ISO 8601 time: {value!r}")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _number(record: Mapping[str, Any], field: str, kind: type, default: Any = None) -> Any:
+    value = _optional(record, field)
+    if value is None:
+        if default is None:
+            raise ValueError(f"{field} is required")
+        return default
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} is not a valid {kind.__name__}: {value!r}")
+
+def parse_flight(record: Mapping[str, Any], airport_ids: Mapping[str, int]) -> Dict[str, Any]:
+    """Turn a schedule record into a flights row, raising ValueError if it is invalid.
+
+    Records carry airport codes, as in the flight export; available_seats
+    defaults to total_seats and status to scheduled.
+    """
+    if not isinstance(record, Mapping):
+        raise ValueError("a flight record must be an object")
+    departure_code = _text(record, 'departure_airport', 3).upper()
+    arrival_code = _text(record, 'arrival_airport', 3).upper()
+    for code in (departure_code, arrival_code):
+        if code not in airport_ids:
+            raise ValueError(f"unknown airport {code}")
+    if departure_code == arrival_code:
+        raise ValueError("departure and arrival airports are the same")
+
+    departure_time = _datetime(record, 'departure_time')
+    arrival_time = _datetime(record, 'arrival_time')
+    if arrival_time <= departure_time:
+        raise ValueError("arrival_time is not after departure_time")
+
+    total_seats = _number(record, 'total_seats', int)
+    if total_seats <= 0:
+        raise ValueError("total_seats must be positive")
+    available_seats = _number(record, 'available_seats', int, total_seats)
+    if not 0 <= available_seats <= total_seats:
+        raise ValueError("available_seats must be between 0 and total_seats")
+    base_price = _number(record, 'base_price', float)
+    if not base_price >= 0:
+        raise ValueError("base_price must not be negative")
+    try:
+        status = FlightStatus(_optional(record, 'status') or FlightStatus.SCHEDULED)
+    except ValueError:
+        raise ValueError(f"unknown status {record.get('status')!r}")
+
+    return {
+        'flight_number': _text(record, 'flight_number', 10),
+        'departure_airport_id': airport_ids[departure_code],
+        'arrival_airport_id': airport_ids[arrival_code],
+        'departure_time': departure_time,
+        'arrival_time': arrival_time,
+        'aircraft_type': _text(record, 'aircraft_type', 50),
+        'total_seats': total_seats,
+        'available_seats': available_seats,
+        'status': status,
+        'base_price': base_price,
+    }
+
+class ScheduleImportService:
+    """Load schedule feeds of flights in bulk, resumably.
+
+    The file is streamed and handled chunk_size records at a time: each
+    chunk is validated, upserted on flight_number with executemany and
+    committed together with the import's progress, so after a failure the
+    same file resumes after the last committed chunk. The flights' search
+    indexes are dropped for the load and rebuilt once after it, as is the
+    route inventory summary.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.import_dal = ScheduleImportDAL(session)
+        self.flight_dal = FlightDAL(session)
+
+    def import_schedule(self, path: str, schedule_format: Optional[str] = None,
+                        chunk_size: int = DEFAULT_IMPORT_CHUNK_SIZE, restart: bool = False,
+                        keep_indexes: bool = False,
+                        progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Import a CSV, NDJSON or JSON schedule file; progress is called after each chunk."""
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        path = os.path.abspath(path)
+        schedule_format = detect_schedule_format(path, schedule_format)
+        stat = os.stat(path)
+        fingerprint = f"{stat.st_size}:{stat.st_mtime_ns}"
+
+        job = None if restart else self.import_dal.find_resumable(path, fingerprint)
+        if job is None:
+            job = self.import_dal.create(source=path, fingerprint=fingerprint,
+                                         records_read=0, flights_loaded=0, rejected=0)
+        job_id, resumed_from = job.id, job.records_read
+        flights_loaded, rejected = job.flights_loaded, job.rejected
+        airport_ids = self.import_dal.get_airport_ids()
+        self.session.commit()
+
+        bind = self.session.get_bind()
+        if not keep_indexes:
+            drop_indexes(bind, Flight.__table__)
+        rebuilt = []
+        rejects = []
+        records_read = resumed_from
+        started = time.perf_counter()
+        try:
+            with open(path, newline="" if schedule_format == CSV else None, encoding="utf-8") as file:
+                records = read_schedule(file, schedule_format)
+                # Skip the records committed before the previous import stopped
+                collections.deque(itertools.islice(records, resumed_from), maxlen=0)
+                while True:
+                    chunk = list(itertools.islice(records, chunk_size))
+                    if not chunk:
+                        break
+                    # Keyed on flight_number so a repeated flight keeps its last record
+                    rows = {}
+                    chunk_rejected = 0
+                    for record in chunk:
+                        records_read += 1
+                        try:
+                            row = parse_flight(record, airport_ids)
+                        except ValueError as e:
+                            chunk_rejected += 1
+                            if len(rejects) < MAX_LISTED_REJECTS:
+                                rejects.append({'record': records_read, 'error': str(e)})
+                            continue
+                        rows[row['flight_number']] = row
+
+                    with UnitOfWork(self.session):
+                        if rows:
+                            # The inventory is rebuilt once after the load, with the indexes back
+                            flights_loaded += self.flight_dal.load_schedule(
+                                list(rows.values()), chunk_size, refresh_inventory=False
+                            )
+                        rejected += chunk_rejected
+                        self.import_dal.update(job_id, records_read=records_read,
+                                               flights_loaded=flights_loaded, rejected=rejected)
+                    if progress:
+                        elapsed = time.perf_counter() - started
+                        progress({
+                            'records_read': records_read,
+                            'flights_loaded': flights_loaded,
+                            'rejected': rejected,
+                            'rows_per_second': (records_read - resumed_from) / elapsed if elapsed else 0.0,
+                        })
+            load_seconds = time.perf_counter() - started
+        finally:
+            # Leave the table indexed even if the load failed; a resumed import drops them again.
+            # An import killed outright leaves them dropped until it is resumed or migrate runs
+            self.session.rollback()
+            began = time.perf_counter()
+            if not keep_indexes:
+                rebuilt = ensure_indexes(bind)
+            index_seconds = time.perf_counter() - began
+
+        began = time.perf_counter()
+        route_days = InventoryDAL(self.session).rebuild()
+        inventory_seconds = time.perf_counter() - began
+        self.import_dal.update(job_id, finished_at=datetime.utcnow())
+
+        return {
+            'source': path,
+            'format': schedule_format,
+            'resumed_from': resumed_from,
+            'records_read': records_read,
+            'flights_loaded': flights_loaded,
+            'rejected': rejected,
+            'rejects': rejects,
+            'load_seconds': load_seconds,
+            'rows_per_second': (records_read - resumed_from) / load_seconds if load_seconds else 0.0,
+            'indexes_rebuilt': rebuilt,
+            'index_seconds': index_seconds,
+            'inventory_seconds': inventory_seconds,
+            'route_days': route_days,
+        }
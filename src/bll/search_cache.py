@@ -0,0 +1,261 @@
+import os
+import sys
+import time
+from collections import Counter, OrderedDict
+from datetime import date, datetime
+from threading import RLock
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import aliased
+from ..models.database import Airport, Flight
+from ..dal.flight_events import on_flights_committed
+
+SearchKey = Tuple[str, str, datetime]
+RouteDay = Tuple[str, str, date]
+# Route/day generation and invalidation sequence number seen when a load started
+LoadToken = Tuple[int, int]
+
+# Flight invalidations remembered for running loads before the old ones are pruned
+_PRUNE_FLIGHT_INVALIDATIONS = 4096
+
+def _estimate_size(results: List[dict]) -> int:
+    """Approximate the memory held by a list of flat result dicts."""
+    size = sys.getsizeof(results)
+    for result in results:
+        size += sys.getsizeof(result)
+        for value in result.values():
+            size += sys.getsizeof(value)
+    return size
+
+class SearchResultCache:
+    """Bounded LRU/TTL cache of flight search results.
+
+    Entries are keyed on the normalized (origin, destination, date) search and
+    indexed by route and departure day and by the flights in their results, so
+    a change to one flight drops only the searches that could include it,
+    on its new route/day and on the one it moved from. Each route/day carries
+    a generation number that invalidation bumps, and each invalidated flight
+    the sequence number of its invalidation; a result computed before an
+    invalidation is not stored, so a slow miss can never re-cache stale seats.
+    Only running loads compare generations, so a route/day keeps one only
+    while a load for it runs.
+
+    Invalidation follows this process's commits, bulk writes included.
+    Changes committed by other processes are only seen once entries expire
+    after ttl_seconds.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = RLock()
+        self._entries: "OrderedDict[SearchKey, Tuple[float, int, List[dict]]]" = OrderedDict()
+        self._keys_by_route_day: Dict[RouteDay, Set[SearchKey]] = {}
+        self._keys_by_flight: Dict[int, Set[SearchKey]] = {}
+        # Generation of each route/day with a running load; absent means 0
+        self._generations: Dict[RouteDay, int] = {}
+        self._loads_by_route_day: Counter = Counter()
+        self._invalidation_seq = 0
+        # Invalidation sequence number of the last clear; loads started before it are not stored
+        self._cleared_seq = 0
+        # Sequence number of each flight's last invalidation, kept while loads run
+        self._flight_invalidations: Dict[int, int] = {}
+        # Running loads by the invalidation sequence number they started at
+        self._loads: Counter = Counter()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get_or_load(self, departure_airport: str, arrival_airport: str, search_date: datetime,
+                    loader: Callable[[], List[dict]]) -> List[dict]:
+        """Return cached results for the search, calling loader on a miss."""
+        key, route_day = self._keys(departure_airport, arrival_airport, search_date)
+        results, token = self._lookup(key, route_day)
+        if results is None:
+            try:
+                results = loader()
+            finally:
+                self._finish_load(key, route_day, token, results)
+        return [dict(result) for result in results]
+
+    async def get_or_load_async(self, departure_airport: str, arrival_airport: str, search_date: datetime,
+                                loader: Callable[[], Awaitable[List[dict]]]) -> List[dict]:
+        """Return cached results for the search, awaiting loader on a miss."""
+        key, route_day = self._keys(departure_airport, arrival_airport, search_date)
+        results, token = self._lookup(key, route_day)
+        if results is None:
+            try:
+                results = await loader()
+            finally:
+                self._finish_load(key, route_day, token, results)
+        return [dict(result) for result in results]
+
+    @staticmethod
+    def _keys(departure_airport: str, arrival_airport: str, search_date: datetime) -> Tuple[SearchKey, RouteDay]:
+        return (
+            (departure_airport, arrival_airport, search_date),
+            (departure_airport, arrival_airport, search_date.date())
+        )
+
+    def _lookup(self, key: SearchKey, route_day: RouteDay) -> Tuple[Optional[List[dict]], Optional[LoadToken]]:
+        """Return (results, None) on a hit, or (None, load token) on a miss, counting the load as running."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, _, results = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return results, None
+                self._remove(key)
+                self.expirations += 1
+            self.misses += 1
+            self._loads[self._invalidation_seq] += 1
+            self._loads_by_route_day[route_day] += 1
+            return None, (self._generations.get(route_day, 0), self._invalidation_seq)
+
+    def _finish_load(self, key: SearchKey, route_day: RouteDay, token: LoadToken,
+                     results: Optional[List[dict]]) -> None:
+        """Store loaded results unless their route/day or one of their flights was invalidated while loading."""
+        generation, seq = token
+        with self._lock:
+            current = results is not None and seq >= self._cleared_seq and \
+                self._generations.get(route_day, 0) == generation and all(
+                self._flight_invalidations.get(result['id'], seq) <= seq for result in results
+            )
+            if current:
+                self._store(key, route_day, results)
+
+            self._loads[seq] -= 1
+            if not self._loads[seq]:
+                del self._loads[seq]
+            self._loads_by_route_day[route_day] -= 1
+            if not self._loads_by_route_day[route_day]:
+                del self._loads_by_route_day[route_day]
+                self._generations.pop(route_day, None)
+            if not self._loads:
+                self._flight_invalidations.clear()
+            elif len(self._flight_invalidations) > _PRUNE_FLIGHT_INVALIDATIONS:
+                oldest = min(self._loads)
+                self._flight_invalidations = {
+                    flight_id: invalidated for flight_id, invalidated in self._flight_invalidations.items()
+                    if invalidated > oldest
+                }
+
+    @property
+    def active(self) -> bool:
+        """Whether anything is cached or loading, so that invalidation has work to do."""
+        with self._lock:
+            return bool(self._entries or self._loads)
+
+    def invalidate(self, departure_airport: str, arrival_airport: str, departure_day: date) -> None:
+        """Drop every cached search for one route and departure day."""
+        route_day = (departure_airport, arrival_airport, departure_day)
+        with self._lock:
+            if route_day in self._loads_by_route_day:
+                self._generations[route_day] = self._generations.get(route_day, 0) + 1
+            for key in list(self._keys_by_route_day.get(route_day, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_flights(self, flight_ids: Iterable[int], route_days: Iterable[RouteDay]) -> None:
+        """Drop every cached search that includes one of the flights or covers their route/days now."""
+        with self._lock:
+            self._invalidation_seq += 1
+            for flight_id in flight_ids:
+                if self._loads:
+                    self._flight_invalidations[flight_id] = self._invalidation_seq
+                # Found under the route/day the flight had when the search was cached
+                for key in list(self._keys_by_flight.get(flight_id, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+            for route_day in route_days:
+                self.invalidate(*route_day)
+
+    def clear(self) -> None:
+        """Drop every cached search, including the results of loads still running."""
+        with self._lock:
+            self._invalidation_seq += 1
+            self._cleared_seq = self._invalidation_seq
+            self._entries.clear()
+            self._keys_by_route_day.clear()
+            self._keys_by_flight.clear()
+            self._generations.clear()
+            self.size_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'size_bytes': self.size_bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+    def _store(self, key: SearchKey, route_day: RouteDay, results: List[dict]) -> None:
+        size = _estimate_size(results)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, size, results)
+        self._keys_by_route_day.setdefault(route_day, set()).add(key)
+        for result in results:
+            self._keys_by_flight.setdefault(result['id'], set()).add(key)
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: SearchKey) -> None:
+        _, size, results = self._entries.pop(key)
+        self.size_bytes -= size
+        for result in results:
+            keys = self._keys_by_flight.get(result['id'])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_flight[result['id']]
+        route_day = (key[0], key[1], key[2].date())
+        keys = self._keys_by_route_day.get(route_day)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_route_day[route_day]
+
+# Shared cache for the process, sized and timed from the environment
+search_cache = SearchResultCache(
+    max_bytes=int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "60"))
+)
+
+def _invalidate_committed_flights(bind: Engine, flight_ids: Set[int]) -> None:
+    # Nothing to drop, and no load that could store what the commit changed
+    if not search_cache.active:
+        return
+    departure = aliased(Airport)
+    arrival = aliased(Airport)
+    stmt = select(departure.code, arrival.code, Flight.departure_time).join(
+        departure, Flight.departure_airport_id == departure.id
+    ).join(
+        arrival, Flight.arrival_airport_id == arrival.id
+    ).where(Flight.id.in_(flight_ids))
+    with bind.connect() as conn:
+        route_days = {
+            (departure_code, arrival_code, departure_time.date())
+            for departure_code, arrival_code, departure_time in conn.execute(stmt)
+        }
+    search_cache.invalidate_flights(flight_ids, route_days)
+
+# When the changed route/days cannot be read, nothing cached can be trusted
+on_flights_committed(_invalidate_committed_flights, on_failure=search_cache.clear)
@@ -0,0 +1,18 @@
+from typing import Optional
+from ..models.database import User, UserRole
+from ..dal.async_user_dal import AsyncUserDAL
+from sqlalchemy.ext.asyncio import AsyncSession
+
+class UserService:
+    def __init__(self, session: AsyncSession):
+        self.user_dal = AsyncUserDAL(session)
+
+    async def authenticate(self, username: str, password: str) -> Optional[User]:
+        """Authenticate a user, verifying the password off the event loop."""
+        return await self.user_dal.authenticate(username, password)
+
+    async def register_user(self, username: str, email: str, password: str, role: UserRole) -> Optional[User]:
+        """Register a new user, hashing the password off the event loop."""
+        if await self.user_dal.get_by_username(username):
+            return None
+        return await self.user_dal.create_user(username, email, password, role)
@@ -0,0 +1,142 @@
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import select, func, case, and_, or_, Float
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from ..models.database import Booking, Flight, Airport
+from .base_dal import BaseDAL
+
+# Upper bounds, in days between booking and departure, of the lead time buckets;
+# bookings made further ahead fall in one last open bucket
+LEAD_TIME_BOUNDS = (1, 3, 7, 14, 30, 60, 90)
+
+DEFAULT_STREAM_CHUNK_SIZE = 50000
+
+# (highest booking id, highest cancellation sequence number)
+Watermark = Tuple[int, int]
+
+def next_cancellation_seq():
+    """Next cancellation sequence number, computed inside the cancelling UPDATE.
+
+    This relies on SQLite serializing writers: it runs one write transaction
+    at a time, so no two cancellations read the same MAX(), the numbers are
+    committed in order and a reader never sees a gap that a later commit
+    fills in. A database with concurrent writers needs a sequence instead.
+    """
+    cancelled = aliased(Booking)
+    return select(func.coalesce(func.max(cancelled.cancellation_seq), 0) + 1).scalar_subquery()
+
+class AnalyticsDAL(BaseDAL[Booking]):
+    """Booking totals grouped in SQL for the analytics rollups."""
+
+    def __init__(self, session: Session):
+        super().__init__(session, Booking)
+
+    def _dialect_name(self) -> str:
+        return self.session.connection().dialect.name
+
+    def get_watermark(self) -> Watermark:
+        """The newest booking and cancellation the rollups could include now."""
+        # One MAX() per query lets SQLite read each from the end of its index
+        row = self.session.execute(select(
+            select(func.coalesce(func.max(Booking.id), 0)).scalar_subquery(),
+            select(func.coalesce(func.max(Booking.cancellation_seq), 0)).scalar_subquery()
+        )).one()
+        return row[0], row[1]
+
+    def get_flight_dimensions(self, flight_ids: Optional[Sequence[int]] = None,
+                              after_id: Optional[int] = None) -> List[tuple]:
+        """(id, departure airport id, arrival airport id, departure time, total seats) of flights.
+
+        Every flight by default; flight_ids restricts to those flights, and
+        after_id to the flights with a higher id.
+        """
+        stmt = select(Flight.id, Flight.departure_airport_id, Flight.arrival_airport_id,
+                      Flight.departure_time, Flight.total_seats).order_by(Flight.id)
+        if flight_ids is not None:
+            stmt = stmt.where(Flight.id.in_(flight_ids))
+        if after_id is not None:
+            stmt = stmt.where(Flight.id > after_id)
+        return self.session.execute(stmt).all()
+
+    def get_airport_codes(self) -> Dict[int, str]:
+        return dict(self.session.execute(select(Airport.id, Airport.code)).all())
+
+    def stream_booking_totals(self, after: Watermark, upto: Watermark,
+                              flight_ids: Optional[Sequence[int]] = None,
+                              chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE) -> Iterator[List[tuple]]:
+        """Totals of the bookings made in (after, upto], per flight and lead time bucket.
+
+        Rows are (flight_id, bucket, bookings, revenue, cancellations) with the
+        status each booking had at the upto watermark, streamed in chunks.
+        flight_ids instead restricts to those flights' bookings up to upto.
+        """
+        criteria = [Booking.id <= upto[0]]
+        if flight_ids is None:
+            criteria.append(Booking.id > after[0])
+        else:
+            criteria.append(Booking.flight_id.in_(flight_ids))
+        bookings = self._with_lead_days(self._dialect_name(), criteria)
+        # Cancelled after the watermark still counts as booked until the next refresh
+        cancelled = and_(
+            bookings.c.booking_status == "cancelled",
+            or_(bookings.c.cancellation_seq.is_(None), bookings.c.cancellation_seq <= upto[1])
+        )
+        bucket = self._lead_time_bucket(bookings.c.lead_days)
+        stmt = select(
+            bookings.c.flight_id, bucket,
+            func.sum(case((cancelled, 0), else_=1)),
+            func.sum(case((cancelled, 0.0), else_=bookings.c.total_price), type_=Float),
+            func.sum(case((cancelled, 1), else_=0))
+        ).group_by(bookings.c.flight_id, bucket)
+        yield from self._stream(stmt, chunk_size)
+
+    def stream_cancellations(self, after: Watermark, upto: Watermark,
+                             chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE) -> Iterator[List[tuple]]:
+        """Bookings up to after's booking id cancelled in (after, upto], per flight and bucket.
+
+        Rows are (flight_id, bucket, cancellations, revenue) of bookings the
+        previous refresh counted as booked.
+        """
+        bookings = self._with_lead_days(self._dialect_name(), [
+            Booking.cancellation_seq > after[1],
+            Booking.cancellation_seq <= upto[1],
+            Booking.id <= after[0]
+        ])
+        bucket = self._lead_time_bucket(bookings.c.lead_days)
+        stmt = select(
+            bookings.c.flight_id, bucket, func.count(), func.sum(bookings.c.total_price, type_=Float)
+        ).group_by(bookings.c.flight_id, bucket)
+        yield from self._stream(stmt, chunk_size)
+
+    def _stream(self, stmt, chunk_size: int) -> Iterator[List[tuple]]:
+        result = self.session.execute(stmt.execution_options(yield_per=chunk_size))
+        for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+
+    @staticmethod
+    def _with_lead_days(dialect_name: str, criteria: Sequence):
+        """The bookings matching criteria with the days between booking and departure."""
+        if dialect_name == 'sqlite':
+            lead_days = func.julianday(Flight.departure_time) - func.julianday(Booking.booking_date)
+        elif dialect_name == 'postgresql':
+            lead_days = func.extract('epoch', Flight.departure_time - Booking.booking_date) / 86400.0
+        else:
+            raise NotImplementedError(f"booking analytics are not supported on {dialect_name}")
+        stmt = select(
+            Booking.flight_id, Booking.booking_status, Booking.cancellation_seq, Booking.total_price,
+            lead_days.label('lead_days')
+        ).join(
+            Flight, Booking.flight_id == Flight.id
+        ).where(*criteria)
+        if dialect_name == 'sqlite':
+            # A LIMIT keeps SQLite from flattening the subquery, which would
+            # evaluate lead_days again in every branch of the bucket CASE
+            stmt = stmt.limit(-1)
+        return stmt.subquery()
+
+    @staticmethod
+    def _lead_time_bucket(lead_days):
+        """Index into LEAD_TIME_BOUNDS of a number of days booked ahead."""
+        return case(
+            *[(lead_days < bound, index) for index, bound in enumerate(LEAD_TIME_BOUNDS)],
+            else_=len(LEAD_TIME_BOUNDS)
+        ).label('lead_time_bucket')
@@ -0,0 +1,73 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import TypeVar, Generic, Type, List, Optional, Any, Sequence, Tuple
+from sqlalchemy import select
+from .base_dal import _page_query, _split_page
+from .unit_of_work import in_unit_of_work
+
+T = TypeVar('T')
+
+class AsyncBaseDAL(Generic[T]):
+    """BaseDAL on an AsyncSession, for the API's request handlers.
+
+    Relationships are never lazily loaded here: an unloaded attribute cannot
+    be fetched without an await, so queries that feed formatted details
+    eager-load what they use. Bulk writes stay on the sync BaseDAL, which is
+    what scripts like init_db use.
+    """
+
+    def __init__(self, session: AsyncSession, model_class: Type[T]):
+        self.session = session
+        self.model_class = model_class
+
+    async def create(self, **kwargs) -> T:
+        """Create a new record."""
+        instance = self.model_class(**kwargs)
+        self.session.add(instance)
+        await self._commit()
+        return instance
+
+    async def get_by_id(self, id: int) -> Optional[T]:
+        """Get a record by its ID."""
+        return await self.session.get(self.model_class, id)
+
+    async def get_all(self) -> List[T]:
+        """Get all records."""
+        stmt = select(self.model_class)
+        return list((await self.session.execute(stmt)).scalars().all())
+
+    async def paginate(self, cursor: Optional[str] = None, limit: int = 100,
+                       order_by: Sequence[str] = ('id',), criteria: Sequence[Any] = (),
+                       options: Sequence[Any] = ()) -> Tuple[List[T], Optional[str]]:
+        """Get one page of records using keyset pagination, see BaseDAL.paginate."""
+        stmt = _page_query(self.model_class, cursor, limit, order_by, criteria, options)
+        return _split_page(list((await self.session.execute(stmt)).scalars().all()), limit, order_by)
+
+    async def update(self, id: int, **kwargs) -> Optional[T]:
+        """Update a record by its ID."""
+        instance = await self.get_by_id(id)
+        if instance:
+            for key, value in kwargs.items():
+                setattr(instance, key, value)
+            await self._commit()
+        return instance
+
+    async def delete(self, id: int) -> bool:
+        """Delete a record by its ID."""
+        instance = await self.get_by_id(id)
+        if instance:
+            await self.session.delete(instance)
+            await self._commit()
+            return True
+        return False
+
+    async def _commit(self) -> None:
+        """Commit, or only flush when running inside a unit of work."""
+        if in_unit_of_work(self.session):
+            await self.session.flush()
+        else:
+            await self.session.commit()
+
+    async def filter_by(self, **kwargs) -> List[T]:
+        """Filter records by given criteria."""
+        stmt = select(self.model_class).filter_by(**kwargs)
+        return list((await self.session.execute(stmt)).scalars().all())
@@ -0,0 +1,124 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional, Tuple, Sequence
+from datetime import datetime
+from ..models.database import Booking
+from .async_base_dal import AsyncBaseDAL
+from .async_flight_dal import AsyncFlightDAL
+from .async_inventory_dal import AsyncInventoryDAL
+from .base_dal import DEFAULT_CHUNK_SIZE, _chunks
+from .booking_dal import BookingDAL
+from .unit_of_work import AsyncUnitOfWork
+
+class AsyncBookingDAL(AsyncBaseDAL[Booking]):
+    """BookingDAL on an AsyncSession; the statements are BookingDAL's."""
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, Booking)
+        self.flight_dal = AsyncFlightDAL(session)
+        self.inventory_dal = AsyncInventoryDAL(session)
+
+    async def create_booking(self, user_id: int, flight_id: int, seat_number: str,
+                             total_price: float) -> Optional[Booking]:
+        """Create a new booking and update flight availability, see BookingDAL.create_booking."""
+        async with AsyncUnitOfWork(self.session):
+            if not await self.flight_dal.reserve_seats(flight_id, 1):
+                return None
+
+            # Only the insert is rolled back on a concurrently booked seat
+            try:
+                async with self.session.begin_nested():
+                    booking = await self.create(
+                        user_id=user_id,
+                        flight_id=flight_id,
+                        seat_number=seat_number,
+                        booking_status="confirmed",
+                        total_price=total_price
+                    )
+            except IntegrityError:
+                await self.flight_dal.release_seats(flight_id, 1)
+                return None
+
+            await self.flight_dal.set_seat_taken(flight_id, seat_number, True)
+            await self.inventory_dal.record_booking(flight_id, total_price)
+
+        return booking
+
+    async def get_user_bookings(self, user_id: int) -> List[Booking]:
+        """Get all bookings for a specific user."""
+        return await self.filter_by(user_id=user_id)
+
+    async def get_user_bookings_by_date_range(self, user_id: int, start_date: datetime,
+                                              end_date: datetime) -> List[Booking]:
+        """Get a user's bookings within a date range."""
+        stmt = BookingDAL._user_date_range_query(user_id, start_date, end_date)
+        return list((await self.session.execute(stmt)).scalars().all())
+
+    async def get_user_bookings_page(self, user_id: int, cursor: Optional[str] = None, limit: int = 100,
+                                     start_date: Optional[datetime] = None,
+                                     end_date: Optional[datetime] = None) -> Tuple[List[Booking], Optional[str]]:
+        """Get a page of a user's bookings ordered by booking date, with flights loaded."""
+        return await self.paginate(
+            cursor=cursor,
+            limit=limit,
+            order_by=('booking_date', 'id'),
+            criteria=BookingDAL._user_page_criteria(user_id, start_date, end_date),
+            options=BookingDAL._flight_options()
+        )
+
+    async def get_with_flight(self, booking_id: int) -> Optional[Booking]:
+        """Get a booking with its flight and airports loaded."""
+        stmt = select(Booking).where(Booking.id == booking_id).options(*BookingDAL._flight_options())
+        return (await self.session.execute(stmt)).unique().scalar_one_or_none()
+
+    async def get_flight_bookings(self, flight_id: int) -> List[Booking]:
+        """Get all bookings for a specific flight."""
+        return await self.filter_by(flight_id=flight_id)
+
+    async def get_active_bookings(self) -> List[Booking]:
+        """Get all active bookings."""
+        return await self.filter_by(booking_status="confirmed")
+
+    async def cancel_booking(self, booking_id: int) -> Optional[Booking]:
+        """Cancel a booking and update flight availability, see BookingDAL.cancel_booking."""
+        async with AsyncUnitOfWork(self.session):
+            booking = await self.get_by_id(booking_id)
+            if not booking or booking.booking_status != "confirmed":
+                return None
+
+            # Only the request that moves the booking out of 'confirmed' frees the seat
+            cancelled = (await self.session.execute(BookingDAL._cancel_stmt(booking_id))).rowcount == 1
+            if not cancelled:
+                await self.session.refresh(booking, ['booking_status'])
+                return None
+            # Record the new status without an expire that could not lazy-load
+            set_committed_value(booking, 'booking_status', "cancelled")
+
+            await self.flight_dal.release_seats(booking.flight_id, 1)
+            await self.flight_dal.set_seat_taken(booking.flight_id, booking.seat_number, False)
+            await self.inventory_dal.record_cancellation(booking.flight_id, booking.total_price)
+            await self._commit()
+            return booking
+
+    async def get_booking_details(self, booking_id: int) -> Optional[dict]:
+        """Get detailed information about a booking."""
+        details = await self.get_booking_details_many([booking_id])
+        return details[0] if details else None
+
+    async def get_booking_details_many(self, booking_ids: Sequence[int]) -> List[dict]:
+        """Get detailed information about many bookings, see BookingDAL.get_booking_details_many."""
+        bookings = {}
+        for chunk in _chunks(list(booking_ids), DEFAULT_CHUNK_SIZE):
+            for booking in (await self.session.execute(BookingDAL._details_query(chunk))).unique().scalars():
+                bookings[booking.id] = booking
+        return [
+            BookingDAL._format_booking_details(bookings[booking_id])
+            for booking_id in booking_ids if booking_id in bookings
+        ]
+
+    async def get_bookings_by_date_range(self, start_date: datetime, end_date: datetime) -> List[Booking]:
+        """Get all bookings within a date range."""
+        stmt = BookingDAL._date_range_query(start_date, end_date)
+        return list((await self.session.execute(stmt)).scalars().all())
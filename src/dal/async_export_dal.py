@@ -0,0 +1,19 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, Sequence
+from .export_dal import DEFAULT_EXPORT_CHUNK_SIZE
+
+class AsyncExportDAL:
+    """ExportDAL on an AsyncSession; the queries are ExportDAL's."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def stream(self, stmt, chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE) -> AsyncIterator[Sequence[tuple]]:
+        """Yield the statement's rows in chunks."""
+        connection = await self.session.connection()
+        result = await connection.stream(stmt.execution_options(yield_per=chunk_size))
+        try:
+            async for partition in result.partitions():
+                yield partition
+        finally:
+            await result.close()
@@ -0,0 +1,136 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import List, Optional, Tuple, Sequence
+from datetime import datetime
+from ..models.database import Flight, FlightStatus
+from ..utils.seat_map import SeatMap
+from .async_base_dal import AsyncBaseDAL
+from .base_dal import DEFAULT_CHUNK_SIZE, _chunks
+from .flight_dal import FlightDAL
+from .flight_events import mark_flight_changed
+
+class AsyncFlightDAL(AsyncBaseDAL[Flight]):
+    """FlightDAL on an AsyncSession; the statements are FlightDAL's."""
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, Flight)
+
+    async def get_flights_by_route(self, departure_airport_id: int, arrival_airport_id: int) -> List[Flight]:
+        """Get all flights between two airports."""
+        return await self.filter_by(
+            departure_airport_id=departure_airport_id,
+            arrival_airport_id=arrival_airport_id
+        )
+
+    async def get_flights_by_date_range(self, start_date: datetime, end_date: datetime) -> List[Flight]:
+        """Get all flights within a date range."""
+        stmt = FlightDAL._date_range_query(start_date, end_date)
+        return list((await self.session.execute(stmt)).scalars().all())
+
+    async def get_flights_page(self, cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[Flight], Optional[str]]:
+        """Get a page of flights ordered by departure time, with airports loaded."""
+        return await self.paginate(
+            cursor=cursor,
+            limit=limit,
+            order_by=('departure_time', 'id'),
+            options=FlightDAL._airport_options()
+        )
+
+    async def get_available_flights(self) -> List[Flight]:
+        """Get all flights with available seats."""
+        stmt = FlightDAL._available_query()
+        return list((await self.session.execute(stmt)).scalars().all())
+
+    async def get_flights_by_status(self, status: FlightStatus) -> List[Flight]:
+        """Get all flights with a specific status."""
+        return await self.filter_by(status=status)
+
+    async def search_flights(self, departure_airport: str, arrival_airport: str, date: datetime) -> List[Flight]:
+        """Search flights by departure airport, arrival airport, and date."""
+        stmt = FlightDAL._search_query(departure_airport, arrival_airport, date)
+        return list((await self.session.execute(stmt)).scalars().all())
+
+    async def get_route_fares(self, departure_airport: str, arrival_airport: str,
+                              start: datetime, end: datetime) -> List[dict]:
+        """Get the fare fields of bookable flights on a route departing in [start, end)."""
+        stmt = FlightDAL._route_fares_query(departure_airport, arrival_airport, start, end)
+        return [dict(row) for row in (await self.session.execute(stmt)).mappings()]
+
+    async def update_flight_status(self, flight_id: int, new_status: FlightStatus) -> Optional[Flight]:
+        """Update the status of a flight."""
+        return await self.update(flight_id, status=new_status)
+
+    async def reserve_seats(self, flight_id: int, seats: int = 1) -> bool:
+        """Atomically take seats from a flight if enough are available, see FlightDAL.reserve_seats."""
+        return await self._apply_seat_change(flight_id, FlightDAL._reserve_seats_stmt(flight_id, seats))
+
+    async def release_seats(self, flight_id: int, seats: int = 1) -> bool:
+        """Atomically give seats back to a flight, never above its capacity."""
+        return await self._apply_seat_change(flight_id, FlightDAL._release_seats_stmt(flight_id, seats))
+
+    async def _apply_seat_change(self, flight_id: int, stmt) -> bool:
+        """Run a conditional seat UPDATE and report whether it matched."""
+        result = await self.session.execute(
+            stmt.returning(Flight.available_seats).execution_options(synchronize_session=False)
+        )
+        available_seats = result.scalar_one_or_none()
+        if available_seats is None:
+            return False
+        mark_flight_changed(self.session, flight_id)
+
+        # The UPDATE bypassed the identity map, and an expired attribute
+        # cannot lazy-load without an await, so store the returned count
+        flight = self.session.identity_map.get(identity_key(Flight, flight_id))
+        if flight is not None:
+            set_committed_value(flight, 'available_seats', available_seats)
+        await self._commit()
+        return True
+
+    async def get_seat_map(self, flight_id: int) -> Optional[SeatMap]:
+        """Get a flight's seat occupancy map, building it first if it was never stored."""
+        row = (await self.session.execute(FlightDAL._seat_map_query(flight_id))).first()
+        if row is None:
+            return None
+        if row.seat_map is None:
+            return await self.rebuild_seat_map(flight_id, only_if_missing=True)
+        return SeatMap(row.seat_map)
+
+    async def rebuild_seat_map(self, flight_id: int, only_if_missing: bool = False) -> SeatMap:
+        """Rebuild a flight's seat map from its confirmed bookings and store it."""
+        stmt = FlightDAL._confirmed_seats_query(flight_id)
+        seat_map = SeatMap.from_seats((await self.session.execute(stmt)).scalars())
+        await self._store_seat_map(flight_id, seat_map, only_if_missing)
+        return seat_map
+
+    async def set_seat_taken(self, flight_id: int, seat_number: str, taken: bool) -> None:
+        """Mark one seat taken or free in the stored seat map, see FlightDAL.set_seat_taken."""
+        seat_map = await self.get_seat_map(flight_id)
+        if seat_map is None:
+            return
+        seat_map.set_taken(seat_number, taken)
+        await self._store_seat_map(flight_id, seat_map)
+
+    async def _store_seat_map(self, flight_id: int, seat_map: SeatMap, only_if_missing: bool = False) -> None:
+        """Write a seat map to the flight row."""
+        await self.session.execute(FlightDAL._store_seat_map_stmt(flight_id, seat_map, only_if_missing))
+        flight = self.session.identity_map.get(identity_key(Flight, flight_id))
+        if flight is not None:
+            self.session.expire(flight, ['seat_map'])
+        await self._commit()
+
+    async def get_flight_details(self, flight_id: int) -> Optional[dict]:
+        """Get detailed information about a flight including airport details."""
+        details = await self.get_flight_details_many([flight_id])
+        return details[0] if details else None
+
+    async def get_flight_details_many(self, flight_ids: Sequence[int]) -> List[dict]:
+        """Get detailed information about many flights, both airports joined in the same SELECT."""
+        flights = {}
+        for chunk in _chunks(list(flight_ids), DEFAULT_CHUNK_SIZE):
+            for flight in (await self.session.execute(FlightDAL._details_query(chunk))).scalars():
+                flights[flight.id] = flight
+        return [
+            FlightDAL._format_flight_details(flights[flight_id])
+            for flight_id in flight_ids if flight_id in flights
+        ]
@@ -0,0 +1,28 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from datetime import date
+from ..models.database import RouteInventory
+from .async_base_dal import AsyncBaseDAL
+from .inventory_dal import InventoryDAL
+
+class AsyncInventoryDAL(AsyncBaseDAL[RouteInventory]):
+    """InventoryDAL on an AsyncSession; rebuilds and checks stay on the sync DAL."""
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, RouteInventory)
+
+    def _dialect_name(self) -> str:
+        return self.session.bind.dialect.name
+
+    async def record_booking(self, flight_id: int, price: float) -> None:
+        """Count a confirmed booking on the flight's route and day."""
+        await self.session.execute(InventoryDAL._booking_delta(self._dialect_name(), flight_id, 1, price, 0))
+
+    async def record_cancellation(self, flight_id: int, price: float) -> None:
+        """Move a booking on the flight's route and day from sold to cancelled."""
+        await self.session.execute(InventoryDAL._booking_delta(self._dialect_name(), flight_id, -1, -price, 1))
+
+    async def get_summary(self, start_date: date, end_date: date) -> List[dict]:
+        """Get the totals of every route for departure days in [start_date, end_date]."""
+        stmt = InventoryDAL._summary_query(start_date, end_date)
+        return [InventoryDAL._format_summary(row) for row in (await self.session.execute(stmt)).mappings()]
@@ -0,0 +1,62 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Optional, List
+from ..models.database import User, UserRole
+from .async_base_dal import AsyncBaseDAL
+from .user_dal import UserDAL
+from ..password_hashing import password_hasher
+
+class AsyncUserDAL(AsyncBaseDAL[User]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, User)
+
+    async def create_user(self, username: str, email: str, password: str, role: UserRole) -> User:
+        """Create a new user, hashing the password on the hashing pool."""
+        password_hash = await password_hasher.hash(password)
+        return await self.create(
+            username=username,
+            email=email,
+            password_hash=password_hash,
+            role=role
+        )
+
+    async def authenticate(self, username: str, password: str) -> Optional[User]:
+        """Authenticate a user, verifying the password on the hashing pool.
+
+        A legacy SHA-256 hash, or a bcrypt hash of a different cost, is
+        replaced with a current bcrypt hash on successful login. An unknown
+        username is verified against a dummy hash, taking as long as a known one.
+        """
+        user = await self.get_login_user(username)
+        if not user:
+            await password_hasher.verify_unknown_user(password)
+            return None
+        verified, new_hash = await password_hasher.verify_and_update(password, user.password_hash)
+        if not verified:
+            return None
+        if new_hash:
+            await self.update(user.id, password_hash=new_hash)
+        return user
+
+    async def get_login_user(self, username: str) -> Optional[User]:
+        """Get the user that may log in with a username."""
+        return (await self.session.execute(UserDAL._login_user_query(username))).scalar_one_or_none()
+
+    async def get_by_username(self, username: str) -> Optional[User]:
+        """Get a user by username."""
+        stmt = select(User).where(User.username == username)
+        return (await self.session.execute(stmt)).scalar_one_or_none()
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        """Get a user by email."""
+        stmt = select(User).where(User.email == email)
+        return (await self.session.execute(stmt)).scalar_one_or_none()
+
+    async def get_by_role(self, role: UserRole) -> List[User]:
+        """Get all users with a specific role."""
+        return await self.filter_by(role=role)
+
+    async def update_password(self, user_id: int, new_password: str) -> Optional[User]:
+        """Update a user's password."""
+        password_hash = await password_hasher.hash(new_password)
+        return await self.update(user_id, password_hash=password_hash)
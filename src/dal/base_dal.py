@@ -1,9 +1,69 @@
 from sqlalchemy.orm import Session
-from typing import TypeVar, Generic, Type, List, Optional
-from sqlalchemy import select
+from typing import TypeVar, Generic, Type, List, Optional, Dict, Any, Sequence, Iterator, Tuple
+from sqlalchemy import select, insert, update, bindparam, tuple_
+from datetime import datetime
+import base64
+import json
+from sqlalchemy.dialects import sqlite, postgresql
+from .unit_of_work import in_unit_of_work
 
 T = TypeVar('T')
 
+DEFAULT_CHUNK_SIZE = 1000
+
+def _chunks(rows: Sequence[Dict[str, Any]], chunk_size: int) -> Iterator[Sequence[Dict[str, Any]]]:
+    """Yield consecutive slices of at most chunk_size rows."""
+    for start in range(0, len(rows), chunk_size):
+        yield rows[start:start + chunk_size]
+
+def _dialect_insert(dialect_name: str):
+    """The insert() construct with ON CONFLICT support for the dialect."""
+    dialect_insert = {
+        'sqlite': sqlite.insert,
+        'postgresql': postgresql.insert,
+    }.get(dialect_name)
+    if dialect_insert is None:
+        raise NotImplementedError(f"upsert is not supported on {dialect_name}")
+    return dialect_insert
+
+def _encode_cursor(keys: Sequence[str], values: Sequence[Any]) -> str:
+    """Pack the sort key of the last row of a page into an opaque token."""
+    payload = {
+        'k': list(keys),
+        'v': [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+def _decode_cursor(cursor: str, keys: Sequence[str], columns: Sequence[Any]) -> List[Any]:
+    """Unpack a cursor token, checking it was issued for the same sort key."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if payload['k'] != list(keys) or len(payload['v']) != len(columns):
+            raise ValueError
+        return [
+            datetime.fromisoformat(value) if column.type.python_type is datetime else value
+            for value, column in zip(payload['v'], columns)
+        ]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid pagination cursor")
+
+def _page_query(model_class, cursor: Optional[str], limit: int, order_by: Sequence[str],
+                criteria: Sequence[Any], options: Sequence[Any]):
+    """The SELECT of one keyset page, with one extra row to find out whether another page follows."""
+    columns = [getattr(model_class, key) for key in order_by]
+    stmt = select(model_class).where(*criteria).order_by(*columns).options(*options)
+    if cursor:
+        values = _decode_cursor(cursor, order_by, columns)
+        stmt = stmt.where(tuple_(*columns) > tuple_(*values))
+    return stmt.limit(limit + 1)
+
+def _split_page(rows: List[Any], limit: int, order_by: Sequence[str]) -> Tuple[List[Any], Optional[str]]:
+    """Trim the extra row of a page query and encode the next page's cursor, if any."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, _encode_cursor(order_by, [getattr(rows[-1], key) for key in order_by])
+
 class BaseDAL(Generic[T]):
     def __init__(self, session: Session, model_class: Type[T]):
         self.session = session
@@ -13,7 +73,7 @@ class BaseDAL(Generic[T]):
         """Create a new record."""
         instance = self.model_class(**kwargs)
         self.session.add(instance)
-        self.session.commit()
+        self._commit()
         return instance
 
     def get_by_id(self, id: int) -> Optional[T]:
@@ -25,13 +85,26 @@ class BaseDAL(Generic[T]):
         stmt = select(self.model_class)
         return list(self.session.execute(stmt).scalars().all())
 
+    def paginate(self, cursor: Optional[str] = None, limit: int = 100,
+                 order_by: Sequence[str] = ('id',), criteria: Sequence[Any] = (),
+                 options: Sequence[Any] = ()) -> Tuple[List[T], Optional[str]]:
+        """Get one page of records using keyset pagination.
+
+        Rows are ordered by the order_by columns, which must end in a unique
+        column, and each page starts strictly after the cursor's sort key, so
+        every page costs the same as the first one given a matching index.
+        Returns the page and the cursor for the next one (None on the last).
+        """
+        stmt = _page_query(self.model_class, cursor, limit, order_by, criteria, options)
+        return _split_page(list(self.session.execute(stmt).scalars().all()), limit, order_by)
+
     def update(self, id: int, **kwargs) -> Optional[T]:
         """Update a record by its ID."""
         instance = self.get_by_id(id)
         if instance:
             for key, value in kwargs.items():
                 setattr(instance, key, value)
-            self.session.commit()
+            self._commit()
         return instance
 
     def delete(self, id: int) -> bool:
@@ -39,10 +112,96 @@ class BaseDAL(Generic[T]):
         instance = self.get_by_id(id)
         if instance:
             self.session.delete(instance)
-            self.session.commit()
+            self._commit()
             return True
         return False
 
+    def bulk_create(self, rows: Sequence[Dict[str, Any]], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    return_ids: bool = False) -> Optional[List[int]]:
+        """Insert many records with executemany, bypassing the ORM.
+
+        Rows are plain column dicts sent in chunks through a Core INSERT, so no
+        instances are created or tracked in the identity map. When return_ids
+        is set, the new primary keys are returned in the order of rows.
+        """
+        table = self.model_class.__table__
+        conn = self.session.connection()
+        ids = [] if return_ids else None
+        for chunk in _chunks(rows, chunk_size):
+            if return_ids:
+                stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+                ids.extend(conn.execute(stmt, list(chunk)).scalars().all())
+            else:
+                conn.execute(insert(table), list(chunk))
+        self._commit()
+        return ids
+
+    def bulk_update(self, rows: Sequence[Dict[str, Any]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """Update many records by ID with executemany, bypassing the ORM.
+
+        Each row must contain 'id' plus the columns to set. Instances of these
+        records already loaded in the session are not refreshed. Returns the
+        number of rows updated.
+        """
+        table = self.model_class.__table__
+        conn = self.session.connection()
+
+        # executemany needs the same columns in every parameter set
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in rows:
+            columns = tuple(sorted(key for key in row if key != 'id'))
+            groups.setdefault(columns, []).append(
+                {'_id': row['id'], **{key: row[key] for key in columns}}
+            )
+
+        updated = 0
+        for columns, group in groups.items():
+            stmt = update(table).where(table.c.id == bindparam('_id')).values(
+                {key: bindparam(key) for key in columns}
+            )
+            for chunk in _chunks(group, chunk_size):
+                updated += conn.execute(stmt, list(chunk)).rowcount
+        self._commit()
+        return updated
+
+    def upsert(self, rows: Sequence[Dict[str, Any]], conflict_columns: Sequence[str],
+               update_columns: Optional[Sequence[str]] = None,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """Insert many records, updating those that clash on conflict_columns.
+
+        Uses INSERT ... ON CONFLICT DO UPDATE. By default every supplied column
+        except the conflict columns and 'id' is overwritten. Returns the number
+        of rows inserted or updated.
+        """
+        table = self.model_class.__table__
+        conn = self.session.connection()
+        dialect_insert = _dialect_insert(conn.dialect.name)
+
+        if update_columns is None and rows:
+            update_columns = [key for key in rows[0] if key not in conflict_columns and key != 'id']
+
+        stmt = dialect_insert(table)
+        if update_columns:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(conflict_columns),
+                set_={column: stmt.excluded[column] for column in update_columns}
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(conflict_columns))
+
+        affected = 0
+        for chunk in _chunks(rows, chunk_size):
+            affected += conn.execute(stmt, list(chunk)).rowcount
+        self._commit()
+        return affected
+
+    def _commit(self) -> None:
+        """Commit, or only flush when running inside a unit of work."""
+        if in_unit_of_work(self.session):
+            self.session.flush()
+        else:
+            self.session.commit()
+
     def filter_by(self, **kwargs) -> List[T]:
         """Filter records by given criteria."""
         stmt = select(self.model_class).filter_by(**kwargs)
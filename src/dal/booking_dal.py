@@ -1,33 +1,49 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import select, and_
-from typing import List, Optional
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select, update, and_
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional, Tuple, Sequence
 from datetime import datetime
 from ..models.database import Booking, Flight, User
-from .base_dal import BaseDAL
+from .base_dal import BaseDAL, DEFAULT_CHUNK_SIZE, _chunks
+from .flight_dal import FlightDAL
+from .inventory_dal import InventoryDAL
+from .analytics_dal import next_cancellation_seq
+from .unit_of_work import UnitOfWork
 
 class BookingDAL(BaseDAL[Booking]):
     def __init__(self, session: Session):
         super().__init__(session, Booking)
+        self.flight_dal = FlightDAL(session)
+        self.inventory_dal = InventoryDAL(session)
 
     def create_booking(self, user_id: int, flight_id: int, seat_number: str, total_price: float) -> Optional[Booking]:
         """Create a new booking and update flight availability."""
-        # Check if the flight exists and has available seats
-        flight = self.session.get(Flight, flight_id)
-        if not flight or flight.available_seats < 1:
-            return None
-
-        # Create the booking
-        booking = self.create(
-            user_id=user_id,
-            flight_id=flight_id,
-            seat_number=seat_number,
-            booking_status="confirmed",
-            total_price=total_price
-        )
+        with UnitOfWork(self.session):
+            # Take the seat first: the conditional UPDATE fails if the flight
+            # is missing or full, without reading it into Python
+            if not self.flight_dal.reserve_seats(flight_id, 1):
+                return None
+
+            # The partial unique index on confirmed seats rejects a seat that
+            # was booked concurrently. Only the insert's savepoint is rolled
+            # back, not the caller's work, and the seat goes back to the count.
+            # The savepoint follows the UPDATE, so it nests in the transaction
+            # the sqlite3 driver began for that write
+            try:
+                with self.session.begin_nested():
+                    booking = self.create(
+                        user_id=user_id,
+                        flight_id=flight_id,
+                        seat_number=seat_number,
+                        booking_status="confirmed",
+                        total_price=total_price
+                    )
+            except IntegrityError:
+                self.flight_dal.release_seats(flight_id, 1)
+                return None
 
-        # Update flight availability
-        flight.available_seats -= 1
-        self.session.commit()
+            self.flight_dal.set_seat_taken(flight_id, seat_number, True)
+            self.inventory_dal.record_booking(flight_id, total_price)
 
         return booking
 
@@ -35,6 +51,24 @@ class BookingDAL(BaseDAL[Booking]):
         """Get all bookings for a specific user."""
         return self.filter_by(user_id=user_id)
 
+    def get_user_bookings_by_date_range(self, user_id: int, start_date: datetime,
+                                        end_date: datetime) -> List[Booking]:
+        """Get a user's bookings within a date range."""
+        stmt = self._user_date_range_query(user_id, start_date, end_date)
+        return list(self.session.execute(stmt).scalars().all())
+
+    def get_user_bookings_page(self, user_id: int, cursor: Optional[str] = None, limit: int = 100,
+                               start_date: Optional[datetime] = None,
+                               end_date: Optional[datetime] = None) -> Tuple[List[Booking], Optional[str]]:
+        """Get a page of a user's bookings ordered by booking date, with flights loaded."""
+        return self.paginate(
+            cursor=cursor,
+            limit=limit,
+            order_by=('booking_date', 'id'),
+            criteria=self._user_page_criteria(user_id, start_date, end_date),
+            options=self._flight_options()
+        )
+
     def get_flight_bookings(self, flight_id: int) -> List[Booking]:
         """Get all bookings for a specific flight."""
         return self.filter_by(flight_id=flight_id)
@@ -45,50 +79,123 @@ class BookingDAL(BaseDAL[Booking]):
 
     def cancel_booking(self, booking_id: int) -> Optional[Booking]:
         """Cancel a booking and update flight availability."""
-        booking = self.get_by_id(booking_id)
-        if booking and booking.booking_status == "confirmed":
-            # Update booking status
-            booking = self.update(booking_id, booking_status="cancelled")
-            
-            # Update flight availability
-            flight = self.session.get(Flight, booking.flight_id)
-            if flight:
-                flight.available_seats += 1
-                self.session.commit()
-            
+        with UnitOfWork(self.session):
+            booking = self.get_by_id(booking_id)
+            if not booking or booking.booking_status != "confirmed":
+                return None
+
+            # Only the request that moves the booking out of 'confirmed' frees the seat
+            cancelled = self.session.execute(self._cancel_stmt(booking_id)).rowcount == 1
+            self.session.expire(booking, ['booking_status'])
+            if not cancelled:
+                return None
+
+            self.flight_dal.release_seats(booking.flight_id, 1)
+            self.flight_dal.set_seat_taken(booking.flight_id, booking.seat_number, False)
+            self.inventory_dal.record_cancellation(booking.flight_id, booking.total_price)
+            self._commit()
             return booking
-        return None
 
     def get_booking_details(self, booking_id: int) -> Optional[dict]:
         """Get detailed information about a booking."""
         booking = self.get_by_id(booking_id)
         if booking:
-            return {
-                'booking_id': booking.id,
-                'user': {
-                    'id': booking.user.id,
-                    'username': booking.user.username,
-                    'email': booking.user.email
-                },
-                'flight': {
-                    'flight_number': booking.flight.flight_number,
-                    'departure_airport': booking.flight.departure_airport.name,
-                    'arrival_airport': booking.flight.arrival_airport.name,
-                    'departure_time': booking.flight.departure_time
-                },
-                'seat_number': booking.seat_number,
-                'booking_status': booking.booking_status,
-                'total_price': booking.total_price,
-                'booking_date': booking.booking_date
-            }
+            return self._format_booking_details(booking)
         return None
 
+    def get_booking_details_many(self, booking_ids: Sequence[int]) -> List[dict]:
+        """Get detailed information about many bookings in a constant number of queries.
+
+        The user, flight and both airports are joined in the same SELECT, so
+        the cost is one query per chunk of IDs rather than several per booking.
+        Results follow the order of booking_ids; unknown IDs are skipped.
+        """
+        bookings = {}
+        for chunk in _chunks(list(booking_ids), DEFAULT_CHUNK_SIZE):
+            for booking in self.session.execute(self._details_query(chunk)).unique().scalars():
+                bookings[booking.id] = booking
+        return [
+            self._format_booking_details(bookings[booking_id])
+            for booking_id in booking_ids if booking_id in bookings
+        ]
+
+    @staticmethod
+    def _format_booking_details(booking: Booking) -> dict:
+        """Build the booking details dict from a booking with its relationships."""
+        return {
+            'booking_id': booking.id,
+            'user': {
+                'id': booking.user.id,
+                'username': booking.user.username,
+                'email': booking.user.email
+            },
+            'flight': {
+                'flight_number': booking.flight.flight_number,
+                'departure_airport': booking.flight.departure_airport.name,
+                'arrival_airport': booking.flight.arrival_airport.name,
+                'departure_time': booking.flight.departure_time
+            },
+            'seat_number': booking.seat_number,
+            'booking_status': booking.booking_status,
+            'total_price': booking.total_price,
+            'booking_date': booking.booking_date
+        }
+
     def get_bookings_by_date_range(self, start_date: datetime, end_date: datetime) -> List[Booking]:
         """Get all bookings within a date range."""
-        stmt = select(Booking).where(
+        stmt = self._date_range_query(start_date, end_date)
+        return list(self.session.execute(stmt).scalars().all())
+
+    # Statement builders, shared with AsyncBookingDAL so both run the same SQL
+
+    @staticmethod
+    def _flight_options() -> tuple:
+        """Loader options joining a booking's flight and both its airports into its SELECT."""
+        return (
+            joinedload(Booking.flight).joinedload(Flight.departure_airport),
+            joinedload(Booking.flight).joinedload(Flight.arrival_airport),
+        )
+
+    @staticmethod
+    def _user_date_range_query(user_id: int, start_date: datetime, end_date: datetime):
+        return select(Booking).where(
+            and_(
+                Booking.user_id == user_id,
+                Booking.booking_date >= start_date,
+                Booking.booking_date <= end_date
+            )
+        )
+
+    @staticmethod
+    def _user_page_criteria(user_id: int, start_date: Optional[datetime],
+                            end_date: Optional[datetime]) -> list:
+        criteria = [Booking.user_id == user_id]
+        if start_date is not None:
+            criteria.append(Booking.booking_date >= start_date)
+        if end_date is not None:
+            criteria.append(Booking.booking_date <= end_date)
+        return criteria
+
+    @staticmethod
+    def _cancel_stmt(booking_id: int):
+        return update(Booking).where(
+            Booking.id == booking_id,
+            Booking.booking_status == "confirmed"
+        ).values(
+            booking_status="cancelled", cancellation_seq=next_cancellation_seq()
+        ).execution_options(synchronize_session=False)
+
+    @staticmethod
+    def _details_query(booking_ids: Sequence[int]):
+        return select(Booking).where(Booking.id.in_(booking_ids)).options(
+            joinedload(Booking.user), *BookingDAL._flight_options()
+        )
+
+    @staticmethod
+    def _date_range_query(start_date: datetime, end_date: datetime):
+        return select(Booking).where(
             and_(
                 Booking.booking_date >= start_date,
                 Booking.booking_date <= end_date
             )
         )
-        return list(self.session.execute(stmt).scalars().all()) 
\ No newline at end of file
@@ -0,0 +1,65 @@
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import select
+from typing import Iterator, List, Optional, Sequence, Tuple
+from datetime import datetime
+from ..models.database import Booking, Flight, Airport
+
+DEFAULT_EXPORT_CHUNK_SIZE = 10000
+
+class ExportDAL:
+    """Whole-table reads for bulk exports, streamed from a server-side cursor.
+
+    Rows come straight from the Core result in chunks of chunk_size, with no
+    ORM instances and nothing kept once a chunk is handed over, so memory
+    stays flat whatever the number of rows.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def stream(self, stmt, chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE) -> Iterator[Sequence[tuple]]:
+        """Yield the statement's rows in chunks."""
+        result = self.session.connection().execute(stmt.execution_options(yield_per=chunk_size))
+        try:
+            yield from result.partitions()
+        finally:
+            result.close()
+
+    @staticmethod
+    def columns(stmt) -> List[Tuple[str, type]]:
+        """(name, Python type) of each column the statement selects."""
+        return [(column.name, column.type.python_type) for column in stmt.selected_columns]
+
+    @staticmethod
+    def _bookings_query(start: Optional[datetime] = None, end: Optional[datetime] = None):
+        """Bookings with their flight number, made in [start, end) when given, in id order."""
+        stmt = select(
+            Booking.id, Booking.user_id, Booking.flight_id, Flight.flight_number, Booking.booking_date,
+            Booking.seat_number, Booking.booking_status, Booking.total_price
+        ).join(Flight, Booking.flight_id == Flight.id)
+        if start is not None:
+            stmt = stmt.where(Booking.booking_date >= start)
+        if end is not None:
+            stmt = stmt.where(Booking.booking_date < end)
+        return stmt.order_by(Booking.id)
+
+    @staticmethod
+    def _flights_query(start: Optional[datetime] = None, end: Optional[datetime] = None):
+        """Flights with their airport codes, departing in [start, end) when given, in id order."""
+        departure = aliased(Airport)
+        arrival = aliased(Airport)
+        stmt = select(
+            Flight.id, Flight.flight_number,
+            departure.code.label('departure_airport'), arrival.code.label('arrival_airport'),
+            Flight.departure_time, Flight.arrival_time, Flight.aircraft_type,
+            Flight.total_seats, Flight.available_seats, Flight.status, Flight.base_price
+        ).join(
+            departure, Flight.departure_airport_id == departure.id
+        ).join(
+            arrival, Flight.arrival_airport_id == arrival.id
+        )
+        if start is not None:
+            stmt = stmt.where(Flight.departure_time >= start)
+        if end is not None:
+            stmt = stmt.where(Flight.departure_time < end)
+        return stmt.order_by(Flight.id)
@@ -1,14 +1,127 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import select, and_, or_
-from typing import List, Optional
+from sqlalchemy.orm import Session, aliased, joinedload
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy import select, update, and_, or_, case
+from typing import Any, Dict, List, Optional, Set, Tuple, Sequence
 from datetime import datetime
-from ..models.database import Flight, FlightStatus, Airport
-from .base_dal import BaseDAL
+from ..models.database import Flight, FlightStatus, Airport, Booking
+from ..utils.seat_map import SeatMap
+from .base_dal import BaseDAL, DEFAULT_CHUNK_SIZE, _chunks, _dialect_insert
+from .flight_events import mark_flight_changed
+from .inventory_dal import InventoryDAL, RouteDay, INVENTORY_ATTRIBUTES
+from .unit_of_work import UnitOfWork
 
 class FlightDAL(BaseDAL[Flight]):
     def __init__(self, session: Session):
         super().__init__(session, Flight)
 
+    def bulk_create(self, rows: Sequence[Dict[str, Any]], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    return_ids: bool = False) -> Optional[List[int]]:
+        """Insert many flights with executemany, see BaseDAL.bulk_create.
+
+        The Core INSERT bypasses the ORM's flush events, so the new flights
+        are marked changed here for the in-memory search views, and their
+        routes' totals are recounted in the same transaction.
+        """
+        with UnitOfWork(self.session):
+            ids = super().bulk_create(rows, chunk_size=chunk_size, return_ids=True)
+            for flight_id in ids:
+                mark_flight_changed(self.session, flight_id)
+            InventoryDAL(self.session).refresh_route_days(_row_route_days(rows))
+        return ids if return_ids else None
+
+    def bulk_update(self, rows: Sequence[Dict[str, Any]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """Update many flights by ID with executemany, see BaseDAL.bulk_update.
+
+        Routes and days the updated flights leave or join are recounted.
+        """
+        with UnitOfWork(self.session):
+            moved_ids = [row['id'] for row in rows if any(name in row for name in INVENTORY_ATTRIBUTES)]
+            route_days = self._stored_route_days(Flight.id, moved_ids, chunk_size)
+            updated = super().bulk_update(rows, chunk_size=chunk_size)
+            for row in rows:
+                mark_flight_changed(self.session, row['id'])
+            route_days |= self._stored_route_days(Flight.id, moved_ids, chunk_size)
+            InventoryDAL(self.session).refresh_route_days(route_days)
+        return updated
+
+    def upsert_flights(self, rows: List[dict], chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """Insert or update flights keyed on flight_number, recounting their routes' totals."""
+        with UnitOfWork(self.session):
+            flight_numbers = [row['flight_number'] for row in rows]
+            # Flights that already exist may move off their current route or day
+            route_days = self._stored_route_days(Flight.flight_number, flight_numbers, chunk_size)
+            affected = self.upsert(rows, conflict_columns=['flight_number'], chunk_size=chunk_size)
+            # The Core upsert bypasses the ORM's flush events
+            for chunk in _chunks(flight_numbers, chunk_size):
+                flight_ids = self.session.execute(
+                    select(Flight.id).where(Flight.flight_number.in_(chunk))
+                ).scalars()
+                for flight_id in flight_ids:
+                    mark_flight_changed(self.session, flight_id)
+            route_days |= _row_route_days(rows)
+            InventoryDAL(self.session).refresh_route_days(route_days)
+        return affected
+
+    def load_schedule(self, rows: List[dict], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      refresh_inventory: bool = True) -> int:
+        """Insert or update flights keyed on flight_number, recounting their routes' totals.
+
+        A flight that already exists takes the new schedule but keeps the
+        seats it has sold: its available seats move by the change in capacity,
+        down to none when it has sold more than the new capacity.
+        Bulk schedule loads that rebuild the whole inventory once at the end
+        pass refresh_inventory=False.
+        """
+        with UnitOfWork(self.session):
+            route_days = set()
+            if refresh_inventory:
+                route_days = self._stored_route_days(
+                    Flight.flight_number, [row['flight_number'] for row in rows], chunk_size
+                )
+            table = Flight.__table__
+            conn = self.session.connection()
+            stmt = _dialect_insert(conn.dialect.name)(table)
+            # SET expressions see the row as it was before the update
+            available_seats = table.c.available_seats + stmt.excluded.total_seats - table.c.total_seats
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['flight_number'],
+                set_={
+                    'departure_airport_id': stmt.excluded.departure_airport_id,
+                    'arrival_airport_id': stmt.excluded.arrival_airport_id,
+                    'departure_time': stmt.excluded.departure_time,
+                    'arrival_time': stmt.excluded.arrival_time,
+                    'aircraft_type': stmt.excluded.aircraft_type,
+                    'total_seats': stmt.excluded.total_seats,
+                    'available_seats': case((available_seats < 0, 0), else_=available_seats),
+                    'status': stmt.excluded.status,
+                    'base_price': stmt.excluded.base_price,
+                }
+            )
+            affected = 0
+            for chunk in _chunks(rows, chunk_size):
+                # RETURNING gives the IDs of inserted and updated flights alike
+                flight_ids = conn.execute(stmt.returning(table.c.id), list(chunk)).scalars().all()
+                affected += len(flight_ids)
+                # The Core upsert bypasses the ORM's flush events
+                for flight_id in flight_ids:
+                    mark_flight_changed(self.session, flight_id)
+            if refresh_inventory:
+                InventoryDAL(self.session).refresh_route_days(route_days | _row_route_days(rows))
+        return affected
+
+    def _stored_route_days(self, column, keys: Sequence[Any], chunk_size: int) -> Set[RouteDay]:
+        """The routes and days of the stored flights whose column is one of keys."""
+        route_days = set()
+        for chunk in _chunks(list(keys), chunk_size):
+            stmt = select(
+                Flight.departure_airport_id, Flight.arrival_airport_id, Flight.departure_time
+            ).where(column.in_(chunk))
+            route_days.update(
+                (departure_id, arrival_id, departure_time.date())
+                for departure_id, arrival_id, departure_time in self.session.execute(stmt)
+            )
+        return route_days
+
     def get_flights_by_route(self, departure_airport_id: int, arrival_airport_id: int) -> List[Flight]:
         """Get all flights between two airports."""
         return self.filter_by(
@@ -18,17 +131,21 @@ class FlightDAL(BaseDAL[Flight]):
 
     def get_flights_by_date_range(self, start_date: datetime, end_date: datetime) -> List[Flight]:
         """Get all flights within a date range."""
-        stmt = select(Flight).where(
-            and_(
-                Flight.departure_time >= start_date,
-                Flight.departure_time <= end_date
-            )
-        )
+        stmt = self._date_range_query(start_date, end_date)
         return list(self.session.execute(stmt).scalars().all())
 
+    def get_flights_page(self, cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[Flight], Optional[str]]:
+        """Get a page of flights ordered by departure time, with airports loaded."""
+        return self.paginate(
+            cursor=cursor,
+            limit=limit,
+            order_by=('departure_time', 'id'),
+            options=self._airport_options()
+        )
+
     def get_available_flights(self) -> List[Flight]:
         """Get all flights with available seats."""
-        stmt = select(Flight).where(Flight.available_seats > 0)
+        stmt = self._available_query()
         return list(self.session.execute(stmt).scalars().all())
 
     def get_flights_by_status(self, status: FlightStatus) -> List[Flight]:
@@ -37,19 +154,73 @@ class FlightDAL(BaseDAL[Flight]):
 
     def search_flights(self, departure_airport: str, arrival_airport: str, date: datetime) -> List[Flight]:
         """Search flights by departure airport, arrival airport, and date."""
-        stmt = select(Flight).join(
-            Airport, Flight.departure_airport_id == Airport.id
+        stmt = self._search_query(departure_airport, arrival_airport, date)
+        return list(self.session.execute(stmt).scalars().all())
+
+    # Statement builders, shared with AsyncFlightDAL so both run the same SQL
+
+    @staticmethod
+    def _airport_options() -> tuple:
+        """Loader options joining both airports of a flight into its SELECT."""
+        return (joinedload(Flight.departure_airport), joinedload(Flight.arrival_airport))
+
+    @staticmethod
+    def _date_range_query(start_date: datetime, end_date: datetime):
+        return select(Flight).where(
+            and_(
+                Flight.departure_time >= start_date,
+                Flight.departure_time <= end_date
+            )
+        )
+
+    @staticmethod
+    def _available_query():
+        return select(Flight).where(Flight.available_seats > 0)
+
+    @staticmethod
+    def _search_query(departure_airport: str, arrival_airport: str, date: datetime):
+        departure = aliased(Airport)
+        arrival = aliased(Airport)
+        return select(Flight).join(
+            departure, Flight.departure_airport_id == departure.id
         ).join(
-            Airport, Flight.arrival_airport_id == Airport.id
+            arrival, Flight.arrival_airport_id == arrival.id
         ).where(
             and_(
-                Airport.code == departure_airport,
-                Airport.code == arrival_airport,
+                departure.code == departure_airport,
+                arrival.code == arrival_airport,
                 Flight.departure_time >= date,
                 Flight.departure_time < date.replace(hour=23, minute=59, second=59)
             )
+        ).order_by(Flight.departure_time, Flight.id)
+
+    def get_route_fares(self, departure_airport: str, arrival_airport: str,
+                        start: datetime, end: datetime) -> List[dict]:
+        """Get the fare fields of bookable flights on a route departing in [start, end)."""
+        stmt = self._route_fares_query(departure_airport, arrival_airport, start, end)
+        return [dict(row) for row in self.session.execute(stmt).mappings()]
+
+    @staticmethod
+    def _route_fares_query(departure_airport: str, arrival_airport: str, start: datetime, end: datetime):
+        """One range scan over a route's departures, with only the columns fares need."""
+        departure = aliased(Airport)
+        arrival = aliased(Airport)
+        return select(
+            Flight.departure_time, Flight.base_price, Flight.available_seats, Flight.total_seats
+        ).join(
+            departure, Flight.departure_airport_id == departure.id
+        ).join(
+            arrival, Flight.arrival_airport_id == arrival.id
+        ).where(
+            and_(
+                departure.code == departure_airport,
+                arrival.code == arrival_airport,
+                Flight.departure_time >= start,
+                Flight.departure_time < end,
+                Flight.status == FlightStatus.SCHEDULED,
+                Flight.available_seats > 0
+            )
         )
-        return list(self.session.execute(stmt).scalars().all())
 
     def update_flight_status(self, flight_id: int, new_status: FlightStatus) -> Optional[Flight]:
         """Update the status of a flight."""
@@ -57,24 +228,156 @@ class FlightDAL(BaseDAL[Flight]):
 
     def update_available_seats(self, flight_id: int, seats_to_reserve: int) -> Optional[Flight]:
         """Update the number of available seats on a flight."""
-        flight = self.get_by_id(flight_id)
-        if flight and flight.available_seats >= seats_to_reserve:
-            new_available_seats = flight.available_seats - seats_to_reserve
-            return self.update(flight_id, available_seats=new_available_seats)
+        if self.reserve_seats(flight_id, seats_to_reserve):
+            return self.get_by_id(flight_id)
         return None
 
+    def reserve_seats(self, flight_id: int, seats: int = 1) -> bool:
+        """Atomically take seats from a flight if enough are available.
+
+        A single conditional UPDATE does the check and the decrement, so
+        concurrent bookings can never oversell and no row is read into Python
+        first. Returns False when the flight does not exist or is too full.
+        """
+        return self._apply_seat_change(flight_id, self._reserve_seats_stmt(flight_id, seats))
+
+    def release_seats(self, flight_id: int, seats: int = 1) -> bool:
+        """Atomically give seats back to a flight, never above its capacity."""
+        return self._apply_seat_change(flight_id, self._release_seats_stmt(flight_id, seats))
+
+    @staticmethod
+    def _reserve_seats_stmt(flight_id: int, seats: int):
+        return update(Flight).where(
+            Flight.id == flight_id,
+            Flight.available_seats >= seats
+        ).values(available_seats=Flight.available_seats - seats)
+
+    @staticmethod
+    def _release_seats_stmt(flight_id: int, seats: int):
+        return update(Flight).where(
+            Flight.id == flight_id,
+            Flight.available_seats + seats <= Flight.total_seats
+        ).values(available_seats=Flight.available_seats + seats)
+
+    def _apply_seat_change(self, flight_id: int, stmt) -> bool:
+        """Run a conditional seat UPDATE and report whether it matched."""
+        result = self.session.execute(stmt.execution_options(synchronize_session=False))
+        if result.rowcount != 1:
+            return False
+        mark_flight_changed(self.session, flight_id)
+
+        # The UPDATE bypassed the identity map, so reload the count on next access
+        flight = self.session.identity_map.get(identity_key(Flight, flight_id))
+        if flight is not None:
+            self.session.expire(flight, ['available_seats'])
+        self._commit()
+        return True
+
+    def get_seat_map(self, flight_id: int) -> Optional[SeatMap]:
+        """Get a flight's seat occupancy map, building it first if it was never stored."""
+        row = self.session.execute(self._seat_map_query(flight_id)).first()
+        if row is None:
+            return None
+        if row.seat_map is None:
+            return self.rebuild_seat_map(flight_id, only_if_missing=True)
+        return SeatMap(row.seat_map)
+
+    def rebuild_seat_map(self, flight_id: int, only_if_missing: bool = False) -> SeatMap:
+        """Rebuild a flight's seat map from its confirmed bookings and store it.
+
+        With only_if_missing the stored map is left alone if another request
+        built it in the meantime, so a rebuild from an older read can never
+        overwrite seats marked since.
+        """
+        stmt = self._confirmed_seats_query(flight_id)
+        seat_map = SeatMap.from_seats(self.session.execute(stmt).scalars())
+        self._store_seat_map(flight_id, seat_map, only_if_missing)
+        return seat_map
+
+    def set_seat_taken(self, flight_id: int, seat_number: str, taken: bool) -> None:
+        """Mark one seat taken or free in the stored seat map.
+
+        Call after reserve_seats/release_seats in the same transaction: the
+        seat UPDATE holds the flight's write lock, so this read-modify-write
+        cannot interleave with another booking on the flight.
+        """
+        seat_map = self.get_seat_map(flight_id)
+        if seat_map is None:
+            return
+        seat_map.set_taken(seat_number, taken)
+        self._store_seat_map(flight_id, seat_map)
+
+    def _store_seat_map(self, flight_id: int, seat_map: SeatMap, only_if_missing: bool = False) -> None:
+        """Write a seat map to the flight row."""
+        self.session.execute(self._store_seat_map_stmt(flight_id, seat_map, only_if_missing))
+        flight = self.session.identity_map.get(identity_key(Flight, flight_id))
+        if flight is not None:
+            self.session.expire(flight, ['seat_map'])
+        self._commit()
+
+    @staticmethod
+    def _seat_map_query(flight_id: int):
+        return select(Flight.seat_map).where(Flight.id == flight_id)
+
+    @staticmethod
+    def _confirmed_seats_query(flight_id: int):
+        return select(Booking.seat_number).where(
+            Booking.flight_id == flight_id,
+            Booking.booking_status == "confirmed"
+        )
+
+    @staticmethod
+    def _store_seat_map_stmt(flight_id: int, seat_map: SeatMap, only_if_missing: bool = False):
+        stmt = update(Flight).where(Flight.id == flight_id)
+        if only_if_missing:
+            stmt = stmt.where(Flight.seat_map.is_(None))
+        return stmt.values(seat_map=seat_map.to_bytes()).execution_options(synchronize_session=False)
+
     def get_flight_details(self, flight_id: int) -> Optional[dict]:
         """Get detailed information about a flight including airport details."""
         flight = self.get_by_id(flight_id)
         if flight:
-            return {
-                'flight_number': flight.flight_number,
-                'departure_airport': flight.departure_airport.name,
-                'arrival_airport': flight.arrival_airport.name,
-                'departure_time': flight.departure_time,
-                'arrival_time': flight.arrival_time,
-                'status': flight.status.value,
-                'available_seats': flight.available_seats,
-                'base_price': flight.base_price
-            }
-        return None 
\ No newline at end of file
+            return self._format_flight_details(flight)
+        return None
+
+    def get_flight_details_many(self, flight_ids: Sequence[int]) -> List[dict]:
+        """Get detailed information about many flights in a constant number of queries.
+
+        Both airports are joined in the same SELECT. Results follow the order
+        of flight_ids; unknown IDs are skipped.
+        """
+        flights = {}
+        for chunk in _chunks(list(flight_ids), DEFAULT_CHUNK_SIZE):
+            for flight in self.session.execute(self._details_query(chunk)).scalars():
+                flights[flight.id] = flight
+        return [
+            self._format_flight_details(flights[flight_id])
+            for flight_id in flight_ids if flight_id in flights
+        ]
+
+    @staticmethod
+    def _details_query(flight_ids: Sequence[int]):
+        return select(Flight).where(Flight.id.in_(flight_ids)).options(*FlightDAL._airport_options())
+
+    @staticmethod
+    def _format_flight_details(flight: Flight) -> dict:
+        """Build the flight details dict from a flight with its airports."""
+        return {
+            'id': flight.id,
+            'flight_number': flight.flight_number,
+            'departure_airport': flight.departure_airport.name,
+            'arrival_airport': flight.arrival_airport.name,
+            'departure_time': flight.departure_time,
+            'arrival_time': flight.arrival_time,
+            'status': flight.status.value,
+            'available_seats': flight.available_seats,
+            'total_seats': flight.total_seats,
+            'base_price': flight.base_price
+        }
+
+def _row_route_days(rows: Sequence[Dict[str, Any]]) -> Set[RouteDay]:
+    """The routes and days of flight rows to be written."""
+    return {
+        (row['departure_airport_id'], row['arrival_airport_id'], row['departure_time'].date())
+        for row in rows
+    }
@@ -0,0 +1,72 @@
+import logging
+from typing import Callable, List, Optional, Set, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from ..models.database import Flight, BEGIN_IMMEDIATE
+from .base_dal import DEFAULT_CHUNK_SIZE, _chunks
+
+# Session.info keys collecting the IDs of flights changed in the current
+# transaction, and of those committed but not yet announced
+_CHANGED_KEY = "changed_flight_ids"
+_COMMITTED_KEY = "committed_flight_ids"
+
+logger = logging.getLogger(__name__)
+
+_listeners: List[Tuple[Callable[[Engine, Set[int]], None], Optional[Callable[[], None]]]] = []
+
+def on_flights_committed(listener: Callable[[Engine, Set[int]], None],
+                         on_failure: Optional[Callable[[], None]] = None) -> None:
+    """Register a callback run with (engine, flight_ids) after each commit that changed flights.
+
+    The callback runs once the transaction is committed, so it only ever sees
+    durable changes; it must use its own connection from the engine.
+    Callbacks run after the session has returned its connection to the pool,
+    so under load a commit never holds one connection while waiting for another.
+    A bulk write's flights are passed in chunks that fit in an IN list.
+
+    The commit has succeeded by then, so an exception from the callback is
+    logged rather than raised from commit(), and on_failure is called to
+    discard whatever the callback could not bring up to date.
+    """
+    _listeners.append((listener, on_failure))
+
+def mark_flight_changed(session: Session, flight_id: int) -> None:
+    """Record a flight changed outside the ORM, e.g. by a Core UPDATE."""
+    session.info.setdefault(_CHANGED_KEY, set()).add(flight_id)
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_flights(session, flush_context):
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, Flight) and instance.id is not None:
+            mark_flight_changed(session, instance.id)
+
+@event.listens_for(Session, "after_commit")
+def _collect_committed_flights(session):
+    flight_ids = session.info.pop(_CHANGED_KEY, None)
+    if flight_ids:
+        session.info.setdefault(_COMMITTED_KEY, set()).update(flight_ids)
+
+@event.listens_for(Session, "after_transaction_end")
+def _notify_committed_flights(session, transaction):
+    if transaction.parent is not None:
+        return
+    flight_ids = session.info.pop(_COMMITTED_KEY, None)
+    if not flight_ids:
+        return
+    bind = session.get_bind()
+    # Listeners only read, so they must not take the write lock like a write session's engine
+    if bind.get_execution_options().get(BEGIN_IMMEDIATE):
+        bind = bind.execution_options(**{BEGIN_IMMEDIATE: False})
+    for chunk in _chunks(sorted(flight_ids), DEFAULT_CHUNK_SIZE):
+        for listener, on_failure in _listeners:
+            try:
+                listener(bind, set(chunk))
+            except Exception:
+                logger.exception("Flight commit listener %s failed", listener.__qualname__)
+                if on_failure is not None:
+                    on_failure()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_flights(session):
+    session.info.pop(_CHANGED_KEY, None)
@@ -0,0 +1,229 @@
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import select, delete, event, func, case, literal, and_, inspect, Date, Float
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+from datetime import date, datetime, time, timedelta
+from ..models.database import RouteInventory, Flight, Booking, Airport
+from .base_dal import BaseDAL, _dialect_insert
+
+# (departure airport id, arrival airport id, departure date)
+RouteDay = Tuple[int, int, date]
+
+ROUTE_DAY_COLUMNS = ['departure_airport_id', 'arrival_airport_id', 'departure_date']
+# Totals that follow the flights, and those that follow their bookings
+FLIGHT_COLUMNS = ['flights', 'total_seats', 'seats_remaining']
+BOOKING_COLUMNS = ['seats_sold', 'revenue', 'cancellations']
+
+# Flight attributes whose changes move a route and day's totals
+INVENTORY_ATTRIBUTES = ('departure_airport_id', 'arrival_airport_id', 'departure_time',
+                        'total_seats', 'available_seats')
+
+# Revenue is a running float sum; differences below this are rounding, not drift
+REVENUE_TOLERANCE = 0.01
+
+class InventoryDAL(BaseDAL[RouteInventory]):
+    def __init__(self, session: Session):
+        super().__init__(session, RouteInventory)
+
+    def _dialect_name(self) -> str:
+        return self.session.connection().dialect.name
+
+    def record_booking(self, flight_id: int, price: float) -> None:
+        """Count a confirmed booking on the flight's route and day."""
+        self.session.execute(self._booking_delta(self._dialect_name(), flight_id, 1, price, 0))
+
+    def record_cancellation(self, flight_id: int, price: float) -> None:
+        """Move a booking on the flight's route and day from sold to cancelled."""
+        self.session.execute(self._booking_delta(self._dialect_name(), flight_id, -1, -price, 1))
+
+    def refresh_route_days(self, route_days: Iterable[RouteDay]) -> None:
+        """Recount the given routes and days from their flights and bookings.
+
+        Each is a range scan of the route's flights on that day plus their
+        bookings by flight; a route and day left without flights is dropped.
+        """
+        table = RouteInventory.__table__
+        for departure_airport_id, arrival_airport_id, departure_date in sorted(set(route_days)):
+            start = datetime.combine(departure_date, time.min)
+            criteria = (
+                Flight.departure_airport_id == departure_airport_id,
+                Flight.arrival_airport_id == arrival_airport_id,
+                Flight.departure_time >= start,
+                Flight.departure_time < start + timedelta(days=1),
+            )
+            self.session.execute(delete(table).where(
+                table.c.departure_airport_id == departure_airport_id,
+                table.c.arrival_airport_id == arrival_airport_id,
+                table.c.departure_date == departure_date
+            ))
+            self.session.execute(
+                table.insert().from_select(ROUTE_DAY_COLUMNS + FLIGHT_COLUMNS + BOOKING_COLUMNS,
+                                           self._aggregate(criteria))
+            )
+
+    def get_summary(self, start_date: date, end_date: date) -> List[dict]:
+        """Get the totals of every route for departure days in [start_date, end_date]."""
+        stmt = self._summary_query(start_date, end_date)
+        return [self._format_summary(row) for row in self.session.execute(stmt).mappings()]
+
+    def rebuild(self) -> int:
+        """Replace the whole summary with totals aggregated from flights and bookings."""
+        table = RouteInventory.__table__
+        self.session.execute(delete(table))
+        self.session.execute(
+            table.insert().from_select(ROUTE_DAY_COLUMNS + FLIGHT_COLUMNS + BOOKING_COLUMNS, self._aggregate())
+        )
+        self._commit()
+        return self.session.execute(select(func.count()).select_from(table)).scalar()
+
+    def check(self) -> List[str]:
+        """Compare the summary with a full aggregation; returns one line per difference."""
+        columns = FLIGHT_COLUMNS + BOOKING_COLUMNS
+        expected = {
+            tuple(row[:3]): row[3:] for row in self.session.execute(self._aggregate())
+        }
+        stored = {
+            tuple(row[:3]): row[3:] for row in self.session.execute(
+                select(*[RouteInventory.__table__.c[name] for name in ROUTE_DAY_COLUMNS + columns])
+            )
+        }
+
+        problems = []
+        for route_day in sorted(expected.keys() | stored.keys()):
+            # A route and day whose flights were all removed keeps an empty row
+            want = expected.get(route_day, (0, 0, 0, 0, 0.0, 0))
+            have = stored.get(route_day)
+            if have is None:
+                problems.append(f"{route_day}: missing, expected {dict(zip(columns, want))}")
+                continue
+            for name, want_value, have_value in zip(columns, want, have):
+                tolerance = REVENUE_TOLERANCE if name == 'revenue' else 0
+                if abs(want_value - have_value) > tolerance:
+                    problems.append(f"{route_day}: {name} is {have_value}, expected {want_value}")
+        return problems
+
+    @staticmethod
+    def _summary_query(start_date: date, end_date: date):
+        departure = aliased(Airport)
+        arrival = aliased(Airport)
+        return select(
+            departure.code.label('departure_airport'), arrival.code.label('arrival_airport'),
+            *[RouteInventory.__table__.c[name] for name in ['departure_date'] + FLIGHT_COLUMNS + BOOKING_COLUMNS]
+        ).join(
+            departure, RouteInventory.departure_airport_id == departure.id
+        ).join(
+            arrival, RouteInventory.arrival_airport_id == arrival.id
+        ).where(
+            and_(
+                RouteInventory.departure_date >= start_date,
+                RouteInventory.departure_date <= end_date
+            )
+        ).order_by(RouteInventory.departure_date, departure.code, arrival.code)
+
+    @staticmethod
+    def _format_summary(row) -> dict:
+        summary = dict(row)
+        summary['load_factor'] = (
+            summary['seats_sold'] / summary['total_seats'] if summary['total_seats'] else 0.0
+        )
+        return summary
+
+    @staticmethod
+    def _booking_delta(dialect_name: str, flight_id: int, sold: int, revenue: float, cancelled: int):
+        """Add to the booking totals of a flight's route and day in one statement.
+
+        The first booking of a route and day seen without a summary row (after
+        a bulk load, before a rebuild) starts the row from that flight alone.
+        """
+        table = RouteInventory.__table__
+        source = select(
+            Flight.departure_airport_id, Flight.arrival_airport_id,
+            func.date(Flight.departure_time, type_=Date),
+            literal(1), Flight.total_seats, Flight.available_seats,
+            literal(max(sold, 0)), literal(max(revenue, 0.0), Float), literal(cancelled)
+        ).where(Flight.id == flight_id)
+        stmt = _dialect_insert(dialect_name)(table).from_select(
+            ROUTE_DAY_COLUMNS + FLIGHT_COLUMNS + BOOKING_COLUMNS, source
+        )
+        return stmt.on_conflict_do_update(
+            index_elements=ROUTE_DAY_COLUMNS,
+            set_={
+                'seats_sold': table.c.seats_sold + sold,
+                'seats_remaining': table.c.seats_remaining - sold,
+                'revenue': table.c.revenue + revenue,
+                'cancellations': table.c.cancellations + cancelled,
+            }
+        )
+
+    @staticmethod
+    def _aggregate(criteria: Sequence = ()):
+        """Summary rows computed from scratch, in the column order of the table.
+
+        criteria restrict the flights, and the bookings to those flights'.
+        """
+        confirmed = Booking.booking_status == "confirmed"
+        bookings = select(
+            Booking.flight_id,
+            func.sum(case((confirmed, 1), else_=0)).label('sold'),
+            func.sum(case((confirmed, Booking.total_price), else_=0.0)).label('revenue'),
+            func.sum(case((Booking.booking_status == "cancelled", 1), else_=0)).label('cancelled')
+        )
+        if criteria:
+            bookings = bookings.join(Flight, Booking.flight_id == Flight.id).where(*criteria)
+        bookings = bookings.group_by(Booking.flight_id).subquery()
+        departure_date = func.date(Flight.departure_time, type_=Date)
+        return select(
+            Flight.departure_airport_id, Flight.arrival_airport_id, departure_date,
+            func.count(Flight.id), func.sum(Flight.total_seats), func.sum(Flight.available_seats),
+            func.coalesce(func.sum(bookings.c.sold), 0),
+            func.coalesce(func.sum(bookings.c.revenue), 0.0),
+            func.coalesce(func.sum(bookings.c.cancelled), 0)
+        ).outerjoin(
+            bookings, bookings.c.flight_id == Flight.id
+        ).where(
+            *criteria
+        ).group_by(
+            Flight.departure_airport_id, Flight.arrival_airport_id, departure_date
+        )
+
+def _route_day_of(flight: Flight) -> RouteDay:
+    return flight.departure_airport_id, flight.arrival_airport_id, flight.departure_time.date()
+
+def _previous_route_day(flight: Flight) -> Optional[RouteDay]:
+    """The route and day a flight had before its pending changes, if it was stored."""
+    state = inspect(flight)
+    values = []
+    for name in ('departure_airport_id', 'arrival_airport_id', 'departure_time'):
+        history = state.attrs[name].history
+        if history.deleted:
+            values.append(history.deleted[0])
+        elif history.unchanged:
+            values.append(history.unchanged[0])
+        else:
+            return None
+    return values[0], values[1], values[2].date()
+
+@event.listens_for(Session, "after_flush")
+def _refresh_flushed_flights(session, flush_context):
+    """Keep the summary in step with flights written through the ORM, in the same transaction."""
+    route_days: Set[RouteDay] = set()
+    for instance in session.new:
+        if isinstance(instance, Flight):
+            route_days.add(_route_day_of(instance))
+    for instance in session.deleted:
+        if isinstance(instance, Flight):
+            previous = _previous_route_day(instance)
+            if previous is not None:
+                route_days.add(previous)
+    for instance in session.dirty:
+        if not isinstance(instance, Flight):
+            continue
+        state = inspect(instance)
+        if not any(state.attrs[name].history.has_changes() for name in INVENTORY_ATTRIBUTES):
+            continue
+        # A flight moved to another route or day leaves its old one too
+        previous = _previous_route_day(instance)
+        if previous is not None:
+            route_days.add(previous)
+        route_days.add(_route_day_of(instance))
+    if route_days:
+        InventoryDAL(session).refresh_route_days(route_days)
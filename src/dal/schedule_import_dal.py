@@ -0,0 +1,24 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from typing import Dict, Optional
+from ..models.database import ScheduleImport, Airport
+from .base_dal import BaseDAL
+
+class ScheduleImportDAL(BaseDAL[ScheduleImport]):
+    def __init__(self, session: Session):
+        super().__init__(session, ScheduleImport)
+
+    def get_airport_ids(self) -> Dict[str, int]:
+        """Map every airport code to its ID."""
+        return dict(self.session.execute(select(Airport.code, Airport.id)).all())
+
+    def find_resumable(self, source: str, fingerprint: str) -> Optional[ScheduleImport]:
+        """The latest import of this exact file, if it did not finish."""
+        stmt = select(ScheduleImport).where(
+            ScheduleImport.source == source,
+            ScheduleImport.fingerprint == fingerprint
+        ).order_by(ScheduleImport.id.desc()).limit(1)
+        latest = self.session.execute(stmt).scalar_one_or_none()
+        if latest is None or latest.finished_at is not None:
+            return None
+        return latest
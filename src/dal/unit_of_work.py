@@ -0,0 +1,100 @@
+import asyncio
+from typing import Union
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Session.info key holding how many UnitOfWork blocks are currently open
+_DEPTH_KEY = "unit_of_work_depth"
+# Session.info key holding the (lock, timeout) set by queue_writes
+_WRITE_QUEUE_KEY = "unit_of_work_write_queue"
+
+class WriteQueueTimeout(Exception):
+    """An AsyncUnitOfWork waited longer than its session's write queue allows."""
+
+def queue_writes(session: AsyncSession, lock: asyncio.Lock, timeout: float) -> None:
+    """Make the outermost AsyncUnitOfWork on the session hold lock while its transaction is open.
+
+    Sessions sharing the lock then run their units of work one at a time, in
+    the order they asked; waiting longer than timeout seconds raises
+    WriteQueueTimeout.
+    """
+    session.info[_WRITE_QUEUE_KEY] = (lock, timeout)
+
+class UnitOfWork:
+    """Group DAL calls on a session into a single transaction.
+
+    While a unit of work is open, DAL writes only flush; the outermost block
+    commits once on success and rolls back on error. Nested blocks join the
+    enclosing transaction, so a service can open one around a multi-step
+    operation and still run inside a request-wide unit of work.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def __enter__(self) -> "UnitOfWork":
+        self.session.info[_DEPTH_KEY] = self.session.info.get(_DEPTH_KEY, 0) + 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        depth = self.session.info[_DEPTH_KEY] - 1
+        self.session.info[_DEPTH_KEY] = depth
+        if depth:
+            return False
+
+        if exc_type is not None:
+            self.session.rollback()
+            return False
+        try:
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return False
+
+class AsyncUnitOfWork:
+    """UnitOfWork for an AsyncSession, used with async with.
+
+    It shares the depth counter with UnitOfWork, so the async DALs see the
+    same flush-only behaviour inside a block.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def __aenter__(self) -> "AsyncUnitOfWork":
+        depth = self.session.info.get(_DEPTH_KEY, 0)
+        write_queue = self.session.info.get(_WRITE_QUEUE_KEY)
+        if not depth and write_queue is not None:
+            lock, timeout = write_queue
+            try:
+                await asyncio.wait_for(lock.acquire(), timeout)
+            except asyncio.TimeoutError:
+                raise WriteQueueTimeout(f"Waited more than {timeout:g} s for the write queue")
+        self.session.info[_DEPTH_KEY] = depth + 1
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> bool:
+        depth = self.session.info[_DEPTH_KEY] - 1
+        self.session.info[_DEPTH_KEY] = depth
+        if depth:
+            return False
+
+        try:
+            if exc_type is not None:
+                await self.session.rollback()
+                return False
+            try:
+                await self.session.commit()
+            except Exception:
+                await self.session.rollback()
+                raise
+            return False
+        finally:
+            write_queue = self.session.info.get(_WRITE_QUEUE_KEY)
+            if write_queue is not None:
+                write_queue[0].release()
+
+def in_unit_of_work(session: Union[Session, AsyncSession]) -> bool:
+    """Check whether a unit of work is open on the session."""
+    return session.info.get(_DEPTH_KEY, 0) > 0
@@ -3,7 +3,7 @@ from sqlalchemy import select
 from typing import Optional, List
 from ..models.database import User, UserRole
 from .base_dal import BaseDAL
-import hashlib
+from ..password_hashing import password_hasher
 
 class UserDAL(BaseDAL[User]):
     def __init__(self, session: Session):
@@ -11,7 +11,7 @@ class UserDAL(BaseDAL[User]):
 
     def create_user(self, username: str, email: str, password: str, role: UserRole) -> User:
         """Create a new user with hashed password."""
-        password_hash = self._hash_password(password)
+        password_hash = password_hasher.hash_sync(password)
         return self.create(
             username=username,
             email=email,
@@ -20,14 +20,25 @@ class UserDAL(BaseDAL[User]):
         )
 
     def authenticate(self, username: str, password: str) -> Optional[User]:
-        """Authenticate a user by username and password."""
-        password_hash = self._hash_password(password)
-        stmt = select(User).where(
-            User.username == username,
-            User.password_hash == password_hash,
-            User.role == UserRole.ADMIN
-        )
-        return self.session.execute(stmt).scalar_one_or_none()
+        """Authenticate a user by username and password.
+
+        Hashes on the calling thread; async callers should use
+        UserService.authenticate, which verifies on the hashing pool.
+        """
+        user = self.get_login_user(username)
+        if not user:
+            password_hasher.verify_unknown_user_sync(password)
+            return None
+        verified, new_hash = password_hasher.verify_and_update_sync(password, user.password_hash)
+        if not verified:
+            return None
+        if new_hash:
+            self.update(user.id, password_hash=new_hash)
+        return user
+
+    def get_login_user(self, username: str) -> Optional[User]:
+        """Get the user that may log in with a username."""
+        return self.session.execute(self._login_user_query(username)).scalar_one_or_none()
 
     def get_by_username(self, username: str) -> Optional[User]:
         """Get a user by username."""
@@ -39,16 +50,19 @@ class UserDAL(BaseDAL[User]):
         stmt = select(User).where(User.email == email)
         return self.session.execute(stmt).scalar_one_or_none()
 
+    @staticmethod
+    def _login_user_query(username: str):
+        """The user that may log in with a username, shared with AsyncUserDAL."""
+        return select(User).where(
+            User.username == username,
+            User.role == UserRole.ADMIN
+        )
+
     def get_by_role(self, role: UserRole) -> List[User]:
         """Get all users with a specific role."""
         return self.filter_by(role=role)
 
     def update_password(self, user_id: int, new_password: str) -> Optional[User]:
         """Update a user's password."""
-        password_hash = self._hash_password(new_password)
+        password_hash = password_hasher.hash_sync(new_password)
         return self.update(user_id, password_hash=password_hash)
-
-    @staticmethod
-    def _hash_password(password: str) -> str:
-        """Hash a password using SHA-256."""
-        return hashlib.sha256(password.encode()).hexdigest() 
\ No newline at end of file
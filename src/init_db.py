@@ -1,8 +1,19 @@
-from src.models.database import init_db, User, Flight, Airport, Booking, UserRole
+from src.models.database import init_db, snapshot_database, engine, User, Flight, Airport, Booking, UserRole, FlightStatus
+from src.dal.base_dal import BaseDAL
+from src.dal.flight_dal import FlightDAL
 from src.dal.user_dal import UserDAL
+from src.dal.inventory_dal import InventoryDAL
+from src.bll.export_service import ExportService
+from src.bll.schedule_import_service import ScheduleImportService, DEFAULT_IMPORT_CHUNK_SIZE
+from src.utils.export_formats import EXPORT_FORMATS, CSV
+from src.utils.schedule_formats import SCHEDULE_FORMATS
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session, sessionmaker
 from datetime import datetime, timedelta
+from typing import Optional, Set, Tuple
+import argparse
 import os
+import sys
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -11,15 +22,14 @@ load_dotenv()
 def create_sample_data(session: Session):
     """Create sample data for testing."""
     # Create airports
-    airports = [
-        Airport(code="LHR", name="London Heathrow", city="London", country="UK"),
-        Airport(code="JFK", name="John F. Kennedy", city="New York", country="USA"),
-        Airport(code="CDG", name="Charles de Gaulle", city="Paris", country="France"),
-        Airport(code="FRA", name="Frankfurt Airport", city="Frankfurt", country="Germany"),
-        Airport(code="SIN", name="Changi Airport", city="Singapore", country="Singapore")
-    ]
-    session.add_all(airports)
-    session.commit()
+    airport_dal = BaseDAL(session, Airport)
+    lhr, jfk, cdg, fra, sin = airport_dal.bulk_create([
+        dict(code="LHR", name="London Heathrow", city="London", country="UK"),
+        dict(code="JFK", name="John F. Kennedy", city="New York", country="USA"),
+        dict(code="CDG", name="Charles de Gaulle", city="Paris", country="France"),
+        dict(code="FRA", name="Frankfurt Airport", city="Frankfurt", country="Germany"),
+        dict(code="SIN", name="Changi Airport", city="Singapore", country="Singapore")
+    ], return_ids=True)
 
     # Create admin user
     user_dal = UserDAL(session)
@@ -31,49 +41,188 @@ def create_sample_data(session: Session):
     )
 
     # Create sample flights
-    flights = [
-        Flight(
+    flight_dal = FlightDAL(session)
+    flight_dal.bulk_create([
+        dict(
             flight_number="SK101",
-            departure_airport_id=1,  # LHR
-            arrival_airport_id=2,    # JFK
+            departure_airport_id=lhr,
+            arrival_airport_id=jfk,
             departure_time=datetime.now() + timedelta(days=1),
             arrival_time=datetime.now() + timedelta(days=1, hours=8),
             aircraft_type="Boeing 777",
             total_seats=300,
             available_seats=300,
             base_price=500.00,
-            status="scheduled"
+            status=FlightStatus.SCHEDULED
         ),
-        Flight(
+        dict(
             flight_number="SK102",
-            departure_airport_id=2,  # JFK
-            arrival_airport_id=1,    # LHR
+            departure_airport_id=jfk,
+            arrival_airport_id=lhr,
             departure_time=datetime.now() + timedelta(days=2),
             arrival_time=datetime.now() + timedelta(days=2, hours=7),
             aircraft_type="Boeing 787",
             total_seats=250,
             available_seats=250,
             base_price=450.00,
-            status="scheduled"
+            status=FlightStatus.SCHEDULED
         ),
-        Flight(
+        dict(
             flight_number="SK201",
-            departure_airport_id=1,  # LHR
-            arrival_airport_id=3,    # CDG
+            departure_airport_id=lhr,
+            arrival_airport_id=cdg,
             departure_time=datetime.now() + timedelta(days=1, hours=2),
             arrival_time=datetime.now() + timedelta(days=1, hours=3, minutes=30),
             aircraft_type="Airbus A320",
             total_seats=180,
             available_seats=180,
             base_price=150.00,
-            status="scheduled"
+            status=FlightStatus.SCHEDULED
         )
-    ]
-    session.add_all(flights)
-    session.commit()
+    ])
+
+def _schema_names() -> Tuple[Set[str], Set[str], Set[str]]:
+    """Names of the tables, table.columns and indexes in the database."""
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    columns = {f"{table}.{column['name']}" for table in tables for column in inspector.get_columns(table)}
+    indexes = {index['name'] for table in tables for index in inspector.get_indexes(table)}
+    return tables, columns, indexes
+
+def migrate():
+    """Bring an existing database up to the current schema and indexes."""
+    print("Migrating database...")
+    tables, columns, indexes = _schema_names()
+    # init_db() creates missing tables, then runs ensure_columns() and
+    # ensure_indexes() on the ones that existed; compare the schema before
+    # and after, so indexes of new tables are reported too
+    init_db()
+    new_tables, new_columns, new_indexes = _schema_names()
+    created_tables = sorted(new_tables - tables)
+    added = sorted(column for column in new_columns - columns if column.split(".")[0] in tables)
+    created = sorted(new_indexes - indexes)
+    print(f"Created tables: {', '.join(created_tables)}" if created_tables else "Tables up to date.")
+    print(f"Added columns: {', '.join(added)}" if added else "Columns up to date.")
+    print(f"Created indexes: {', '.join(created)}" if created else "Indexes up to date.")
+    if "route_inventory" in created_tables:
+        rebuild_inventory()
+
+def rebuild_inventory():
+    """Recompute the route inventory summary from flights and bookings."""
+    with sessionmaker(bind=engine)() as session:
+        rows = InventoryDAL(session).rebuild()
+    print(f"Rebuilt route inventory: {rows} route days.")
+
+def check_inventory() -> bool:
+    """Compare the route inventory summary with flights and bookings; True when they agree."""
+    with sessionmaker(bind=engine)() as session:
+        problems = InventoryDAL(session).check()
+    for problem in problems:
+        print(problem)
+    print(f"{len(problems)} differences found." if problems else "Route inventory is consistent.")
+    return not problems
+
+def snapshot(path: str):
+    """Write a read-only snapshot of the database for use as the read database."""
+    snapshot_database(engine, path)
+    print(f"Snapshot written to {path}")
+    print(f"Serve reads from it with DATABASE_READ_URL=sqlite:///file:{path}?mode=ro&immutable=1&uri=true")
+
+def export(table: str, export_format: str, output: str, start_date: Optional[datetime] = None,
+           end_date: Optional[datetime] = None):
+    """Write bookings or flights to a file, or to stdout for '-', as they are read."""
+    with sessionmaker(bind=engine)() as session:
+        exports = ExportService(session)
+        export_table = exports.export_bookings if table == "bookings" else exports.export_flights
+        chunks = export_table(export_format, start_date=start_date, end_date=end_date)
+        if output == "-":
+            for data in chunks:
+                sys.stdout.buffer.write(data)
+            sys.stdout.buffer.flush()
+            return
+        with open(output, "wb") as file:
+            for data in chunks:
+                file.write(data)
+    print(f"Exported {table} to {output}", file=sys.stderr)
+
+def import_schedule(path: str, schedule_format: Optional[str] = None,
+                    chunk_size: int = DEFAULT_IMPORT_CHUNK_SIZE, restart: bool = False,
+                    keep_indexes: bool = False):
+    """Load a schedule feed of flights, resuming an earlier import of the same file that failed."""
+    def report(progress: dict):
+        print(f"{progress['records_read']:>10} records  {progress['flights_loaded']:>10} flights  "
+              f"{progress['rejected']:>7} rejected  {progress['rows_per_second']:>8.0f} rows/s", flush=True)
+
+    with sessionmaker(bind=engine)() as session:
+        result = ScheduleImportService(session).import_schedule(
+            path, schedule_format, chunk_size=chunk_size, restart=restart,
+            keep_indexes=keep_indexes, progress=report
+        )
+    if result['resumed_from']:
+        print(f"Resumed after record {result['resumed_from']}.")
+    for reject in result['rejects']:
+        print(f"Rejected record {reject['record']}: {reject['error']}")
+    if result['rejected'] > len(result['rejects']):
+        print(f"... and {result['rejected'] - len(result['rejects'])} more rejected records.")
+    print(f"Imported {result['records_read'] - result['resumed_from']} records in "
+          f"{result['load_seconds']:.1f}s ({result['rows_per_second']:.0f} rows/s): "
+          f"{result['flights_loaded']} flights loaded, {result['rejected']} rejected in total.")
+    if result['indexes_rebuilt']:
+        print(f"Rebuilt indexes {', '.join(result['indexes_rebuilt'])} in {result['index_seconds']:.1f}s.")
+    print(f"Rebuilt route inventory: {result['route_days']} route days in {result['inventory_seconds']:.1f}s.")
 
 def main():
     """Initialize the database and create sample data."""
+    parser = argparse.ArgumentParser(description="AirConnect database tools")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("migrate", help="create missing tables, columns and indexes")
+    snapshot_parser = subparsers.add_parser("snapshot", help="write a read-only copy of the database")
+    snapshot_parser.add_argument("path", help="file to write the snapshot to")
+    subparsers.add_parser("rebuild-inventory", help="recompute the route inventory summary")
+    subparsers.add_parser("check-inventory", help="verify the route inventory summary; exits 1 on differences")
+    export_parser = subparsers.add_parser("export", help="stream bookings or flights to a file")
+    export_parser.add_argument("table", choices=["bookings", "flights"])
+    export_parser.add_argument("--format", choices=EXPORT_FORMATS, default=CSV)
+    export_parser.add_argument("--output", default="-", help="file to write, '-' for stdout")
+    export_parser.add_argument("--start-date", type=datetime.fromisoformat,
+                               help="bookings made or flights departing from this time")
+    export_parser.add_argument("--end-date", type=datetime.fromisoformat, help="and before this time")
+    import_parser = subparsers.add_parser("import-schedule", help="bulk load flights from a schedule file")
+    import_parser.add_argument("path", help="CSV, NDJSON or JSON file of flights with airport codes")
+    import_parser.add_argument("--format", choices=SCHEDULE_FORMATS, help="default: from the file extension")
+    import_parser.add_argument("--chunk-size", type=int, default=DEFAULT_IMPORT_CHUNK_SIZE,
+                               help="records validated and committed together")
+    import_parser.add_argument("--restart", action="store_true",
+                               help="start over instead of resuming an unfinished import of the file")
+    import_parser.add_argument("--keep-indexes", action="store_true",
+                               help="load with the flight indexes in place instead of rebuilding them")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        migrate()
+        return
+    if args.command == "snapshot":
+        snapshot(args.path)
+        return
+    if args.command == "rebuild-inventory":
+        rebuild_inventory()
+        return
+    if args.command == "check-inventory":
+        sys.exit(0 if check_inventory() else 1)
+    if args.command == "export":
+        try:
+            export(args.table, args.format, args.output, args.start_date, args.end_date)
+        except ValueError as e:
+            parser.error(str(e))
+        return
+    if args.command == "import-schedule":
+        init_db()
+        try:
+            import_schedule(args.path, args.format, args.chunk_size, args.restart, args.keep_indexes)
+        except (ValueError, OSError) as e:
+            parser.error(str(e))
+        return
+
     print("Initializing database...")
     engine = init_db()
     
@@ -1,26 +1,44 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Request, Form
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Form, Query
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-from typing import List
+from fastapi.responses import RedirectResponse, StreamingResponse, JSONResponse
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+import asyncio
 import os
 from dotenv import load_dotenv
 
-from app.entities.database import init_db, get_db, User, Flight, Booking
-from app.dto import (
+from src.models.database import (
+    init_db, SessionLocal, AsyncSessionLocal, AsyncReadSessionLocal, AsyncWriteSessionLocal,
+    async_engine, async_read_engine, ENGINE_PROFILES, DATABASE_PROFILE,
+    User, Flight, Booking
+)
+from src.schemas import (
     UserCreate, UserResponse, Token, FlightCreate, FlightResponse,
-    BookingCreate, BookingResponse, FlightSearch, BookingHistory
+    BookingCreate, BookingResponse, FlightSearch, BookingHistory,
+    FlightPage, BookingPage, SeatAvailability, FlightSearchResult,
+    ConnectionSearch, Itinerary, FareCalendarDay, RouteInventorySummary,
+    RollupDimension, BookingRollupRow, ExportFormat
 )
-from app.security import (
+from src.auth import (
     get_current_active_user, create_access_token,
     ACCESS_TOKEN_EXPIRE_MINUTES, get_password_hash, verify_password
 )
-from app.services.flight_service import FlightService
-from app.services.booking_service import BookingService
-from app.repositories.user_dal import UserDAL
+from src.bll.async_flight_service import AsyncFlightService
+from src.bll.async_booking_service import AsyncBookingService
+from src.bll.async_export_service import AsyncExportService
+from src.bll.export_service import check_export_request
+from src.bll.user_service import UserService
+from src.dal.unit_of_work import AsyncUnitOfWork, WriteQueueTimeout, queue_writes
+from src.bll.flight_search_index import flight_search_index, FLIGHT_INDEX_TTL_SECONDS
+from src.bll.connection_search import connection_graph
+from src.utils.export_formats import MEDIA_TYPES, FILE_EXTENSIONS
+from src.bll.search_cache import search_cache
+from src.password_hashing import password_hasher, PASSWORD_HASH_TARGET_MS
+from src.query_stats import QueryStatsMiddleware, endpoint_query_stats
 
 # Load environment variables
 load_dotenv()
@@ -31,21 +49,140 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Statement count and database time of every request, in X-DB-* headers and per endpoint
+app.add_middleware(QueryStatsMiddleware)
+
+# Seconds a client is told to wait before retrying a request that found the database locked
+LOCKED_RETRY_AFTER_SECONDS = 1
+
+# Seconds a write request waits for its turn, as long as SQLite waits for its write lock
+WRITE_QUEUE_TIMEOUT_SECONDS = ENGINE_PROFILES[DATABASE_PROFILE]["pragmas"]["busy_timeout"] / 1000
+
+def _database_busy_response() -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "The database is busy, please retry"},
+        headers={"Retry-After": str(LOCKED_RETRY_AFTER_SECONDS)}
+    )
+
+@app.exception_handler(OperationalError)
+async def database_locked_handler(request: Request, exc: OperationalError):
+    """Answer 503 when SQLite's write lock was not free within busy_timeout; other errors stay 500s."""
+    if "database is locked" not in str(exc.orig):
+        raise exc
+    return _database_busy_response()
+
+@app.exception_handler(WriteQueueTimeout)
+async def write_queue_timeout_handler(request: Request, exc: WriteQueueTimeout):
+    """Answer 503 when a write waited longer than busy_timeout for its turn in this process."""
+    return _database_busy_response()
+
 # Initialize database
 init_db()
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Largest page the listing endpoints will return
+MAX_PAGE_SIZE = 500
+
 # Templates
-templates = Jinja2Templates(directory="app/templates")
+templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "templates"))
 
 # Static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+app.mount("/static", StaticFiles(directory=os.path.join(BASE_DIR, "static")), name="static")
 
-def get_db():
-    db = SessionLocal()
-    try:
+@app.on_event("startup")
+def calibrate_password_hashing():
+    """Tune the bcrypt cost to the target login latency, when one is configured."""
+    if PASSWORD_HASH_TARGET_MS and not os.getenv("PASSWORD_HASH_ROUNDS"):
+        password_hasher.calibrate(float(PASSWORD_HASH_TARGET_MS))
+
+@app.on_event("startup")
+def load_flight_search_index():
+    """Load upcoming flights into the in-memory search index."""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    with SessionLocal() as db:
+        flight_search_index.load(db.connection(), since=today)
+
+async def _reload_flight_indexes():
+    """Reload the search index and connection graph every FLIGHT_INDEX_TTL_SECONDS, off the event loop."""
+    while True:
+        await asyncio.sleep(FLIGHT_INDEX_TTL_SECONDS)
+        await asyncio.to_thread(load_flight_search_index)
+        await asyncio.to_thread(load_connection_graph)
+
+@app.on_event("startup")
+async def start_flight_index_reloads():
+    """Pick up flights changed by other processes, which this one's commits never announce.
+
+    Reloads also drop the flights that departed before today.
+    """
+    if FLIGHT_INDEX_TTL_SECONDS > 0:
+        app.state.flight_index_reloads = asyncio.create_task(_reload_flight_indexes())
+
+@app.on_event("shutdown")
+async def stop_flight_index_reloads():
+    """Stop the periodic search index and connection graph reloads."""
+    reloads = getattr(app.state, "flight_index_reloads", None)
+    if reloads is not None:
+        reloads.cancel()
+
+@app.on_event("startup")
+async def create_write_queue():
+    """Create the lock that lines up this process's write requests, on the serving event loop."""
+    app.state.write_queue = asyncio.Lock()
+
+@app.on_event("startup")
+def load_connection_graph():
+    """Load upcoming bookable flights into the connection search graph."""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    with SessionLocal() as db:
+        connection_graph.load(db.connection(), since=today)
+
+@app.on_event("shutdown")
+async def dispose_async_engines():
+    """Close the pooled async connections, whose aiosqlite threads would keep the process alive."""
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+
+async def get_db():
+    """Request-scoped async session; the request is one unit of work.
+
+    DAL writes made while handling the request only flush, and the whole
+    request commits once when the handler returns (or rolls back if it raises).
+    Every query is awaited, so other requests run while one waits on the database.
+    """
+    async with AsyncSessionLocal() as db:
+        async with AsyncUnitOfWork(db):
+            yield db
+
+async def get_write_db(request: Request, current_user: User = Depends(get_current_active_user)):
+    """Request-scoped async session for handlers whose point is to write, such as booking.
+
+    Its transactions take SQLite's write lock with their first statement, so
+    they never fail moving from reading to writing. SQLite's busy wait for
+    that lock polls and is not first come, first served, so the services'
+    units of work on these sessions also wait their turn on
+    app.state.write_queue, holding it only until they commit. It depends on
+    the user, so unauthenticated requests are turned away before touching it.
+    There is no request-wide unit of work: the service's own one commits as
+    soon as the write is done, and the handler reads its response through get_db.
+    """
+    async with AsyncWriteSessionLocal() as db:
+        queue_writes(db, request.app.state.write_queue, WRITE_QUEUE_TIMEOUT_SECONDS)
+        yield db
+
+async def get_read_db():
+    """Request-scoped async session on the read database, for read-only handlers.
+
+    Search and listing routes take this instead of get_db so their queries
+    run on the read engine (DATABASE_READ_URL) and its own connection pool,
+    away from booking writes. Anything that writes, or must see its own
+    writes (such as a new booking's details), stays on get_db.
+    """
+    async with AsyncReadSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 # Web Routes
 @app.get("/")
@@ -61,10 +198,10 @@ async def login_user(
     request: Request,
     username: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user_repo = UserDAL(db)
-    user = user_repo.authenticate(username, password)
+    user_manager = UserService(db)
+    user = await user_manager.authenticate(username, password)
     if not user:
         return templates.TemplateResponse(
             "login.html",
@@ -79,11 +216,11 @@ async def login_user(
 @app.get("/flights")
 async def flights_page(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    flight_manager = FlightService(db)
-    available_flights = flight_manager.get_all_flights()
+    flight_manager = AsyncFlightService(db)
+    available_flights = (await flight_manager.get_all_flights())['items']
     return templates.TemplateResponse(
         "flights.html",
         {"request": request, "flights": available_flights, "user": current_user}
@@ -95,12 +232,12 @@ async def search_flights_web(
     departure_airport: str = Form(...),
     arrival_airport: str = Form(...),
     date: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    flight_manager = FlightService(db)
+    flight_manager = AsyncFlightService(db)
     search_date = datetime.strptime(date, "%Y-%m-%d")
-    available_flights = flight_manager.search_available_flights(
+    available_flights = await flight_manager.search_available_flights(
         departure_airport,
         arrival_airport,
         search_date
@@ -118,10 +255,10 @@ async def register_page(request: Request):
 @app.post("/token", response_model=Token)
 async def get_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user_repo = UserDAL(db)
-    user = user_repo.authenticate(form_data.username, form_data.password)
+    user_manager = UserService(db)
+    user = await user_manager.authenticate(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -135,98 +272,279 @@ async def get_access_token(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.post("/api/users/", response_model=UserResponse)
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    user_repo = UserDAL(db)
-    existing_user = user_repo.get_by_username(user.username)
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Username already registered")
-    return user_repo.create_user(
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    user_manager = UserService(db)
+    created_user = await user_manager.register_user(
         username=user.username,
         email=user.email,
         password=user.password,
         role=user.role
     )
+    if not created_user:
+        raise HTTPException(status_code=400, detail="Username already registered")
+    return created_user
 
-@app.get("/api/flights/", response_model=List[FlightResponse])
+def _check_page_size(limit: int) -> None:
+    """Reject page sizes outside the allowed range."""
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+@app.get("/api/flights/", response_model=FlightPage)
 async def get_flights(
-    skip: int = 0,
+    cursor: Optional[str] = None,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    flight_manager = FlightService(db)
-    return flight_manager.get_all_flights(skip=skip, limit=limit)
+    _check_page_size(limit)
+    flight_manager = AsyncFlightService(db)
+    try:
+        return await flight_manager.get_all_flights(cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@app.post("/api/flights/search", response_model=List[FlightResponse])
+@app.post("/api/flights/search", response_model=List[FlightSearchResult])
 async def search_flights(
     search: FlightSearch,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    flight_manager = FlightService(db)
-    return flight_manager.search_available_flights(
+    flight_manager = AsyncFlightService(db)
+    return await flight_manager.search_available_flights(
         search.departure_airport,
         search.arrival_airport,
         search.date
     )
 
+@app.get("/api/flights/calendar", response_model=List[FareCalendarDay])
+async def get_fare_calendar(
+    departure_airport: str,
+    arrival_airport: str,
+    date: Optional[datetime] = None,
+    days: int = 3,
+    month: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    flight_manager = AsyncFlightService(db)
+    try:
+        return await flight_manager.get_fare_calendar(
+            departure_airport, arrival_airport, date=date, days=days, month=month
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/flights/connections", response_model=List[Itinerary])
+async def search_connections(
+    search: ConnectionSearch,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    flight_manager = AsyncFlightService(db)
+    try:
+        return await flight_manager.search_connections(
+            search.departure_airport,
+            search.arrival_airport,
+            search.date,
+            max_stops=search.max_stops,
+            min_connection_minutes=search.min_connection_minutes,
+            max_connection_minutes=search.max_connection_minutes,
+            objective=search.objective.value,
+            limit=search.limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/flights/{flight_id}/seats", response_model=SeatAvailability)
+async def get_flight_seats(
+    flight_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    flight_manager = AsyncFlightService(db)
+    seats = await flight_manager.get_seat_availability(flight_id)
+    if not seats:
+        raise HTTPException(status_code=404, detail="Flight not found")
+    return seats
+
 @app.post("/api/flights/", response_model=FlightResponse)
 async def create_flight(
     flight: FlightCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
     current_user: User = Depends(get_current_active_user)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to create flights")
-    flight_manager = FlightService(db)
-    return flight_manager.create_flight(flight)
+    flight_manager = AsyncFlightService(db)
+    return await flight_manager.create_flight(flight)
 
 @app.post("/api/bookings/", response_model=BookingResponse)
 async def create_booking(
     booking: BookingCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
+    read_db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    booking_manager = BookingService(db)
-    return booking_manager.create_booking(
+    booking_manager = AsyncBookingService(db)
+    result = await booking_manager.create_booking(
         user_id=current_user.id,
         flight_id=booking.flight_id,
         seat_number=booking.seat_number
     )
+    if not result:
+        raise HTTPException(status_code=400, detail="Flight or seat is not available")
+    # The service returns booking details; the response carries the booking and its flight,
+    # read after the booking committed and released the write lock
+    return await AsyncBookingService(read_db).get_booking(result['booking_id'])
 
-@app.get("/api/bookings/", response_model=List[BookingResponse])
+@app.get("/api/bookings/", response_model=BookingPage)
 async def get_user_bookings(
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    booking_manager = BookingService(db)
-    return booking_manager.get_user_bookings(current_user.id)
+    _check_page_size(limit)
+    booking_manager = AsyncBookingService(db)
+    try:
+        return await booking_manager.get_user_bookings_page(current_user.id, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/bookings/{booking_id}/cancel", response_model=BookingResponse)
 async def cancel_booking(
     booking_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
+    read_db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    booking_manager = BookingService(db)
-    result = booking_manager.cancel_booking(booking_id, current_user.id)
+    booking_manager = AsyncBookingService(db)
+    result = await booking_manager.cancel_booking(booking_id, current_user.id)
     if not result:
         raise HTTPException(status_code=404, detail="Booking not found or cannot be cancelled")
-    return result
+    return await AsyncBookingService(read_db).get_booking(booking_id)
 
-@app.post("/api/bookings/history", response_model=List[BookingResponse])
+@app.post("/api/bookings/history", response_model=BookingPage)
 async def get_booking_history(
     history: BookingHistory,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    _check_page_size(limit)
+    booking_manager = AsyncBookingService(db)
+    try:
+        return await booking_manager.get_user_bookings_page(
+            current_user.id,
+            cursor=cursor,
+            limit=limit,
+            start_date=history.start_date,
+            end_date=history.end_date
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/admin/inventory", response_model=List[RouteInventorySummary])
+async def get_inventory_summary(
+    start_date: date,
+    end_date: date,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    if current_user.role not in ("admin", "staff"):
+        raise HTTPException(status_code=403, detail="Not authorized to view inventory")
+    flight_manager = AsyncFlightService(db)
+    try:
+        return await flight_manager.get_inventory_summary(start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/admin/analytics/bookings", response_model=List[BookingRollupRow])
+async def get_booking_rollup(
+    group_by: List[RollupDimension] = Query([RollupDimension.ROUTE, RollupDimension.DAY]),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    booking_manager = BookingService(db)
-    return booking_manager.get_booking_history(
-        current_user.id,
-        history.start_date,
-        history.end_date
+    if current_user.role not in ("admin", "staff"):
+        raise HTTPException(status_code=403, detail="Not authorized to view analytics")
+    booking_manager = AsyncBookingService(db)
+    try:
+        return await booking_manager.get_booking_rollup(
+            [dimension.value for dimension in group_by], start_date=start_date, end_date=end_date
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _streamed_export(name: str, export_format: str, export) -> StreamingResponse:
+    """Stream export(service) from a read session of its own.
+
+    The request's session is closed before a streamed body is sent, so the
+    export opens one that lives as long as the stream.
+    """
+    async def body():
+        async with AsyncReadSessionLocal() as db:
+            async for data in export(AsyncExportService(db)):
+                yield data
+    return StreamingResponse(
+        body(), media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{FILE_EXTENSIONS[export_format]}"'}
+    )
+
+@app.get("/api/admin/export/bookings")
+async def export_bookings(
+    format: ExportFormat = ExportFormat.CSV,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    if current_user.role not in ("admin", "staff"):
+        raise HTTPException(status_code=403, detail="Not authorized to export bookings")
+    try:
+        check_export_request(format.value, start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _streamed_export(
+        "bookings", format.value,
+        lambda exports: exports.export_bookings(format.value, start_date=start_date, end_date=end_date)
     )
 
+@app.get("/api/admin/export/flights")
+async def export_flights(
+    format: ExportFormat = ExportFormat.CSV,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    if current_user.role not in ("admin", "staff"):
+        raise HTTPException(status_code=403, detail="Not authorized to export flights")
+    try:
+        check_export_request(format.value, start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _streamed_export(
+        "flights", format.value,
+        lambda exports: exports.export_flights(format.value, start_date=start_date, end_date=end_date)
+    )
+
+@app.get("/api/admin/search-cache")
+async def get_search_cache_stats(
+    current_user: User = Depends(get_current_active_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to view cache statistics")
+    return search_cache.stats()
+
+@app.get("/api/admin/query-stats")
+async def get_query_stats(
+    current_user: User = Depends(get_current_active_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to view query statistics")
+    return endpoint_query_stats.stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
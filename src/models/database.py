@@ -1,8 +1,12 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Enum
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, Date, DateTime, ForeignKey, Boolean, Enum, Index, LargeBinary, inspect, text, true
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 import enum
 from datetime import datetime
+from typing import List
 import os
 from dotenv import load_dotenv
 
@@ -11,19 +15,165 @@ load_dotenv()
 
 Base = declarative_base()
 
-# Get database URL from environment variable or use default
+# Get database URL and engine profile from environment variables or use defaults
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///airline.db")
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "dev")
+
+# Named engine profiles: per-connection SQLite PRAGMAs plus pool sizing.
+# cache_size is negative so SQLite reads it as KiB rather than pages.
+ENGINE_PROFILES = {
+    "dev": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            "mmap_size": 0,
+            "cache_size": -16000,
+            "temp_store": "MEMORY",
+        },
+        "pool_size": 5,
+        "max_overflow": 10,
+    },
+    "prod-read-heavy": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 15000,
+            "mmap_size": 268435456,
+            "cache_size": -64000,
+            "temp_store": "MEMORY",
+        },
+        "pool_size": 20,
+        "max_overflow": 20,
+    },
+    "bulk-load": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "OFF",
+            "busy_timeout": 60000,
+            "mmap_size": 268435456,
+            "cache_size": -262144,
+            "temp_store": "MEMORY",
+        },
+        "pool_size": 1,
+        "max_overflow": 0,
+    },
+}
+
+def _apply_pragmas(engine: Engine, pragmas: dict) -> None:
+    """Run the given PRAGMAs on every new DBAPI connection of the engine."""
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+# Execution option of write sessions. A SQLite transaction that reads and
+# then writes has to upgrade its read snapshot to the write lock, and fails
+# at once with "database is locked" if another writer committed meanwhile.
+# BEGIN IMMEDIATE takes the write lock up front, waiting up to busy_timeout.
+BEGIN_IMMEDIATE = "begin_immediate"
+
+def _begin_immediate_when_asked(engine: Engine) -> None:
+    """Open transactions with BEGIN IMMEDIATE on connections with the BEGIN_IMMEDIATE option."""
+    @event.listens_for(engine, "begin")
+    def _begin_immediate(conn):
+        if conn.get_execution_options().get(BEGIN_IMMEDIATE):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+def create_db_engine(url: str = DATABASE_URL, profile: str = DATABASE_PROFILE) -> Engine:
+    """Create an engine configured with the given named profile."""
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown database profile: {profile}")
+    settings = ENGINE_PROFILES[profile]
+
+    if not url.startswith("sqlite"):
+        return create_engine(
+            url,
+            pool_size=settings["pool_size"],
+            max_overflow=settings["max_overflow"]
+        )
+
+    # In-memory databases use a per-thread pool that takes no size limits
+    is_memory = url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+    pool_args = {} if is_memory else {
+        "pool_size": settings["pool_size"],
+        "max_overflow": settings["max_overflow"],
+    }
+    engine = create_engine(url, connect_args={"check_same_thread": False}, **pool_args)
+    _apply_pragmas(engine, settings["pragmas"])
+    _begin_immediate_when_asked(engine)
+    return engine
+
+# asyncio drivers for the sync URL schemes the app supports
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
+
+def to_async_url(url: str) -> str:
+    """Switch a database URL to the asyncio driver for its backend."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+def create_async_db_engine(url: str = DATABASE_URL, profile: str = DATABASE_PROFILE) -> AsyncEngine:
+    """Create an asyncio engine for the same database, with the given named profile."""
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown database profile: {profile}")
+    settings = ENGINE_PROFILES[profile]
+
+    url = to_async_url(url)
+    is_memory = make_url(url).database in (None, "", ":memory:") or "mode=memory" in url
+    # aiosqlite defaults to NullPool for files; pool connections as the sync engine does
+    pool_args = {} if is_memory else {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": settings["pool_size"],
+        "max_overflow": settings["max_overflow"],
+    }
+    async_engine = create_async_engine(url, **pool_args)
+    if url.startswith("sqlite"):
+        _apply_pragmas(async_engine.sync_engine, settings["pragmas"])
+        _begin_immediate_when_asked(async_engine.sync_engine)
+    return async_engine
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-class FlightStatus(enum.Enum):
+# Async sessions for the API; instances stay usable after commit, since an
+# expired attribute cannot be lazily reloaded outside an await
+async_engine = create_async_db_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+# For requests that write: the transaction holds the write lock from its first statement
+AsyncWriteSessionLocal = async_sessionmaker(
+    async_engine.execution_options(**{BEGIN_IMMEDIATE: True}), autoflush=False, expire_on_commit=False
+)
+
+# Search and listing reads can go to their own database: a replica file, or a
+# read-only snapshot such as sqlite:///file:snapshot.db?mode=ro&immutable=1&uri=true.
+# Without one they share the primary engines. Writes always use the primary.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+if DATABASE_READ_URL:
+    read_engine = create_db_engine(DATABASE_READ_URL)
+    async_read_engine = create_async_db_engine(DATABASE_READ_URL)
+else:
+    read_engine, async_read_engine = engine, async_engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+class FlightStatus(str, enum.Enum):
     SCHEDULED = "scheduled"
     DELAYED = "delayed"
     CANCELLED = "cancelled"
     COMPLETED = "completed"
     BOARDING = "boarding"
 
-class UserRole(enum.Enum):
+class UserRole(str, enum.Enum):
     ADMIN = "admin"
     STAFF = "staff"
     CUSTOMER = "customer"
@@ -36,6 +186,7 @@ class User(Base):
     email = Column(String(100), unique=True, nullable=False)
     password_hash = Column(String(256), nullable=False)
     role = Column(Enum(UserRole), nullable=False)
+    is_active = Column(Boolean, nullable=False, default=True, server_default=true())
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -69,6 +220,14 @@ class Flight(Base):
     available_seats = Column(Integer, nullable=False)
     status = Column(Enum(FlightStatus), nullable=False)
     base_price = Column(Float, nullable=False)
+    # Seat occupancy bitmap (see utils.seat_map); NULL until first built
+    seat_map = Column(LargeBinary, nullable=True)
+
+    __table_args__ = (
+        # Route search: equality on both airports, range on departure time
+        Index('ix_flights_route_departure', 'departure_airport_id', 'arrival_airport_id', 'departure_time'),
+        Index('ix_flights_departure_time', 'departure_time'),
+    )
     
     # Relationships
     departure_airport = relationship("Airport", foreign_keys=[departure_airport_id], back_populates="departure_flights")
@@ -86,11 +245,77 @@ class Booking(Base):
     seat_number = Column(String(10), nullable=False)
     booking_status = Column(String(20), nullable=False)
     total_price = Column(Float, nullable=False)
+    # Order in which bookings were cancelled, for incremental analytics refresh
+    cancellation_seq = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        # Seat-taken checks and per-flight listings
+        Index('ix_bookings_flight_seat_status', 'flight_id', 'seat_number', 'booking_status'),
+        # Per-user listings ordered or filtered by booking date
+        Index('ix_bookings_user_date', 'user_id', 'booking_date'),
+        Index('ix_bookings_booking_date', 'booking_date'),
+        Index('ix_bookings_cancellation_seq', 'cancellation_seq'),
+        # A seat can hold at most one confirmed booking per flight
+        Index(
+            'uq_bookings_confirmed_seat', 'flight_id', 'seat_number',
+            unique=True,
+            sqlite_where=text("booking_status = 'confirmed'"),
+            postgresql_where=text("booking_status = 'confirmed'")
+        ),
+    )
     
     # Relationships
     user = relationship("User", back_populates="bookings")
     flight = relationship("Flight", back_populates="bookings")
 
+class RouteInventory(Base):
+    """Seats and bookings summed per route and departure day.
+
+    Booking counts and revenue are updated in the booking's transaction and
+    the flight totals whenever flights on the route and day change, so route
+    or day level views read one row per route instead of every booking.
+    """
+    __tablename__ = 'route_inventory'
+
+    id = Column(Integer, primary_key=True)
+    departure_airport_id = Column(Integer, ForeignKey('airports.id'), nullable=False)
+    arrival_airport_id = Column(Integer, ForeignKey('airports.id'), nullable=False)
+    departure_date = Column(Date, nullable=False)
+    flights = Column(Integer, nullable=False, default=0)
+    total_seats = Column(Integer, nullable=False, default=0)
+    seats_remaining = Column(Integer, nullable=False, default=0)
+    seats_sold = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    cancellations = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # One row per route and day, also the conflict target of the upserts
+        Index('uq_route_inventory_route_date', 'departure_airport_id', 'arrival_airport_id',
+              'departure_date', unique=True),
+        Index('ix_route_inventory_departure_date', 'departure_date'),
+    )
+
+class ScheduleImport(Base):
+    """Progress of a schedule file import, committed with every chunk it loads.
+
+    A failed import resumes after records_read records of the same file,
+    recognised by its path, size and modification time.
+    """
+    __tablename__ = 'schedule_imports'
+
+    id = Column(Integer, primary_key=True)
+    source = Column(String(500), nullable=False)
+    fingerprint = Column(String(100), nullable=False)
+    records_read = Column(Integer, nullable=False, default=0)
+    flights_loaded = Column(Integer, nullable=False, default=0)
+    rejected = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_schedule_imports_source', 'source', 'fingerprint'),
+    )
+
 class CrewAssignment(Base):
     __tablename__ = 'crew_assignments'
     
@@ -107,8 +332,88 @@ class CrewAssignment(Base):
 def init_db():
     """Initialize the database with all tables."""
     Base.metadata.create_all(engine)
+    ensure_columns(engine)
+    ensure_indexes(engine)
     return engine
 
+def ensure_columns(bind: Engine) -> List[str]:
+    """Add model columns missing from existing tables.
+
+    Only columns that are nullable or have a server default can be added to
+    tables that already hold rows. Returns the added columns as table.column names.
+    """
+    added = []
+    inspector = inspect(bind)
+    existing_tables = inspector.get_table_names()
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not (column.nullable or column.server_default is not None):
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=bind.dialect)}"
+            if column.server_default is not None:
+                default = column.server_default.arg
+                if isinstance(default, str):
+                    default = f"'{default}'"
+                else:
+                    default = default.compile(dialect=bind.dialect)
+                ddl += f" NOT NULL DEFAULT {default}" if not column.nullable else f" DEFAULT {default}"
+            with bind.begin() as conn:
+                conn.exec_driver_sql(ddl)
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+def ensure_indexes(bind: Engine) -> List[str]:
+    """Create any model indexes missing from an existing database.
+
+    create_all() skips tables that already exist, so databases created before
+    an index was declared need this to pick it up. Returns the created names.
+    """
+    created = []
+    inspector = inspect(bind)
+    existing_tables = inspector.get_table_names()
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind)
+                created.append(index.name)
+    if created and bind.dialect.name == "sqlite":
+        # Refresh planner statistics so the new indexes are chosen
+        with bind.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+    return created
+
+def drop_indexes(bind: Engine, table) -> List[str]:
+    """Drop a table's non-unique model indexes, e.g. around a bulk load.
+
+    Unique indexes are kept since they enforce constraints and serve as
+    conflict targets; ensure_indexes() recreates the dropped ones. Returns
+    the dropped names.
+    """
+    existing = {index['name'] for index in inspect(bind).get_indexes(table.name)}
+    dropped = []
+    for index in table.indexes:
+        if not index.unique and index.name in existing:
+            index.drop(bind)
+            dropped.append(index.name)
+    return dropped
+
+def snapshot_database(bind: Engine, path: str) -> None:
+    """Write a consistent, self-contained copy of a SQLite database to path.
+
+    The copy has no WAL file, so it can be opened read-only and immutable as a
+    read database (see DATABASE_READ_URL).
+    """
+    if bind.dialect.name != "sqlite":
+        raise ValueError("Snapshots are only supported for SQLite databases")
+    with bind.connect() as conn:
+        conn.exec_driver_sql("VACUUM INTO ?", (path,))
+
 def get_db():
     """Get database session."""
     db = SessionLocal()
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+
+# bcrypt cost bounds; each extra round doubles the hashing time
+MIN_ROUNDS = 10
+MAX_ROUNDS = 15
+DEFAULT_ROUNDS = 12
+
+def build_context(rounds: int) -> CryptContext:
+    """bcrypt for new hashes; unsalted SHA-256 hex is still verified but marked for upgrade."""
+    return CryptContext(
+        schemes=["bcrypt", "hex_sha256"],
+        deprecated=["hex_sha256"],
+        bcrypt__rounds=rounds
+    )
+
+def calibrate_rounds(target_ms: float, min_rounds: int = MIN_ROUNDS, max_rounds: int = MAX_ROUNDS) -> int:
+    """Pick the highest bcrypt cost whose hash time stays within target_ms on this machine."""
+    started = time.perf_counter()
+    build_context(min_rounds).hash("calibration-password")
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    rounds = min_rounds
+    while rounds < max_rounds and elapsed_ms * 2 <= target_ms:
+        rounds += 1
+        elapsed_ms *= 2
+    return rounds
+
+class PasswordHasher:
+    """Password hashing service running bcrypt on a bounded worker pool.
+
+    bcrypt releases the GIL, so the async methods hash and verify on worker
+    threads without blocking the event loop, and at most max_workers hashes
+    run at once. verify_and_update also returns a replacement hash when the
+    stored one is a legacy SHA-256 digest or uses a different bcrypt cost.
+    verify_unknown_user spends the same time on a login for a username that
+    does not exist, so response times do not reveal which ones do.
+    """
+
+    def __init__(self, rounds: int = DEFAULT_ROUNDS, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+        self.set_rounds(rounds)
+
+    def set_rounds(self, rounds: int) -> None:
+        """Change the bcrypt cost for new hashes; older hashes are upgraded on login."""
+        self.rounds = max(MIN_ROUNDS, min(MAX_ROUNDS, rounds))
+        self.context = build_context(self.rounds)
+        # Hashed on first use, at the cost of the hashes it stands in for
+        self._dummy_hash: Optional[str] = None
+
+    def calibrate(self, target_ms: float) -> int:
+        """Set the bcrypt cost from a target hash latency and return it."""
+        self.set_rounds(calibrate_rounds(target_ms))
+        return self.rounds
+
+    def hash_sync(self, password: str) -> str:
+        return self.context.hash(password)
+
+    def verify_and_update_sync(self, password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        """Check a password; also return a new hash if the stored one needs upgrading."""
+        try:
+            return self.context.verify_and_update(password, password_hash)
+        except ValueError:
+            # Unrecognized hash format
+            return False, None
+
+    def verify_unknown_user_sync(self, password: str) -> None:
+        """Verify a password against a dummy hash, as a login for an existing user would."""
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash_sync("unknown-user-password")
+        self.context.verify(password, self._dummy_hash)
+
+    async def hash(self, password: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.hash_sync, password)
+
+    async def verify_and_update(self, password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.verify_and_update_sync, password, password_hash)
+
+    async def verify_unknown_user(self, password: str) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.verify_unknown_user_sync, password)
+
+# Shared hasher; PASSWORD_HASH_ROUNDS fixes the cost, otherwise it can be
+# calibrated at startup from PASSWORD_HASH_TARGET_MS
+password_hasher = PasswordHasher(
+    rounds=int(os.getenv("PASSWORD_HASH_ROUNDS", str(DEFAULT_ROUNDS))),
+    max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or None
+)
+PASSWORD_HASH_TARGET_MS = os.getenv("PASSWORD_HASH_TARGET_MS")
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from threading import RLock
+from typing import Any, Hashable, NamedTuple, Optional, Tuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from .models.database import User, UserRole
+
+# Session.info key collecting usernames changed in the current transaction
+_CHANGED_USERS_KEY = "changed_usernames"
+
+class AuthenticatedUser(NamedTuple):
+    """Immutable snapshot of the user behind a request, safe to share between requests."""
+    id: int
+    username: str
+    email: str
+    role: UserRole
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "AuthenticatedUser":
+        return cls(user.id, user.username, user.email, user.role, user.is_active)
+
+class ExpiringLRU:
+    """Thread-safe LRU map whose entries each carry a wall-clock expiry."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = RLock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any, expires_at: float, generation: Optional[int] = None) -> None:
+        """Store a value; skipped if an invalidation happened since generation was read."""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+# Verified tokens (by SHA-256 of the token) -> username, expiring with the token's exp
+token_cache = ExpiringLRU(int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")))
+# Username -> AuthenticatedUser; the TTL bounds staleness from changes made by other processes
+user_cache = ExpiringLRU(int(os.getenv("AUTH_USER_CACHE_SIZE", "10000")))
+USER_CACHE_TTL_SECONDS = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "300"))
+
+def token_key(token: str) -> str:
+    """Cache key for a token, so raw tokens are never held as keys."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def invalidate_user(username: str) -> None:
+    """Drop a cached user so the next request reloads it from the database."""
+    user_cache.invalidate(username)
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    for instance in list(session.dirty) + list(session.deleted):
+        if isinstance(instance, User):
+            # A renamed user must also drop the entry cached under the old name
+            history = inspect(instance).attrs.username.history
+            usernames = {instance.username, *(history.deleted or ())}
+            session.info.setdefault(_CHANGED_USERS_KEY, set()).update(usernames)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for username in session.info.pop(_CHANGED_USERS_KEY, ()):
+        invalidate_user(username)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_users(session):
+    session.info.pop(_CHANGED_USERS_KEY, None)
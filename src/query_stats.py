@@ -0,0 +1,215 @@
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import RLock
+from typing import Dict, Iterator, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+# Per-request SQL statistics are on unless QUERY_STATS=0. QUERY_CHECKS=1 is the
+# dev/test mode: a request that runs the same statement more than
+# QUERY_REPEAT_LIMIT times (an N+1) or lazy-loads a relationship raises
+QUERY_STATS_ENABLED = os.getenv("QUERY_STATS", "1") != "0"
+QUERY_CHECKS = os.getenv("QUERY_CHECKS", "0") == "1"
+QUERY_REPEAT_LIMIT = int(os.getenv("QUERY_REPEAT_LIMIT", "5"))
+
+# Longest statement text kept for the slowest statement
+_STATEMENT_CHARS = 500
+
+# Connection.info key stacking the start times of the statements in progress
+_STARTED_KEY = "query_stats_started"
+
+class QueryCheckError(RuntimeError):
+    """A request repeated a statement or lazy-loaded a relationship while checks were on."""
+
+class RequestQueries:
+    """The statements one request (or a track_queries block) has run so far."""
+
+    def __init__(self, checks: bool = False, repeat_limit: int = QUERY_REPEAT_LIMIT):
+        self.checks = checks
+        self.repeat_limit = repeat_limit
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.lazy_loads = 0
+        self.max_repeats = 0
+        self.repeats_allowed = 0
+        self._repeats: Counter = Counter()
+
+    def before_statement(self, statement: str) -> None:
+        self.statements += 1
+        self._repeats[statement] += 1
+        repeats = self._repeats[statement]
+        if repeats > self.max_repeats and not self.repeats_allowed:
+            self.max_repeats = repeats
+            if self.checks and repeats > self.repeat_limit:
+                raise QueryCheckError(
+                    f"Statement run {repeats} times in one request, likely an N+1: {statement[:_STATEMENT_CHARS]}"
+                )
+
+    def after_statement(self, statement: str, seconds: float) -> None:
+        self.db_seconds += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement[:_STATEMENT_CHARS]
+
+    def lazy_load(self, path: str) -> None:
+        self.lazy_loads += 1
+        if self.checks:
+            raise QueryCheckError(f"Lazy load of {path}; load it eagerly with the query")
+
+# Statistics of the request being handled, if any
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+@contextmanager
+def track_queries(checks: bool = QUERY_CHECKS, repeat_limit: int = QUERY_REPEAT_LIMIT) -> Iterator[RequestQueries]:
+    """Record the statements run inside the block, as the middleware does for a request."""
+    queries = RequestQueries(checks, repeat_limit)
+    token = _current.set(queries)
+    try:
+        yield queries
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def allow_repeated_statements() -> Iterator[None]:
+    """Exempt a deliberate batch loop, such as one query per chunk of IDs, from the N+1 check."""
+    queries = _current.get()
+    if queries is not None:
+        queries.repeats_allowed += 1
+    try:
+        yield
+    finally:
+        if queries is not None:
+            queries.repeats_allowed -= 1
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = _current.get()
+    if queries is not None:
+        # Started first, so handle_error finds it if the check below raises
+        conn.info.setdefault(_STARTED_KEY, []).append(time.perf_counter())
+        queries.before_statement(statement)
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = _current.get()
+    started = conn.info.get(_STARTED_KEY)
+    if queries is not None and started:
+        queries.after_statement(statement, time.perf_counter() - started.pop())
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    started = context.connection.info.get(_STARTED_KEY) if context.connection is not None else None
+    if started:
+        started.pop()
+
+@event.listens_for(Session, "do_orm_execute")
+def _check_lazy_load(orm_execute_state):
+    queries = _current.get()
+    if queries is not None and orm_execute_state.is_select and orm_execute_state.lazy_loaded_from is not None:
+        queries.lazy_load(str(orm_execute_state.loader_strategy_path))
+
+class EndpointQueryStats:
+    """Thread-safe running totals of the per-request statistics, by endpoint."""
+
+    def __init__(self):
+        self._lock = RLock()
+        self._endpoints: Dict[str, Dict] = {}
+
+    def record(self, endpoint: str, queries: RequestQueries) -> None:
+        with self._lock:
+            totals = self._endpoints.get(endpoint)
+            if totals is None:
+                totals = self._endpoints[endpoint] = {
+                    'requests': 0, 'statements': 0, 'max_statements': 0, 'db_seconds': 0.0,
+                    'max_db_seconds': 0.0, 'slowest_seconds': 0.0, 'slowest_statement': None,
+                    'lazy_loads': 0, 'max_repeats': 0,
+                }
+            totals['requests'] += 1
+            totals['statements'] += queries.statements
+            totals['max_statements'] = max(totals['max_statements'], queries.statements)
+            totals['db_seconds'] += queries.db_seconds
+            totals['max_db_seconds'] = max(totals['max_db_seconds'], queries.db_seconds)
+            totals['lazy_loads'] += queries.lazy_loads
+            totals['max_repeats'] = max(totals['max_repeats'], queries.max_repeats)
+            if queries.slowest_seconds > totals['slowest_seconds']:
+                totals['slowest_seconds'] = queries.slowest_seconds
+                totals['slowest_statement'] = queries.slowest_statement
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                endpoint: {
+                    'requests': totals['requests'],
+                    'statements_per_request': round(totals['statements'] / totals['requests'], 2),
+                    'max_statements': totals['max_statements'],
+                    'db_ms_per_request': round(totals['db_seconds'] * 1000 / totals['requests'], 3),
+                    'max_db_ms': round(totals['max_db_seconds'] * 1000, 3),
+                    'slowest_ms': round(totals['slowest_seconds'] * 1000, 3),
+                    'slowest_statement': totals['slowest_statement'],
+                    'lazy_loads': totals['lazy_loads'],
+                    'max_repeats': totals['max_repeats'],
+                }
+                for endpoint, totals in sorted(self._endpoints.items())
+            }
+
+# Shared totals for the process
+endpoint_query_stats = EndpointQueryStats()
+
+def _endpoint(scope) -> str:
+    """The method and route template of a routed request, so stats do not grow with IDs in paths."""
+    route = scope.get("route")
+    return f"{scope['method']} {route.path if route is not None else '(unmatched)'}"
+
+class QueryStatsMiddleware:
+    """ASGI middleware recording the SQL run by each HTTP request.
+
+    Statement count, database time and the slowest statement's time are sent
+    as X-DB-* response headers, logged at INFO level (at WARNING when a
+    statement repeated more than QUERY_REPEAT_LIMIT times) and added to
+    endpoint_query_stats. A streamed body's statements run after the headers
+    are sent, so they only reach the log and the totals.
+    """
+
+    def __init__(self, app, checks: bool = QUERY_CHECKS):
+        self.app = app
+        self.checks = checks
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not QUERY_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries(self.checks)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-DB-Statements", str(queries.statements))
+                headers.append("X-DB-Time-Ms", f"{queries.db_seconds * 1000:.2f}")
+                headers.append("X-DB-Slowest-Ms", f"{queries.slowest_seconds * 1000:.2f}")
+            await send(message)
+
+        token = _current.set(queries)
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
+            endpoint = _endpoint(scope)
+            endpoint_query_stats.record(endpoint, queries)
+            level = logging.WARNING if queries.max_repeats > QUERY_REPEAT_LIMIT else logging.INFO
+            if logger.isEnabledFor(level):
+                logger.log(level, "%s: %d statements, %.2f ms in the database, slowest %.2f ms, "
+                                  "most repeated %d times, %d lazy loads: %s",
+                           endpoint, queries.statements, queries.db_seconds * 1000,
+                           queries.slowest_seconds * 1000, queries.max_repeats, queries.lazy_loads,
+                           queries.slowest_statement)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, date
 from enum import Enum
 
 class UserRole(str, Enum):
@@ -30,6 +30,7 @@ class UserResponse(UserBase):
 
     class Config:
         from_attributes = True
+        orm_mode = True
 
 class Token(BaseModel):
     access_token: str
@@ -49,6 +50,7 @@ class AirportResponse(AirportBase):
 
     class Config:
         from_attributes = True
+        orm_mode = True
 
 class FlightBase(BaseModel):
     flight_number: str
@@ -72,6 +74,72 @@ class FlightResponse(FlightBase):
 
     class Config:
         from_attributes = True
+        orm_mode = True
+
+class FlightPage(BaseModel):
+    items: List[FlightResponse]
+    next_cursor: Optional[str] = None
+
+class FlightSearchResult(BaseModel):
+    id: int
+    flight_number: str
+    departure_airport: str
+    arrival_airport: str
+    departure_time: datetime
+    arrival_time: datetime
+    status: FlightStatus
+    available_seats: int
+    total_seats: int
+    base_price: float
+    price: float
+
+class FareCalendarDay(BaseModel):
+    date: date
+    price: Optional[float] = None
+    available_seats: int
+    flights: int
+
+class RouteInventorySummary(BaseModel):
+    departure_airport: str
+    arrival_airport: str
+    departure_date: date
+    flights: int
+    total_seats: int
+    seats_remaining: int
+    seats_sold: int
+    revenue: float
+    cancellations: int
+    load_factor: float
+
+class RollupDimension(str, Enum):
+    ROUTE = "route"
+    DAY = "day"
+    HOUR = "hour"
+    LEAD_TIME = "lead_time"
+
+class BookingRollupRow(BaseModel):
+    departure_airport: Optional[str] = None
+    arrival_airport: Optional[str] = None
+    departure_date: Optional[date] = None
+    departure_hour: Optional[int] = None
+    lead_time: Optional[str] = None
+    flights: int
+    seats: int
+    bookings: int
+    cancellations: int
+    revenue: float
+    load_factor: float
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+    ARROW = "arrow"
+
+class SeatAvailability(BaseModel):
+    flight_id: int
+    flight_number: str
+    available_seats: int
+    free_seats: List[str]
 
 class BookingBase(BaseModel):
     flight_id: int
@@ -90,12 +158,36 @@ class BookingResponse(BookingBase):
 
     class Config:
         from_attributes = True
+        orm_mode = True
+
+class BookingPage(BaseModel):
+    items: List[BookingResponse]
+    next_cursor: Optional[str] = None
 
 class FlightSearch(BaseModel):
     departure_airport: str
     arrival_airport: str
     date: datetime
 
+class ConnectionObjective(str, Enum):
+    EARLIEST_ARRIVAL = "earliest_arrival"
+    CHEAPEST = "cheapest"
+
+class ConnectionSearch(FlightSearch):
+    max_stops: int = Field(2, ge=0, le=2)
+    min_connection_minutes: int = Field(45, ge=0)
+    max_connection_minutes: int = Field(360, ge=0)
+    objective: ConnectionObjective = ConnectionObjective.EARLIEST_ARRIVAL
+    limit: int = Field(10, ge=1, le=50)
+
+class Itinerary(BaseModel):
+    legs: List[FlightSearchResult]
+    stops: int
+    departure_time: datetime
+    arrival_time: datetime
+    duration_minutes: int
+    price: float
+
 class BookingHistory(BaseModel):
     start_date: datetime
     end_date: datetime 
\ No newline at end of file
@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import Tuple
+
+import pytest
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Base, create_db_engine, ensure_indexes
+from src.benchmarks.query_counts import _seed
+
+# Size of the seeded database: one user's bookings spread over one route's flights
+SEED_BOOKINGS = 300
+SEED_FLIGHTS = 20
+
+@pytest.fixture(scope="session")
+def seeded_database(tmp_path_factory) -> Tuple[Engine, datetime]:
+    """A small database with the current schema and indexes, and the day its flights depart."""
+    path = tmp_path_factory.mktemp("db") / "seeded.db"
+    engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    ensure_indexes(engine)
+    with sessionmaker(bind=engine)() as session:
+        day = _seed(session, SEED_BOOKINGS, SEED_FLIGHTS)
+    yield engine, day
+    engine.dispose()
+
+@pytest.fixture(scope="session")
+def engine(seeded_database) -> Engine:
+    return seeded_database[0]
+
+@pytest.fixture(scope="session")
+def seeded_day(seeded_database) -> datetime:
+    return seeded_database[1]
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from src.models.database import Flight, FlightStatus
+from src.bll.connection_search import ConnectionGraph
+
+def _add_flight(engine, flight_number: str, departure_time: datetime) -> None:
+    # Written without a session, as another process would, so no commit listener sees it
+    with engine.begin() as conn:
+        conn.execute(insert(Flight).values(
+            flight_number=flight_number, departure_airport_id=2, arrival_airport_id=1,
+            departure_time=departure_time, arrival_time=departure_time + timedelta(hours=7),
+            aircraft_type="Boeing 777", total_seats=300, available_seats=300,
+            status=FlightStatus.SCHEDULED, base_price=450.0
+        ))
+
+def _flight_numbers(graph: ConnectionGraph, day: datetime) -> set:
+    return {itinerary['legs'][0]['flight_number'] for itinerary in graph.search("JFK", "LHR", day, max_stops=0)}
+
+def test_reload_picks_up_other_processes_flights_and_drops_departed_ones(engine):
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    yesterday = today - timedelta(days=1)
+    graph = ConnectionGraph()
+    _add_flight(engine, "CG1", yesterday + timedelta(hours=9))
+    with engine.connect() as conn:
+        graph.load(conn)
+    assert _flight_numbers(graph, yesterday) == {"CG1"}
+
+    _add_flight(engine, "CG2", today + timedelta(days=20, hours=9))
+    with engine.connect() as conn:
+        graph.load(conn, since=today)
+    assert _flight_numbers(graph, yesterday) == set()
+    assert _flight_numbers(graph, today + timedelta(days=20)) == {"CG2"}
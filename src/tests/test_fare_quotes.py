@@ -0,0 +1,24 @@
+import random
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from src.bll.pricing import quote_fare, quote_fares
+from src.benchmarks.fare_quotes import _random_flights
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("seat_count", [1, 3])
+def test_vectorized_fares_match_the_scalar_rules(seed, seat_count):
+    # Half of the flights sit on a rule boundary, see _random_flights
+    now = datetime(2026, 3, 29, 1, 30)
+    flights = _random_flights(random.Random(seed), 2000, now)
+    base_prices, departures, available, total = zip(*flights)
+    expected = [quote_fare(*flight, now=now, seat_count=seat_count) for flight in flights]
+
+    quotes = quote_fares(base_prices, departures, available, total, now=now, seat_count=seat_count)
+    as_datetime64 = quote_fares(base_prices, np.array(departures, dtype='datetime64[us]'),
+                                available, total, now=now, seat_count=seat_count)
+
+    assert quotes.tolist() == expected
+    assert as_datetime64.tolist() == expected
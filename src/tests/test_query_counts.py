@@ -0,0 +1,13 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from src.benchmarks.query_counts import QUERY_BUDGETS, count_queries, service_calls
+
+# The seeded user has hundreds of bookings, so a statement per row would blow every budget
+@pytest.mark.parametrize("name", sorted(QUERY_BUDGETS))
+def test_service_call_stays_within_its_statement_budget(engine, seeded_day, name):
+    call = service_calls(seeded_day)[name]
+    with sessionmaker(bind=engine)() as session, count_queries(engine) as counter:
+        rows = call(session)
+    assert rows
+    assert counter["count"] <= QUERY_BUDGETS[name], f"{name} ran {counter['count']} statements"
@@ -0,0 +1,4 @@
+from src.benchmarks.query_plans import check_query_plans
+
+def test_hot_queries_never_scan_flights_or_bookings(engine):
+    assert check_query_plans(engine) == []
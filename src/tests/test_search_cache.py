@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from src.bll.search_cache import SearchResultCache
+
+DAY = datetime(2026, 11, 2)
+
+def _results(flight_id: int) -> list:
+    return [{'id': flight_id, 'available_seats': 10}]
+
+def test_invalidation_during_a_load_keeps_its_results_out_of_the_cache():
+    cache = SearchResultCache(max_bytes=1 << 20, ttl_seconds=60)
+
+    def loader():
+        cache.invalidate("LHR", "JFK", DAY.date())
+        return _results(1)
+
+    cache.get_or_load("LHR", "JFK", DAY, loader)
+    assert cache.stats()['entries'] == 0
+    cache.get_or_load("LHR", "JFK", DAY, lambda: _results(1))
+    assert cache.stats()['entries'] == 1
+
+def test_route_day_generations_are_dropped_once_no_load_needs_them():
+    cache = SearchResultCache(max_bytes=1 << 20, ttl_seconds=60)
+    for day in range(1, 29):
+        search_date = datetime(2026, 2, day)
+        cache.get_or_load("LHR", "JFK", search_date, lambda: _results(day))
+        cache.invalidate("LHR", "JFK", search_date.date())
+        cache.invalidate("JFK", "LHR", search_date.date())
+
+    def loader():
+        cache.invalidate("LHR", "JFK", DAY.date())
+        assert cache._generations == {("LHR", "JFK", DAY.date()): 1}
+        return _results(1)
+
+    cache.get_or_load("LHR", "JFK", DAY, loader)
+    assert cache._generations == {}
@@ -0,0 +1,3 @@
+"""
+Utility functions package.
+"""
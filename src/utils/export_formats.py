@@ -0,0 +1,148 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Callable, Optional, Sequence, Tuple
+
+# Bulk export formats. Writers turn chunks of result tuples into bytes as they
+# arrive, so an export never holds more than one chunk; Arrow needs pyarrow,
+# which is imported only when an Arrow export is asked for
+CSV = "csv"
+NDJSON = "ndjson"
+ARROW = "arrow"
+EXPORT_FORMATS = (CSV, NDJSON, ARROW)
+
+MEDIA_TYPES = {
+    CSV: "text/csv",
+    NDJSON: "application/x-ndjson",
+    ARROW: "application/vnd.apache.arrow.stream",
+}
+FILE_EXTENSIONS = {CSV: "csv", NDJSON: "ndjson", ARROW: "arrows"}
+
+# (name, Python type) of each exported column
+Columns = Sequence[Tuple[str, type]]
+
+def check_export_format(export_format: str) -> None:
+    """Raise ValueError for an unknown format, or Arrow without pyarrow installed."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    if export_format == ARROW:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("Arrow export needs pyarrow installed")
+
+def export_writer(export_format: str, columns: Columns):
+    """A writer for the format with header(), rows(chunk) and footer() returning bytes."""
+    check_export_format(export_format)
+    if export_format == CSV:
+        return _CsvWriter(columns)
+    if export_format == NDJSON:
+        return _NdjsonWriter(columns)
+    return _ArrowWriter(columns)
+
+def _converter(python_type: type, dates_as_text: bool) -> Optional[Callable]:
+    if issubclass(python_type, Enum):
+        return lambda value: None if value is None else value.value
+    if dates_as_text and issubclass(python_type, (datetime, date)):
+        return lambda value: None if value is None else value.isoformat()
+    return None
+
+class _Writer:
+    # Whether dates and times are written as ISO 8601 text
+    dates_as_text = True
+
+    def __init__(self, columns: Columns):
+        self.names = [name for name, _ in columns]
+        self._converters = [
+            (index, converter) for index, (_, python_type) in enumerate(columns)
+            if (converter := _converter(python_type, self.dates_as_text)) is not None
+        ]
+
+    def _values(self, chunk: Sequence[tuple]) -> Sequence[Sequence]:
+        """Rows with enums, and dates unless kept, replaced by plain values."""
+        if not self._converters:
+            return chunk
+        rows = []
+        for row in chunk:
+            values = list(row)
+            for index, converter in self._converters:
+                values[index] = converter(values[index])
+            rows.append(values)
+        return rows
+
+    def header(self) -> bytes:
+        return b""
+
+    def rows(self, chunk: Sequence[tuple]) -> bytes:
+        raise NotImplementedError
+
+    def footer(self) -> bytes:
+        return b""
+
+class _CsvWriter(_Writer):
+    def _encode(self, rows: Sequence[Sequence]) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode()
+
+    def header(self) -> bytes:
+        return self._encode([self.names])
+
+    def rows(self, chunk: Sequence[tuple]) -> bytes:
+        return self._encode(self._values(chunk))
+
+class _NdjsonWriter(_Writer):
+    def rows(self, chunk: Sequence[tuple]) -> bytes:
+        names = self.names
+        return "".join(
+            json.dumps(dict(zip(names, values)), separators=(",", ":")) + "\n"
+            for values in self._values(chunk)
+        ).encode()
+
+class _ArrowWriter(_Writer):
+    """Arrow IPC stream: the schema, then one record batch per chunk."""
+    dates_as_text = False
+
+    def __init__(self, columns: Columns):
+        super().__init__(columns)
+        import pyarrow as pa
+        self._pa = pa
+        self._schema = pa.schema([(name, _arrow_type(pa, python_type)) for name, python_type in columns])
+        # The stream writer appends to this buffer, which is emptied after every write
+        self._sink = io.BytesIO()
+        self._writer = pa.ipc.new_stream(self._sink, self._schema)
+
+    def _drain(self) -> bytes:
+        data = self._sink.getvalue()
+        self._sink.seek(0)
+        self._sink.truncate()
+        return data
+
+    def rows(self, chunk: Sequence[tuple]) -> bytes:
+        if not chunk:
+            return b""
+        columns = list(zip(*self._values(chunk)))
+        self._writer.write_batch(self._pa.record_batch(
+            [self._pa.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+            schema=self._schema
+        ))
+        return self._drain()
+
+    def footer(self) -> bytes:
+        self._writer.close()
+        return self._drain()
+
+def _arrow_type(pa, python_type: type):
+    if issubclass(python_type, bool):
+        return pa.bool_()
+    if issubclass(python_type, int):
+        return pa.int64()
+    if issubclass(python_type, float):
+        return pa.float64()
+    if issubclass(python_type, datetime):
+        return pa.timestamp("us")
+    if issubclass(python_type, date):
+        return pa.date32()
+    return pa.string()
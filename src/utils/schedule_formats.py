@@ -0,0 +1,72 @@
+import csv
+import json
+import os
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+# Schedule feed formats. Readers yield one flight record (a dict of field
+# name to value) at a time, so a feed of any size is read in constant memory.
+# JSON is an array of flight objects; CSV and NDJSON match the flight export
+CSV = "csv"
+NDJSON = "ndjson"
+JSON = "json"
+SCHEDULE_FORMATS = (CSV, NDJSON, JSON)
+
+_EXTENSIONS = {".csv": CSV, ".ndjson": NDJSON, ".jsonl": NDJSON, ".json": JSON}
+
+# Text read per step when looking for the next object in a JSON array
+_JSON_BLOCK_SIZE = 1 << 20
+
+def detect_schedule_format(path: str, schedule_format: Optional[str] = None) -> str:
+    """The given format, or the one implied by the file's extension; ValueError if neither."""
+    if schedule_format is None:
+        schedule_format = _EXTENSIONS.get(os.path.splitext(path)[1].lower())
+        if schedule_format is None:
+            raise ValueError(f"Cannot tell the format of {path}; give one of {', '.join(SCHEDULE_FORMATS)}")
+    if schedule_format not in SCHEDULE_FORMATS:
+        raise ValueError(f"Unknown schedule format: {schedule_format}")
+    return schedule_format
+
+def read_schedule(file: TextIO, schedule_format: str) -> Iterator[Dict[str, Any]]:
+    """Yield the flight records of an open schedule file in order."""
+    if schedule_format == CSV:
+        return iter(csv.DictReader(file))
+    if schedule_format == NDJSON:
+        return _ndjson_records(file)
+    return _json_array_records(file)
+
+def _ndjson_records(file: TextIO) -> Iterator[Dict[str, Any]]:
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+def _json_array_records(file: TextIO) -> Iterator[Dict[str, Any]]:
+    """Decode a top-level JSON array one element at a time.
+
+    json.load() would build the whole array first; instead each element is
+    decoded with raw_decode() from a buffer topped up block by block, and
+    the consumed text is dropped once it outgrows a block.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(_JSON_BLOCK_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("A JSON schedule must be an array of flights")
+    buffer, position, exhausted = buffer[1:], 0, False
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        try:
+            record, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # Most likely an element cut off at the end of the buffer
+            if exhausted:
+                raise
+            more = file.read(_JSON_BLOCK_SIZE)
+            exhausted = not more
+            buffer, position = buffer[position:] + more, 0
+            continue
+        yield record
+        position = end
+        if position > _JSON_BLOCK_SIZE:
+            buffer, position = buffer[position:], 0
@@ -0,0 +1,125 @@
+import math
+from typing import Iterable, List, NamedTuple, Optional
+
+# Seat numbers are [row][letter]: rows 1-50 and the usual letters without I.
+# The bitmap has a position for each of them; an aircraft uses some of the
+# letters and as many rows as its seats need, see seat_layout
+SEAT_ROWS = 50
+SEAT_LETTERS = 'ABCDEFGHJK'
+SEAT_POSITIONS = SEAT_ROWS * len(SEAT_LETTERS)
+SEAT_MAP_BYTES = (SEAT_POSITIONS + 7) // 8
+
+# Letters of a row by seats abreast, windows first and last
+_ROW_LETTERS = {
+    4: 'ACDF',
+    5: 'ACDEF',
+    6: 'ABCDEF',
+    7: 'ABCDEFG',
+    8: 'ACDEFGHK',
+    9: 'ABCDEFGHK',
+    10: 'ABCDEFGHJK',
+}
+
+# Seats abreast by aircraft type, matched on a part of its name
+_ABREAST_BY_AIRCRAFT = (
+    ('Embraer', 4), ('E190', 4), ('A220', 5), ('A319', 6), ('A320', 6), ('A321', 6), ('737', 6),
+    ('757', 6), ('767', 7), ('A330', 8), ('A350', 9), ('787', 9), ('777', 10),
+)
+# Seats abreast of aircraft types not listed, by total seats
+_NARROW_BODY_MAX_SEATS = 240
+
+class SeatLayout(NamedTuple):
+    """Seats of one aircraft: rows numbered from 1 with the same letters, the last row maybe partly filled."""
+    letters: str
+    rows: int
+    total_seats: int
+
+    def seat_numbers(self) -> List[str]:
+        """List every seat in row/letter order."""
+        abreast = len(self.letters)
+        return [f"{position // abreast + 1}{self.letters[position % abreast]}"
+                for position in range(self.total_seats)]
+
+    def contains(self, seat_number: str) -> bool:
+        """Check whether a seat number exists on the aircraft."""
+        if seat_index(seat_number) is None:
+            return False
+        row = int(seat_number[:-1])
+        letter = self.letters.find(seat_number[-1].upper())
+        return letter >= 0 and (row - 1) * len(self.letters) + letter < self.total_seats
+
+def seat_layout(aircraft_type: Optional[str], total_seats: int) -> SeatLayout:
+    """Get the seat layout of a flight from its aircraft type and seat count.
+
+    Seats abreast come from the aircraft type, or from the seat count for
+    types not known here, widened when the rows would not fit the seat map.
+    """
+    total_seats = max(0, min(total_seats, SEAT_POSITIONS))
+    abreast = next(
+        (seats for name, seats in _ABREAST_BY_AIRCRAFT if name in (aircraft_type or '')),
+        6 if total_seats <= _NARROW_BODY_MAX_SEATS else 10
+    )
+    abreast = max(abreast, math.ceil(total_seats / SEAT_ROWS))
+    return SeatLayout(_ROW_LETTERS[abreast], math.ceil(total_seats / abreast), total_seats)
+
+def seat_index(seat_number: str) -> Optional[int]:
+    """Get the bit position of a seat number, or None if it is not valid."""
+    if not seat_number or len(seat_number) < 2:
+        return None
+    row = seat_number[:-1]
+    letter = seat_number[-1].upper()
+    if not row.isdigit() or letter not in SEAT_LETTERS:
+        return None
+    row_num = int(row)
+    if row_num < 1 or row_num > SEAT_ROWS:
+        return None
+    return (row_num - 1) * len(SEAT_LETTERS) + SEAT_LETTERS.index(letter)
+
+def seat_number(index: int) -> str:
+    """Get the seat number at a bit position."""
+    row, letter = divmod(index, len(SEAT_LETTERS))
+    return f"{row + 1}{SEAT_LETTERS[letter]}"
+
+class SeatMap:
+    """Occupancy bitmap for one flight, one bit per seat position."""
+
+    def __init__(self, data: Optional[bytes] = None):
+        self.bits = bytearray(data) if data else bytearray(SEAT_MAP_BYTES)
+        if len(self.bits) < SEAT_MAP_BYTES:
+            self.bits.extend(bytes(SEAT_MAP_BYTES - len(self.bits)))
+
+    @classmethod
+    def from_seats(cls, seat_numbers: Iterable[str]) -> "SeatMap":
+        """Build a map with the given seats taken."""
+        seat_map = cls()
+        for number in seat_numbers:
+            seat_map.set_taken(number, True)
+        return seat_map
+
+    def is_taken(self, seat_number: str) -> bool:
+        """Check whether a seat is taken; invalid seats are never taken."""
+        index = seat_index(seat_number)
+        if index is None:
+            return False
+        return bool(self.bits[index >> 3] & (1 << (index & 7)))
+
+    def set_taken(self, seat_number: str, taken: bool) -> None:
+        """Mark a seat as taken or free; invalid seats are ignored."""
+        index = seat_index(seat_number)
+        if index is None:
+            return
+        if taken:
+            self.bits[index >> 3] |= 1 << (index & 7)
+        else:
+            self.bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def free_seats(self, layout: SeatLayout) -> List[str]:
+        """List every free seat of the layout in row/letter order."""
+        return [number for number in layout.seat_numbers() if not self.is_taken(number)]
+
+    def taken_count(self) -> int:
+        """Count the taken seats."""
+        return sum(bin(byte).count('1') for byte in self.bits)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.bits)